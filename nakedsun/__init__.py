@@ -30,15 +30,22 @@ from . import account
 from . import auxiliary
 from . import bitvectors
 from . import char
+from . import commands
 from . import event
+from . import exit
 from . import hooks
 from . import mud
 from . import mudsock
 from . import mudsys
 from . import obj
+from . import prototypes
+from . import pulse
+from . import registry
+from . import reset
 from . import room
 from . import semver
 from . import settings
+from . import template
 
 ###############################################################################
 # Exports
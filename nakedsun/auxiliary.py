@@ -25,6 +25,7 @@ data inherit.
 # Imports
 ###############################################################################
 
+import gc
 import weakref
 
 from . import logger as log
@@ -36,6 +37,17 @@ from . import logger as log
 _classes = {}
 _types = {}
 
+# A cache of concrete class -> (owner type, sorted list of (name, aux class)).
+# This is cleared whenever install or register are called.
+_resolved = {}
+
+# When lazy is True, auxiliary data storage class instances aren't created
+# until the first time they're accessed with aux(). Set from the
+# ``lazy_auxiliary`` MUD setting at startup.
+lazy = False
+
+_no_data = {}
+
 class _EmptyOldStyle:
     pass
 
@@ -86,6 +98,10 @@ def install(name, cls, installs_on):
                 '''
                 ...
 
+    If the ``lazy_auxiliary`` setting is enabled, instances of an auxiliary
+    data storage class are only created when they're first accessed, so your
+    ``__init__`` should avoid relying on side effects.
+
     In NakedSun, auxiliary data storage classes all contain a reference to the
     object they're associated with. Whether the auxiliary data is attached to
     an account, character, or any class, simply use ``self.owner`` to access
@@ -123,6 +139,8 @@ def install(name, cls, installs_on):
         # Set it and move on.
         _classes[word][name] = cls
 
+    _resolved.clear()
+
 def register(name, cls=None):
     """
     This class decorator registers a new class with auxiliary data support to a
@@ -132,6 +150,7 @@ def register(name, cls=None):
 
     def decorator(cls):
         _types[cls] = name.strip().lower()
+        _resolved.clear()
         return cls
 
     if cls:
@@ -142,14 +161,36 @@ def register(name, cls=None):
 # Not As Public Functions
 ###############################################################################
 
-def _determine_class(thing):
+def _resolve(klass):
     """
-    Iterate through the registered classes with auxiliary data support.
+    Determine the owner type and the list of auxiliary data storage classes
+    for the given class, caching the result.
     """
+    try:
+        return _resolved[klass]
+    except KeyError:
+        pass
+
+    owner_type = None
     for key, val in _types.iteritems():
-        if isinstance(thing, key):
-            return val
-    return None
+        if issubclass(klass, key):
+            owner_type = val
+            break
+
+    if owner_type:
+        classes = sorted(_classes.get(owner_type, {}).iteritems())
+    else:
+        classes = []
+
+    _resolved[klass] = result = (owner_type, classes)
+    return result
+
+def _determine_class(thing):
+    """
+    Return the name of the registered type with auxiliary data support that
+    the provided object is an instance of.
+    """
+    return _resolve(type(thing))[0]
 
 def _get_class(owner, cls):
     """
@@ -157,17 +198,18 @@ def _get_class(owner, cls):
     """
 
     # Get the type of owner.
-    owner_type = _determine_class(owner)
+    owner_type = _resolve(type(owner))[0]
     if not owner_type:
         raise TypeError("Cannot initialize auxiliary data on unregistered "
                         "type %r." % type(owner))
 
-    if not cls in _classes[owner_type]:
+    classes = _classes.get(owner_type)
+    if not classes or not cls in classes:
         raise KeyError("No such auxiliary data class %r for type %r." %
                        (cls, owner_type))
 
-    # Store the class.
-    return _classes[owner_type]
+    # Return the class.
+    return classes[cls]
 
 def _initialize(owner, cls, data=None, key=None):
     """
@@ -209,6 +251,65 @@ def _initialize(owner, cls, data=None, key=None):
     # And finally return it.
     return instance
 
+def _uninstall(modules):
+    """
+    Remove every auxiliary data storage class defined in one of the provided
+    modules, returning a list of ``(type, name, class)`` tuples. This is used
+    when reloading modules.
+    """
+    removed = []
+    for word, classes in _classes.iteritems():
+        for name, cls in classes.items():
+            if getattr(cls, '__module__', None) in modules:
+                removed.append((word, name, cls))
+                del classes[name]
+
+    _resolved.clear()
+    return removed
+
+def _restore(removed):
+    """
+    Restore auxiliary data storage classes removed by :func:`_uninstall`.
+    """
+    for word, name, cls in removed:
+        _classes.setdefault(word, {})[name] = cls
+    _resolved.clear()
+
+def _migrate(removed):
+    """
+    After the modules that defined the classes removed by :func:`_uninstall`
+    have been reloaded, replace every existing instance of those classes with
+    an instance of the newly installed class of the same name, passing along
+    the data returned by the old instance's ``store`` function.
+    """
+    replaced = {}
+    for word, name, cls in removed:
+        new = _classes.get(word, {}).get(name)
+        if new is not None and new is not cls:
+            replaced[cls] = (name, new)
+
+    if not replaced:
+        return 0
+
+    count = 0
+    for thing in gc.get_objects():
+        if not isinstance(thing, AuxiliaryBase) or not thing._auxiliary:
+            continue
+
+        for key, instance in thing._auxiliary.items():
+            entry = replaced.get(getattr(instance, '__class__', None))
+            if entry is None or entry[0] != key:
+                continue
+
+            try:
+                _initialize(thing, entry[1], instance.store(), key)
+                count += 1
+            except Exception:
+                log.exception("There was an error migrating the auxiliary "
+                              "data storage class %r for %r." % (key, thing))
+
+    return count
+
 ###############################################################################
 # The Almighty Base Class
 ###############################################################################
@@ -219,23 +320,41 @@ class AuxiliaryBase(object):
     auxiliary data, and is inherited by :class:`account.Account`,
     :class:`char.Char`, :class:`exit.Exit`, :class:`mudsock.Mudsock`,
     :class:`obj.Obj`, and :class:`room.Room`.
+
+    Subclasses with ``__slots__`` must include ``_auxiliary`` and
+    ``_auxiliary_raw`` and set both to None before calling
+    :func:`_auxiliary_init`.
     """
+    __slots__ = ()
 
-    # Set this variable to prevent AttributeErrors later.
+    # Set these variables to prevent AttributeErrors later.
     _auxiliary = None
+    _auxiliary_raw = None
 
     ##### Private Functions ####################################################
 
     def _auxiliary_init(self, data=None):
         """
         Initialize all the auxiliary data storage classes associated with this.
+        In lazy mode, only the raw data for each class is kept until the class
+        is accessed for the first time.
         """
-        my_type = _determine_class(self)
-        if not my_type:
+        classes = _resolve(type(self))[1]
+
+        if lazy:
+            raw = None
+            if data:
+                for key, cls in classes:
+                    if key in data:
+                        if raw is None:
+                            raw = {}
+                        raw[key] = data[key]
+
+            self._auxiliary_raw = raw or _no_data
             return
 
         # Iterate through the classes.
-        for key, cls in _classes[my_type].iteritems():
+        for key, cls in classes:
             key_data = data[key] if data and key in data else None
 
             try:
@@ -244,6 +363,56 @@ class AuxiliaryBase(object):
                 log.exception("There was an error initializing the auxiliary "
                               "data storage class %r for %r." % (key, self))
 
+    def _auxiliary_build(self, name):
+        """
+        Create the auxiliary data storage class instance with the given name
+        from its raw data. This is used in lazy mode.
+        """
+        cls = _get_class(self, name)
+        raw = self._auxiliary_raw
+
+        try:
+            instance = _initialize(self, cls, raw.get(name), name)
+        except Exception:
+            log.exception("There was an error initializing the auxiliary "
+                          "data storage class %r for %r." % (name, self))
+
+            # Keep the raw data so it's still written back when stored.
+            if not self._auxiliary:
+                self._auxiliary = {}
+            self._auxiliary[name] = None
+            return None
+
+        # We don't need the raw data anymore.
+        if name in raw:
+            del raw[name]
+
+        return instance
+
+    def _auxiliary_store(self):
+        """
+        Return a dictionary of the stored data of every auxiliary data storage
+        class instance associated with this. The raw data of instances that
+        were never created in lazy mode is returned as it was loaded.
+        """
+        out = {}
+
+        raw = self._auxiliary_raw
+        if raw:
+            out.update(raw)
+
+        if self._auxiliary:
+            for key, instance in self._auxiliary.iteritems():
+                if instance is None:
+                    continue
+                try:
+                    out[key] = instance.store()
+                except Exception:
+                    log.exception("There was an error storing the auxiliary "
+                                  "data storage class %r for %r." % (key, self))
+
+        return out
+
     ##### Public Functions #####################################################
 
     def aux(self, name):
@@ -256,12 +425,15 @@ class AuxiliaryBase(object):
         storage class, or if the auxiliary data name wasn't registered at the
         time this was initialized.
         """
-        if not self._auxiliary or not name in self._auxiliary:
-            # Check that it's a valid name.
-            _get_class(self, name)
-            return None
+        auxiliary = self._auxiliary
+        if auxiliary and name in auxiliary:
+            return auxiliary[name]
 
-        return self._auxiliary[name]
+        if self._auxiliary_raw is not None:
+            return self._auxiliary_build(name)
 
-    getAuxiliary = aux
+        # Check that it's a valid name.
+        _get_class(self, name)
+        return None
 
+    getAuxiliary = aux
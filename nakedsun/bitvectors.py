@@ -25,10 +25,60 @@ This module provides simple bitvectors for the MUD.
 
 bitvectors = {}
 
-__all__ = ['Bitvector', 'create_bitvector']
+__all__ = ['Bitvector', 'BitvectorIndex', 'create_bitvector']
 
 _setattr = object.__setattr__
 
+###############################################################################
+# Bit List Class
+###############################################################################
+
+class _BitList(list):
+    """
+    The list of bit names for a single bitvector. In addition to the names, it
+    keeps a dictionary mapping each name to its integer mask so membership
+    tests and lookups don't require scanning the list.
+    """
+    __slots__ = ('masks', 'all')
+
+    def __init__(self, bits=()):
+        list.__init__(self)
+        self.masks = {}
+        self.all = 0
+        self.extend(bits)
+
+    def __contains__(self, key):
+        return key in self.masks
+
+    def append(self, bit):
+        if bit in self.masks:
+            return
+        mask = 1 << len(self)
+        list.append(self, bit)
+        self.masks[bit] = mask
+        self.all |= mask
+
+    def extend(self, bits):
+        for bit in bits:
+            self.append(bit)
+
+    def __iadd__(self, bits):
+        self.extend(bits)
+        return self
+
+    def _immutable(self, *args):
+        raise TypeError("Bits can only be appended to a bitvector.")
+
+    # Anything that would move or remove a bit would invalidate the masks of
+    # existing Bitvectors.
+    insert = remove = pop = sort = reverse = _immutable
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = _immutable
+    __imul__ = _immutable
+
+    def names(self, bits):
+        """ Return a list of the names of the bits set in an integer. """
+        return [bit for bit in self if self.masks[bit] & bits]
+
 ###############################################################################
 # Helper Functions
 ###############################################################################
@@ -36,16 +86,36 @@ _setattr = object.__setattr__
 def _bits_from_string(vector, words):
     if isinstance(vector, basestring):
         vector = bitvectors[vector]
-    
-    out = set()
-    
+
+    masks = vector.masks
+    out = 0
+
     for word in words.split(','):
         word = word.strip()
-        if word in vector:
-            out.add(word)
-        else:
+        try:
+            out |= masks[word]
+        except KeyError:
             raise ValueError("No such bit, %s" % word)
-    
+
+    return out
+
+def _masks(bits):
+    """ Iterate over the single-bit masks set in an integer. """
+    while bits:
+        mask = bits & -bits
+        yield mask
+        bits ^= mask
+
+def _bits_from_iterable(vector, words):
+    masks = vector.masks
+    out = 0
+
+    for word in words:
+        try:
+            out |= masks[word]
+        except KeyError:
+            raise ValueError("No such bit, %s" % word)
+
     return out
 
 ###############################################################################
@@ -53,81 +123,325 @@ def _bits_from_string(vector, words):
 ###############################################################################
 
 class Bitvector(object):
+    """
+    A set of named bits belonging to one of the bitvectors created with
+    :func:`create_bitvector`. The bits are stored as a single integer.
+    """
     __slots__ = ('_vecname', '_vector', '_bits')
-    
+
     def __init__(self, vector, bits=None):
         if isinstance(vector, Bitvector):
             _setattr(self, '_vector', vector._vector)
             _setattr(self, '_vecname', vector._vecname)
-            _setattr(self, '_bits', vector._bits.copy())
+            _setattr(self, '_bits', vector._bits)
         else:
             if not isinstance(vector, basestring):
                 raise TypeError("Vector must be a string key.")
-            
+
             _setattr(self, '_vecname', vector)
-            
+
             vector = bitvectors[vector]
             _setattr(self, '_vector', vector)
-            
+
             if not bits:
-                _setattr(self, '_bits', set())
+                _setattr(self, '_bits', 0)
+            elif isinstance(bits, (int, long)):
+                _setattr(self, '_bits', bits & vector.all)
             elif isinstance(bits, basestring):
                 _setattr(self, '_bits', _bits_from_string(vector, bits))
             else:
-                _setattr(self, '_bits', bits)
-    
+                _setattr(self, '_bits', _bits_from_iterable(vector, bits))
+
     def __contains__(self, key):
-        return key in self._bits
-    
+        try:
+            return self._bits & self._vector.masks[key] != 0
+        except KeyError:
+            return False
+
     def __getattr__(self, key):
         if key[0] == '_':
             raise AttributeError
-        
-        if not key in self._vector:
+
+        try:
+            return self._bits & self._vector.masks[key] != 0
+        except KeyError:
             raise AttributeError
-        
-        return key in self._bits
-    
+
     def __setattr__(self, key, val):
-        val = bool(val)
-        if not key in self._vector:
+        try:
+            mask = self._vector.masks[key]
+        except KeyError:
             raise AttributeError
-        
+
         if val:
-            self._bits.add(key)
-        elif key in self._bits:
-            self._bits.remove(key)
-    
+            _setattr(self, '_bits', self._bits | mask)
+        else:
+            _setattr(self, '_bits', self._bits & ~mask)
+
+    def __int__(self):
+        return self._bits
+
     def __str__(self):
-        return ', '.join(sorted(self._bits))
-    
+        return ', '.join(sorted(self._vector.names(self._bits)))
+
     def __repr__(self):
         return '<Bitvector(%s:%s)>' % (self._vecname, self.__str__())
-    
+
     def any(self):
-        return bool(self._bits)
-    
+        return self._bits != 0
+
     def clear(self):
-        _setattr(self, '_bits', set())
-    
+        _setattr(self, '_bits', 0)
+
     def copy(self):
         return self.__class__(self)
-    
+
     def setall(self, val):
         """
         Set all bits to either True or False.
         """
         if val:
-            _setattr(self, '_bits', set(self._vector))
+            _setattr(self, '_bits', self._vector.all)
         else:
-            _setattr(self, '_bits', set())
-    
+            _setattr(self, '_bits', 0)
+
+    def _other(self, b):
+        """
+        Return the bits of another Bitvector as an integer of this one's masks.
+        Bits of a different bitvector are matched by name.
+        """
+        if not isinstance(b, Bitvector):
+            return int(b) & self._vector.all
+        elif b._vector is self._vector:
+            return b._bits
+
+        masks = self._vector.masks
+        return sum(masks[bit] for bit in b._vector.names(b._bits)
+                   if bit in masks)
+
     def __and__(self, b):
-        return Bitvector(self._vecname, self._bits & b._bits)
-    
+        return Bitvector(self._vecname, self._bits & self._other(b))
+
     def __or__(self, b):
-        return Bitvector(self._vecname, self._bits | b._bits)
-    
+        return Bitvector(self._vecname, self._bits | self._other(b))
+
+###############################################################################
+# BitvectorIndex Class
+###############################################################################
+
+class _IndexedBitvector(Bitvector):
+    """
+    A Bitvector that reads and writes its bits from a row of a
+    :class:`BitvectorIndex`, keeping the index's columns up to date.
+    """
+    __slots__ = ('_index', '_slot')
+
+    def _get_bits(self):
+        return self._index._rows[self._slot]
+
+    def _set_bits(self, value):
+        self._index._set(self._slot, value)
+
+    _bits = property(_get_bits, _set_bits)
+
+    def copy(self):
+        return Bitvector(self)
+
+class _DetachedRow(object):
+    """
+    Storage for the bits of an :class:`_IndexedBitvector` after its entity is
+    removed from the index.
+    """
+    __slots__ = ('_vector', '_rows')
+
+    def __init__(self, vector, bits):
+        self._vector = vector
+        self._rows = [bits]
+
+    def _set(self, slot, value):
+        self._rows[slot] = value & self._vector.all
+
+class BitvectorIndex(object):
+    """
+    A columnar store of one bitvector for many entities, allowing queries such
+    as "every object with notake but not with glowing" to be answered without
+    looping over every entity in Python.
+
+    Every entity is assigned a slot. For each bit, the index keeps an integer
+    with one binary digit per slot, so a query is a handful of integer ANDs and
+    ORs across every entity at once. Entities are identified by any hashable
+    ID, typically their UID.
+
+    The :class:`Bitvector` returned by :func:`add` and :func:`get` is a view
+    of an entity's row. Changing it updates the index, and vice versa::
+
+        index = bitvectors.BitvectorIndex("obj_bits")
+        obj.bits = index.add(obj.uid, "notake")
+
+        uids = index.query(all="notake")
+    """
+
+    def __init__(self, vector):
+        if not isinstance(vector, basestring):
+            raise TypeError("Vector must be a string key.")
+
+        self._vecname = vector
+        self._vector = bitvectors[vector]
+
+        self._slots = {}
+        self._uids = []
+        self._rows = []
+        self._free = []
+        self._views = {}
+
+        self._columns = {}
+        self._present = 0
+
+    def __contains__(self, uid):
+        return uid in self._slots
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    def __len__(self):
+        return len(self._slots)
+
+    ##### Entities #############################################################
+
+    def add(self, uid, bits=None):
+        """
+        Add an entity to the index with the given bits, provided in any form
+        the :class:`Bitvector` constructor accepts, and return its view. If the
+        entity is already in the index, its bits are replaced.
+        """
+        if bits is None:
+            bits = 0
+        elif not isinstance(bits, (int, long)):
+            bits = int(Bitvector(self._vecname, bits))
+
+        if uid in self._slots:
+            self._set(self._slots[uid], bits)
+            return self._views[uid]
+
+        if self._free:
+            slot = self._free.pop()
+            self._uids[slot] = uid
+        else:
+            slot = len(self._rows)
+            self._uids.append(uid)
+            self._rows.append(0)
+
+        self._slots[uid] = slot
+        self._present |= 1 << slot
+
+        view = object.__new__(_IndexedBitvector)
+        _setattr(view, '_vecname', self._vecname)
+        _setattr(view, '_vector', self._vector)
+        _setattr(view, '_index', self)
+        _setattr(view, '_slot', slot)
+        self._views[uid] = view
+
+        self._set(slot, bits)
+        return view
+
+    def get(self, uid):
+        """
+        Return the view of the given entity's bits. Raises a KeyError if the
+        entity isn't in the index.
+        """
+        return self._views[uid]
+
+    def remove(self, uid):
+        """
+        Remove an entity from the index. Its view keeps the bits it had at the
+        time it was removed, but is no longer connected to the index.
+        """
+        slot = self._slots.pop(uid)
+        view = self._views.pop(uid)
+
+        bits = self._rows[slot]
+        self._set(slot, 0)
+
+        _setattr(view, '_index', _DetachedRow(view._vector, bits))
+        _setattr(view, '_slot', 0)
+
+        self._uids[slot] = None
+        self._present &= ~(1 << slot)
+        self._free.append(slot)
+
+    def _set(self, slot, value):
+        """
+        Set the bits of the entity in the given slot, updating the columns.
+        """
+        value &= self._vector.all
+        changed = self._rows[slot] ^ value
+        if not changed:
+            return
+
+        self._rows[slot] = value
+
+        flag = 1 << slot
+        columns = self._columns
+        for mask in _masks(changed):
+            columns[mask] = columns.get(mask, 0) ^ flag
+
+    ##### Queries ##############################################################
+
+    def _mask(self, bits):
+        if isinstance(bits, basestring):
+            return _bits_from_string(self._vector, bits)
+        return _bits_from_iterable(self._vector, bits)
+
+    def query(self, all=None, any=None, none=None):
+        """
+        Return a list of the IDs of every entity with all of the bits in
+        ``all``, at least one of the bits in ``any``, and none of the bits in
+        ``none``. Each argument may be a comma separated string or a list of
+        bit names.
+        """
+        columns = self._columns
+        result = self._present
+
+        if all:
+            for mask in _masks(self._mask(all)):
+                result &= columns.get(mask, 0)
+
+        if any:
+            found = 0
+            for mask in _masks(self._mask(any)):
+                found |= columns.get(mask, 0)
+            result &= found
+
+        if none:
+            for mask in _masks(self._mask(none)):
+                result &= ~columns.get(mask, 0)
+
+        return self._uids_from(result)
+
+    def count(self, all=None, any=None, none=None):
+        """
+        Return the number of entities matching a :func:`query`.
+        """
+        return len(self.query(all, any, none))
+
+    def _uids_from(self, result):
+        """
+        Convert an integer with one binary digit per slot into a list of IDs.
+        """
+        if not result:
+            return []
+
+        uids = self._uids
+        digits = bin(result)[:1:-1]
+        out = []
+
+        i = digits.find('1')
+        while i != -1:
+            out.append(uids[i])
+            i = digits.find('1', i + 1)
+
+        return out
+
 def create_bitvector(bitvector, *bits):
     """
     Create a new bitvector with the specified bits, or extend a previously
@@ -141,7 +455,7 @@ def create_bitvector(bitvector, *bits):
     ==========  ============
     """
     if not bitvector in bitvectors:
-        bitvectors[bitvector] = []
+        bitvectors[bitvector] = _BitList()
     
     if bits:
         bitvectors[bitvector].extend(bits)
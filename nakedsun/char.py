@@ -30,16 +30,135 @@ from . import auxiliary
 from . import bitvectors
 from . import hooks
 from . import logger as log
+from . import prototypes
+from . import registry
 
 ###############################################################################
 # Char Class
 ###############################################################################
 
 @auxiliary.register("character")
-class Char(auxiliary.AuxiliaryBase):
+class Char(prototypes.Instance):
     """
     This class represents a character in the NakedSun server, be that character
     a player character or an NPC. It is responsible for tracking any and all
     information on a character and interacting with that character.
+
+    The core state of a character is kept in slots. Other attributes may still
+    be set, and are stored in a dictionary created the first time one is.
+    Attributes it doesn't have are read from its prototype, as described in
+    :mod:`prototypes`.
+    """
+    _kind = "char"
+
+    __slots__ = ("_auxiliary", "_auxiliary_raw", "uid", "_prototype",
+                 "_location", "_contents", "_bits", "_socket", "user_groups",
+                 "__dict__", "__weakref__")
+
+    def __init__(self, uid=None, prototype=None):
+        self._auxiliary = None
+        self._auxiliary_raw = None
+
+        self.uid = uid
+        self._prototype = prototype
+        self._location = None
+        self._contents = None
+        self._bits = None
+        self._socket = None
+        self.user_groups = bitvectors.Bitvector("user_groups", "player")
+
+        # Things created from a prototype copy its auxiliary data as needed.
+        if prototypes.get(prototype) is None:
+            self._auxiliary_init()
+        registry.add(self)
+
+    @property
+    def prototype(self):
+        """ The key of the prototype this was created from, or None. """
+        return self._prototype
+
+    def __repr__(self):
+        return "<Char(%s)>" % (self.prototype or self.uid)
+
+    @property
+    def contents(self):
+        """ A list of the objects the character is carrying. """
+        return list(self._contents or ())
+
+    inv = contents
+
+    @property
+    def location(self):
+        """ The :class:`room.Room` the character is in, or None. Immutable. """
+        return self._location
+
+    def _get_room(self):
+        return self._location
+
+    def _set_room(self, room):
+        old = self._location
+        if old is room:
+            return
+        if old is not None:
+            old._remove_char(self)
+        self._location = room
+        if room is not None:
+            room._add_char(self)
+
+    room = property(_get_room, _set_room, doc="""
+        The :class:`room.Room` the character is in, or None. Setting it moves
+        the character.
+        """)
+
+    @property
+    def socket(self):
+        """
+        The :class:`mudsock.Mudsock` controlling the character, or None.
+        Immutable. See :func:`mudsys.attach_char_socket`.
+        """
+        return self._socket
+
+    sock = socket
+
+    @property
+    def is_pc(self):
+        """ Whether or not the character is controlled by a socket. """
+        return self._socket is not None
+
+    def _set_socket(self, sock):
+        self._socket = sock
+        if self._location is not None:
+            self._location._socket_changed(self)
+
+    def send(self, message, environ=None, newline=True):
+        """
+        Send a message to the character's socket, if it has one. See
+        :func:`mudsock.Mudsock.send`.
+        """
+        if self._socket is not None:
+            self._socket.send(message, environ, newline)
+
+###############################################################################
+# Public Functions
+###############################################################################
+
+def char_list():
+    """ Return a list of every character in the game. """
+    return registry.things("char")
+
+def count_mobs(key):
+    """ Return the number of characters created from the given prototype. """
+    return registry.count_instances(key)
+
+def load_mob(key, room=None):
+    """
+    Create a new character from the prototype with the given key, put it in
+    the room if one is provided, and return it. A KeyError is raised if there's
+    no such prototype.
     """
-    pass
+    if prototypes.get(key) is None:
+        raise KeyError("There is no prototype %r." % key)
+    ch = Char(prototype=key)
+    if room is not None:
+        ch.room = room
+    return ch
@@ -0,0 +1,436 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This module contains the command table, which maps what players type to the
+functions that handle it. Commands are added with :func:`mudsys.add_cmd`, in the
+same way as NakedMud::
+
+    mudsys.add_cmd("north", "n", cmd_move, "player", True)
+
+Commands may be abbreviated. When several commands start with what was typed,
+the one with the lowest ``sort_by`` string wins, so ``n`` always means
+``north`` even if there's a ``news`` command, unless the name typed exactly
+matches another command. Each command belongs to one or more user groups, and
+characters may only use commands of groups they're a member of.
+
+The table is a trie with one node per prefix of every command name. Each node
+keeps its candidate commands sorted by their ``sort_by`` string, so looking up
+a command takes time proportional to the length of what was typed rather than
+the number of commands.
+
+Checks, added with :func:`mudsys.add_cmd_check` or :func:`add_check`, run
+before a command and may prevent it by returning False. A check may apply to
+one command, to every command of a user group, or to every command. The checks
+that apply to each command are collected into one ordered chain the first time
+the command is used after the table or the checks change, and the user group
+of the character is tested before any check runs. The number of times each
+check ran and rejected a command, and the time it took, are available from
+:func:`check_stats`.
+
+Movement commands, added with :func:`mudsys.register_dflt_move_cmd`, call the
+function set with :func:`mudsys.set_cmd_move`, as does typing the name of an
+exit that isn't a command. Move checks, added with
+:func:`mudsys.register_move_check`, run before both.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import time
+from bisect import insort
+
+from . import bitvectors
+from . import logger as log
+
+###############################################################################
+# Storage
+###############################################################################
+
+_commands = {}
+_root = None
+_move = None
+_checks = []
+_move_chain = None
+
+###############################################################################
+# Command Class
+###############################################################################
+
+class Command(object):
+    """
+    A single entry in the command table.
+    """
+    __slots__ = ("name", "sort_by", "function", "group", "mask",
+                 "interrupts", "move", "chain", "_key")
+
+    def __init__(self, name, sort_by, function, group, interrupts=False,
+                 move=False):
+        self.name = name
+        self.sort_by = sort_by or name
+        self.function = function
+        self.group = group
+        self.mask = _group_mask(group)
+        self.interrupts = interrupts
+        self.move = move
+        self.chain = None
+        self._key = (self.sort_by, name)
+
+    def __lt__(self, other):
+        return self._key < other._key
+
+    def __repr__(self):
+        return "<Command(%s)>" % self.name
+
+    def allowed(self, groups):
+        """
+        Returns True if a character with the given user groups, as an integer
+        mask, :class:`bitvectors.Bitvector`, or comma separated string, may use
+        this command.
+        """
+        return not self.mask or bool(_user_mask(groups) & self.mask)
+
+class Check(object):
+    """
+    A function run before commands, along with statistics about it. A check
+    applies to the named command if ``command`` is set, to movement if
+    ``move`` is set, to the commands of the given user groups if ``mask`` is
+    set, and otherwise to every command.
+    """
+    __slots__ = ("function", "command", "mask", "move", "calls", "rejections",
+                 "errors", "time")
+
+    def __init__(self, function, command=None, group=None, move=False):
+        self.function = function
+        self.command = command and command.lower()
+        self.mask = _group_mask(group)
+        self.move = move
+        self.calls = self.rejections = self.errors = 0
+        self.time = 0.0
+
+    def __repr__(self):
+        return "<Check(%s)>" % getattr(self.function, "__name__", "?")
+
+    def applies(self, command):
+        if self.command:
+            return self.command == command.name
+        if self.move and not command.move:
+            return False
+        return not self.mask or bool(self.mask & command.mask)
+
+    def __call__(self, ch, cmd):
+        """
+        Run the check, returning True if the command may continue.
+        """
+        start = time.time()
+        try:
+            result = self.function(ch, cmd) is not False
+        except Exception:
+            self.errors += 1
+            result = False
+            log.exception("An error occurred while running a check for the "
+                          "command %r." % cmd)
+        self.time += time.time() - start
+        self.calls += 1
+        if not result:
+            self.rejections += 1
+        return result
+
+class _Node(object):
+    __slots__ = ("children", "commands", "exact")
+
+    def __init__(self):
+        self.children = {}
+        self.commands = []
+        self.exact = None
+
+###############################################################################
+# Helper Functions
+###############################################################################
+
+def _group_mask(group):
+    """
+    Convert a user group, or a comma separated list of groups, to a mask of the
+    user_groups bitvector. An empty group may be used by anyone.
+    """
+    if not group:
+        return 0
+    return int(bitvectors.Bitvector("user_groups", group))
+
+def _user_mask(groups):
+    """
+    Convert the user groups of a character to an integer mask. A string of
+    comma separated groups is accepted, as in NakedMud, and groups that don't
+    exist are ignored.
+    """
+    if isinstance(groups, basestring):
+        masks = bitvectors.bitvectors["user_groups"].masks
+        mask = 0
+        for word in groups.split(","):
+            mask |= masks.get(word.strip(), 0)
+        return mask
+    return int(groups or 0)
+
+def _compile(command):
+    """
+    Collect the checks that apply to a command into a tuple. Checks for every
+    command or for user groups run before the checks for the single command,
+    each in the order they were added.
+    """
+    return tuple([check for check in _checks if not check.command and
+                  check.applies(command)] +
+                 [check for check in _checks if check.command == command.name])
+
+def _invalidate():
+    global _move_chain
+    _move_chain = None
+    for command in _commands.itervalues():
+        command.chain = None
+
+def _rebuild():
+    global _root
+
+    _root = root = _Node()
+    for command in _commands.itervalues():
+        _insert(root, command)
+
+def _insert(root, command):
+    node = root
+    for char in command.name:
+        node = node.children.setdefault(char, _Node())
+        insort(node.commands, command)
+    node.exact = command
+
+def _remove(root, command):
+    node = root
+    path = []
+    for char in command.name:
+        path.append((node, char))
+        node = node.children[char]
+        node.commands.remove(command)
+    node.exact = None
+
+    # Prune the nodes no longer leading to any command.
+    for parent, char in reversed(path):
+        if parent.children[char].commands:
+            break
+        del parent.children[char]
+
+###############################################################################
+# The Command Table
+###############################################################################
+
+def add(name, sort_by, function, group, interrupts=False, move=False):
+    """
+    Add a command to the table, replacing any existing command with the same
+    name. See :func:`mudsys.add_cmd`. If move is True, move checks run before
+    the command.
+    """
+    name = name.lower()
+    command = Command(name, sort_by and sort_by.lower(), function, group,
+                      interrupts, move)
+
+    if _root is None:
+        _rebuild()
+    if name in _commands:
+        _remove(_root, _commands[name])
+
+    _commands[name] = command
+    _insert(_root, command)
+    return command
+
+def remove(name):
+    """
+    Remove the command with the given name. Returns the removed command, or
+    None if there was no such command.
+    """
+    command = _commands.pop(name.lower(), None)
+    if command and _root is not None:
+        _remove(_root, command)
+    return command
+
+def get(name):
+    """
+    Return the command with exactly the given name, or None.
+    """
+    return _commands.get(name.lower())
+
+def find(text, groups=None):
+    """
+    Return the command that the given text, the first word typed by a
+    character, refers to. If groups is provided, only commands usable by those
+    user groups are considered. Returns None if there's no such command.
+    """
+    if _root is None:
+        return None
+
+    node = _root
+    for char in text.lower():
+        node = node.children.get(char)
+        if node is None:
+            return None
+
+    if groups is None:
+        return node.exact or (node.commands[0] if node.commands else None)
+    groups = _user_mask(groups)
+
+    exact = node.exact
+    if exact and exact.allowed(groups):
+        return exact
+
+    for command in node.commands:
+        if command.allowed(groups):
+            return command
+
+def commands():
+    """
+    Return a list of every command, sorted by name.
+    """
+    return sorted(_commands.itervalues(), key=lambda command: command.name)
+
+def registered(module=None):
+    """
+    Return a list of the commands whose functions are defined in the given
+    module, or every command if no module is provided.
+    """
+    return [command for command in _commands.itervalues() if module is None or
+            getattr(command.function, "__module__", None) == module]
+
+def add_check(function, command=None, group=None, move=False):
+    """
+    Add a check to run before the named command, before every command of the
+    given user group, or, if neither is provided, before every command. If
+    move is True, the check only runs before movement. Check functions take
+    the character and the name of the command, and return False to prevent the
+    command. Returns the :class:`Check`.
+    """
+    check = Check(function, command, group, move)
+    _checks.append(check)
+    _invalidate()
+    return check
+
+def remove_check(function):
+    """
+    Remove every check that runs the given function.
+    """
+    _checks[:] = [check for check in _checks if check.function != function]
+    _invalidate()
+
+def registered_checks(module=None):
+    """
+    Return a list of the checks whose functions are defined in the given
+    module, or every check if no module is provided.
+    """
+    return [check for check in _checks if module is None or
+            getattr(check.function, "__module__", None) == module]
+
+def check_stats():
+    """
+    Return a list of dictionaries with the statistics of every check, in the
+    order they were added. Times are in seconds.
+    """
+    return [{
+        "function": getattr(check.function, "__name__", repr(check.function)),
+        "module": getattr(check.function, "__module__", None),
+        "command": check.command,
+        "calls": check.calls,
+        "rejections": check.rejections,
+        "errors": check.errors,
+        "time": check.time,
+        } for check in _checks]
+
+def set_move(function):
+    """
+    Set the function used when what a character typed isn't a command. See
+    :func:`mudsys.set_cmd_move`.
+    """
+    global _move
+    _move = function
+
+def move(ch, cmd, arg):
+    """
+    The command function of movement commands, which calls the function set
+    with :func:`set_move`.
+    """
+    if _move is not None:
+        _move(ch, cmd, arg)
+
+###############################################################################
+# Running Commands
+###############################################################################
+
+def parse(text):
+    """
+    Split the text typed by a character into a command and its argument. A
+    leading symbol, such as the ``'`` of ``'hello``, is a command by itself.
+    """
+    text = text.strip()
+    if not text:
+        return "", ""
+
+    if not text[0].isalnum():
+        return text[0], text[1:].lstrip()
+
+    cmd, _, arg = text.partition(" ")
+    return cmd, arg.lstrip()
+
+def _run_checks(chain, ch, cmd):
+    for check in chain:
+        if not check(ch, cmd):
+            return False
+    return True
+
+def do_cmd(ch, text):
+    """
+    Run the command the given character typed. Returns True if a command was
+    found.
+    """
+    global _move_chain
+
+    cmd, arg = parse(text)
+    if not cmd:
+        return False
+
+    command = find(cmd, getattr(ch, "user_groups", 0))
+    if command is None:
+        if not _move:
+            return False
+
+        # Typing the name of an exit is movement, so run the move checks.
+        room = getattr(ch, "room", None)
+        if room is not None and room.exit(cmd.lower()) is not None:
+            if _move_chain is None:
+                _move_chain = tuple(check for check in _checks
+                                    if check.move)
+            if not _run_checks(_move_chain, ch, cmd):
+                return True
+        return bool(_move(ch, cmd, arg))
+
+    chain = command.chain
+    if chain is None:
+        chain = command.chain = _compile(command)
+
+    if not _run_checks(chain, ch, command.name):
+        return True
+
+    try:
+        command.function(ch, command.name, arg)
+    except Exception:
+        log.exception("An error occurred while running the command %r." %
+                      command.name)
+    return True
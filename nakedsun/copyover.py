@@ -0,0 +1,230 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This module implements copyovers, which replace the running server process
+with a fresh one without disconnecting anybody. The state of every connection
+is written to a file and the server executes itself again, passing the file
+to the new process with the hidden ``--copyover`` argument. The listening and
+client sockets are inherited by the new process, which rebuilds a
+:class:`mudsock.Mudsock` for every connection once the MUD library has been
+loaded.
+
+Input handlers can't be carried across a copyover. Instead, the new process
+runs the ``copyover_recover`` hook with each recovered Mudsock and its saved
+information, including the name of its input handler state, so modules can
+push the appropriate input handlers again. Modules may store additional
+information for each connection from the ``copyover_save`` hook.
+
+Telnet option state isn't carried across a copyover either. Nothing in the
+core tracks which options have been negotiated, as
+:class:`network.SimpleTelnet` leaves ``on_option`` to the underlying
+connection, so the new process knows nothing of them. Modules that negotiate telnet options must record the
+result themselves and save it from the ``copyover_save`` hook, then restore it
+from ``copyover_recover``.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import json
+import os
+import socket
+import sys
+
+from pants.engine import Engine
+
+from . import hooks
+from . import logger as log
+from . import mudsock
+from . import network
+from . import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+###############################################################################
+# Storage and Constants
+###############################################################################
+
+STATE_FILE = "copyover.json"
+
+###############################################################################
+# Helper Functions
+###############################################################################
+
+def _inheritable(fd):
+    """
+    Make sure the given file descriptor will survive an exec.
+    """
+    if fcntl:
+        flags = fcntl.fcntl(fd, fcntl.F_GETFD)
+        fcntl.fcntl(fd, fcntl.F_SETFD, flags & ~fcntl.FD_CLOEXEC)
+
+def _strip_argument(argv, name):
+    """
+    Return a copy of argv without any occurrences of the named argument and
+    its value.
+    """
+    out = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == name:
+            skip = True
+        elif not arg.startswith(name + "="):
+            out.append(arg)
+    return out
+
+###############################################################################
+# Copyover
+###############################################################################
+
+def save(path=STATE_FILE):
+    """
+    Write the state of the listening servers and every connected Mudsock to
+    the given file, making their file descriptors inheritable. Returns the
+    state that was written.
+    """
+    state = {
+        "last_uid": mudsock.Mudsock._last_uid,
+        "listeners": network.listeners(),
+        "sockets": [],
+        }
+
+    for fd, family in state["listeners"].itervalues():
+        _inheritable(fd)
+
+    for sock in mudsock.socket_gen():
+        con = sock._connection
+        if not con or not con.connected or con.fileno is None:
+            continue
+
+        info = sock._copyover_state()
+        info["fd"] = con.fileno
+        info["family"] = con._socket.family
+
+        try:
+            hooks.run("copyover_save", sock, info)
+            _inheritable(info["fd"])
+        except Exception:
+            log.exception("Unable to save connection #%d for the copyover." %
+                          sock.uid)
+            continue
+
+        state["sockets"].append(info)
+
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        json.dump(state, f)
+    os.rename(temp, path)
+
+    return state
+
+def perform(argv, lib):
+    """
+    Perform a copyover, replacing this process with a new instance of the
+    server started with the provided arguments. ``lib`` is the absolute path
+    to the MUD library. This function only returns if the state of the server
+    couldn't be saved, in which case an exception is raised.
+    """
+    log.info(u"Beginning copyover.")
+    hooks.run("copyover")
+
+    # Send any pending output before handing the connections over.
+    for sock in mudsock.socket_gen():
+        sock._perform_write()
+    try:
+        Engine.instance().poll(0)
+    except Exception:
+        pass
+
+    path = os.path.join(lib, STATE_FILE)
+    state = save(path)
+    settings.flush()
+
+    argv = _strip_argument(_strip_argument(argv, "--copyover"), "--path")
+    argv = [sys.executable] + argv + ["--path", lib, "--copyover", path]
+
+    log.info(u"Saved %d connection%s. Executing: %s" % (len(state["sockets"]),
+             "" if len(state["sockets"]) == 1 else "s", " ".join(argv)))
+    log.shutdown()
+
+    try:
+        os.execv(sys.executable, argv)
+    except OSError as err:
+        sys.stderr.write("Copyover failed: %s\n" % err)
+        sys.exit(1)
+
+###############################################################################
+# Copyover Recovery
+###############################################################################
+
+def load(path):
+    """
+    Load and delete the state file written by a copyover. Returns None if the
+    file can't be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            state = json.load(f)
+    except (IOError, ValueError):
+        log.exception("Unable to read the copyover file: %s" % path)
+        return None
+
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+    return state
+
+def recover(state):
+    """
+    Rebuild a Mudsock for every connection in the state loaded by
+    :func:`load`. Returns the number of connections recovered.
+    """
+    mudsock.Mudsock._last_uid = max(mudsock.Mudsock._last_uid,
+                                    state.get("last_uid", 0))
+
+    count = 0
+    for info in state.get("sockets", ()):
+        fd = info["fd"]
+        try:
+            sock = socket.fromfd(fd, info["family"], socket.SOCK_STREAM)
+        except (socket.error, OSError):
+            log.exception("Unable to recover connection #%d." % info["uid"])
+            continue
+        finally:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+        try:
+            network.recover_connection(sock, info)
+            count += 1
+        except Exception:
+            log.exception("Unable to recover connection #%d." % info["uid"])
+
+    log.info(u"Recovered %d connection%s from the copyover." %
+             (count, "" if count == 1 else "s"))
+    return count
@@ -27,13 +27,18 @@ basic servers.
 
 import os
 import argparse
+import json
+import multiprocessing
+import py_compile
 import signal
+import subprocess
 import sys
 
 import pants
 
 import nakedsun
 import nakedsun.logger as log
+from nakedsun.timeline import Timeline
 
 try:
     import pwd
@@ -169,6 +174,110 @@ def assume_uid(uid, gid, umask):
         old = os.umask(umask)
         log.info("Assuming the umask %04o (old was %04o)." % (umask, old))
 
+def _compile(path):
+    """
+    Byte-compile a single file, returning an error message if it fails.
+    """
+    try:
+        py_compile.compile(path, doraise=True)
+    except py_compile.PyCompileError as err:
+        return err.msg
+    except (IOError, OSError) as err:
+        return "%s: %s" % (path, err)
+
+# The worker processes of precompile are new interpreters running this script
+# rather than forks of the server, so they don't inherit the log listener
+# thread or any sockets. Paths are read from stdin, and a list of errors is
+# written to stdout as JSON.
+_COMPILE_WORKER = """
+import json, py_compile, sys
+errors = []
+for path in sys.stdin.read().splitlines():
+    try:
+        py_compile.compile(path, doraise=True)
+    except py_compile.PyCompileError as err:
+        errors.append(err.msg)
+    except (IOError, OSError) as err:
+        errors.append("%s: %s" % (path, err))
+json.dump(errors, sys.stdout)
+"""
+
+def _compile_in_workers(paths, processes):
+    """
+    Byte-compile the given files with the given number of worker processes,
+    returning a list of error messages.
+    """
+    args = [sys.executable]
+    if not __debug__:
+        args.append("-O")
+    args.extend(["-c", _COMPILE_WORKER])
+
+    # Give every worker all of its paths before reading any output, so they
+    # run at the same time. The workers only write once they've read all of
+    # their input, so this can't fill a pipe.
+    workers = []
+    for i in xrange(processes):
+        chunk = paths[i::processes]
+        if not chunk:
+            continue
+        worker = subprocess.Popen(args, stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE, close_fds=True)
+        worker.stdin.write("\n".join(chunk))
+        worker.stdin.close()
+        workers.append(worker)
+
+    errors = []
+    for worker in workers:
+        out = worker.stdout.read()
+        worker.stdout.close()
+        worker.wait()
+        try:
+            errors.extend(json.loads(out))
+        except ValueError:
+            errors.append(u"A compile worker exited with code %d." %
+                          worker.returncode)
+
+    return errors
+
+def precompile(path, processes=None):
+    """
+    Byte-compile every Python file within path whose compiled file is missing
+    or older than the source, using several worker processes. By default, one
+    process is used per CPU. Returns the number of files that were compiled.
+    """
+    ext = "c" if __debug__ else "o"
+    stale = []
+
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for fn in files:
+            if fn.startswith(".") or not fn.endswith(".py"):
+                continue
+            full = os.path.join(root, fn)
+            try:
+                if os.path.getmtime(full + ext) >= os.path.getmtime(full):
+                    continue
+            except OSError:
+                pass
+            stale.append(full)
+
+    if not stale:
+        return 0
+
+    if not processes:
+        processes = multiprocessing.cpu_count()
+
+    if processes == 1 or len(stale) == 1:
+        errors = map(_compile, stale)
+    else:
+        errors = _compile_in_workers(stale, processes)
+
+    for error in errors:
+        if error:
+            log.warning(u"Unable to compile: %s" % error)
+
+    return len(stale)
+
 def inject(name, module):
     """
     Inject a module into sys.modules with the given name.
@@ -200,6 +309,27 @@ def main():
     parser.add_argument("--path", dest="lib", default="lib", metavar="PATH",
                         help="Load the MUD library from PATH.")
     parser.add_argument("--copyover", help=argparse.SUPPRESS)
+    parser.add_argument("--handoff", dest="handoff", nargs="?",
+                        const="handoff.sock", default=None, metavar="PATH",
+                        help=u"Take over the listening sockets of the server "
+                             u"serving the Unix socket at PATH, relative to "
+                             u"the MUD library, then serve PATH for the next "
+                             u"server. (Default: handoff.sock)")
+    parser.add_argument("--precompile", dest="precompile", nargs="?",
+                        const=0, default=None, type=int, metavar="PROCESSES",
+                        help=u"Byte-compile the MUD library's Python modules "
+                             u"with PROCESSES workers before importing them."
+                             u" By default, one process is used per CPU.")
+    parser.add_argument("--lazy", default=None, action="store_true",
+                        help=u"Don't import the MUD library's Python modules "
+                             u"listed in pymodules/manifest.json until they "
+                             u"are needed.")
+    parser.add_argument("--profile-boot", dest="profile", nargs="?",
+                        const="boot_profile.json", default=None,
+                        metavar="PATH",
+                        help=u"Log how long each step of starting the server "
+                             u"took, and save the timings to PATH, relative to "
+                             u"the MUD library, as JSON.")
 
     # Network Options
     group = parser.add_argument_group(
@@ -223,6 +353,15 @@ def main():
         help=u"Only log messages of LEVEL or higher. (Default: INFO)")
     group.add_argument("--no-color", default=True, action="store_false",
         dest="color", help=u"Disable console output colorization.")
+    group.add_argument("--json-log", default=None, metavar="PATH",
+        help=u"Also write log records to PATH, relative to the MUD library, as"
+             u" JSON lines.")
+    group.add_argument("--json-sample", default=None, metavar="RATES",
+        help=u"Only write a fraction of the JSON log records of each level, "
+             u"for example: DEBUG=0.01,INFO=0.5")
+    group.add_argument("--json-level", default=None, metavar="LEVEL",
+        help=u"Write JSON log records of LEVEL or higher. This may be lower "
+             u"than --level, usually with --json-sample. (Default: --level)")
 
     # UID/GID Manipulation
 
@@ -249,14 +388,24 @@ def main():
     # Finally, parse the arguments.
     args = parser.parse_args()
 
+    # Record how long each step of starting up takes.
+    timeline = Timeline()
+
+    # Keep the arguments for copyovers, with an absolute path to the script.
+    argv = [os.path.abspath(sys.argv[0])] + sys.argv[1:]
+
     ## Logging
 
-    log.initialize(args.color, args.level, os.path.join(args.lib, args.log))
+    timeline.phase("logging")
+    json_path = args.json_log and os.path.join(args.lib, args.json_log)
+    log.initialize(args.color, args.level, os.path.join(args.lib, args.log),
+                   json_path=json_path, sampling=args.json_sample,
+                   json_level=args.json_level)
     log.naked(u"NakedSun v%s by Stendec <me@stendec.me>" % nakedsun.version)
 
     ## Enter the MUD Library
 
-    path = os.path.realpath(args.lib)
+    path = lib = os.path.realpath(args.lib)
     if not os.path.exists(path) or not (
             os.path.exists(os.path.join(path, 'muddata')) or
             os.path.exists(os.path.join(path, 'config'))):
@@ -270,31 +419,58 @@ def main():
 
     ## Load Configuration
 
+    timeline.phase("settings")
     log.info(u"Loading MUD configuration from file.")
     nakedsun.settings.initialize()
 
+    if nakedsun.settings.get("lazy_auxiliary"):
+        log.info(u"Enabling lazy auxiliary data initialization.")
+        nakedsun.auxiliary.lazy = True
+
+    ## Copyover State
+
+    recovery = None
+    if args.copyover:
+        from . import copyover
+        recovery = copyover.load(args.copyover)
+
     ## Networking Initialization
 
+    timeline.phase("network")
     log.info(u"Initializing the network.")
 
     from . import network
-    network.initialize(args.addr, args.http_addr)
+    listeners = recovery and recovery.get("listeners")
+
+    # Take over the listening sockets of a running server, if there is one.
+    handoff = args.handoff or nakedsun.settings.get("handoff_socket")
+    if handoff and not listeners:
+        try:
+            listeners = network.receive_listeners(handoff)
+        except Exception:
+            log.exception("Unable to receive the listening sockets from the "
+                          "running server.")
+
+    network.initialize(args.addr, args.http_addr, listeners)
 
     ## Early UID/GID Manipulation
 
     if do_uid and args.early:
+        timeline.phase("assume_uid")
         assume_uid(args.uid, args.gid, args.umask)
 
     ## NakedMud Compatibility
 
+    timeline.phase("nmcompat")
     if nakedsun.settings.get("nakedmud_compatible"):
         log.info("Loading NakedMud Compatibility Layer.")
         from . import nmcompat
 
     # Inject a series of modules into sys.modules for NakedMud compatibility.
+    timeline.phase("inject")
     log.info(u"Injecting global modules for NakedMud compatibility.")
     for module in ("account", "auxiliary", "bitvectors", "char", "event",
-                   "hooks", "mudsock", "mud", "mudsys", "obj", "room",
+                   "exit", "hooks", "mudsock", "mud", "mudsys", "obj", "room",
                    "storage"):
         inject(module, getattr(nakedsun, module))
 
@@ -308,16 +484,42 @@ def main():
         log.shutdown()
         sys.exit(1)
 
+    # Byte-compile stale modules in parallel before importing them serially.
+    if args.precompile is None:
+        args.precompile = nakedsun.settings.get("precompile_pymodules")
+        if args.precompile is True:
+            args.precompile = 0
+
+    if args.precompile is not None and args.precompile is not False:
+        timeline.phase("precompile")
+        count = precompile("pymodules", args.precompile)
+        log.info(u"Compiled %d Python module%s." %
+                 (count, "" if count == 1 else "s"))
+
+    timeline.phase("pymodules")
+
     # Either load pymodules as a module or load its contents.
     if os.path.exists(os.path.join("pymodules", "__init__.py")):
         log.debug("Importing module: pymodules")
-        import pymodules
+        with timeline.measure("pymodules"):
+            import pymodules
 
     else:
         log.debug("pymodules is not a package. Entering directory.")
         path = os.path.abspath("pymodules")
         sys.path.insert(0, path)
 
+        # Modules in the manifest may be loaded lazily.
+        manifest = {}
+        if args.lazy or nakedsun.settings.get("lazy_pymodules"):
+            from . import lazy
+            try:
+                manifest = lazy.load_manifest(path)
+            except ValueError:
+                log.exception("Unable to load the module manifest.")
+                log.shutdown()
+                sys.exit(1)
+
         # Scan through.
         for fn in sorted(os.listdir("pymodules")):
             full = os.path.join(path, fn)
@@ -333,20 +535,31 @@ def main():
             if fn.endswith(".py"):
                 fn = fn[:-3]
 
+            if fn in manifest:
+                log.debug("Deferring import of module: %s" % fn)
+                lazy.register(fn, manifest[fn])
+                continue
+
             # Log a message, and then load the module.
             log.debug("Importing module: %s" % fn)
 
             try:
-                nakedsun.mudsys.pymodules[fn] = __import__(fn)
+                with timeline.measure(fn):
+                    nakedsun.mudsys.pymodules[fn] = __import__(fn)
             except Exception:
                 log.exception("An error occurred when attempting to import "
                               "Python module: %s (%s)" % (fn, full))
                 log.shutdown()
                 sys.exit(1)
 
+            log.debug("Imported module %s in %.2f ms." %
+                      (fn, timeline.entries[-1]["duration"] * 1000))
+
     ## Copyover Recovery
 
-    log.todo("Copyover Recovery.")
+    if recovery:
+        timeline.phase("copyover_recovery")
+        copyover.recover(recovery)
 
     ## Register Signals
 
@@ -356,14 +569,45 @@ def main():
     ## Late UID/GID Manipulation
 
     if do_uid and not args.early:
+        timeline.phase("assume_uid")
         assume_uid(args.uid, args.gid, args.umask)
 
+    timeline.end()
+
+    ## Boot Profile
+
+    # The report is written in full, however long it is.
+    if args.profile:
+        log.info(u"Started in %.2f ms. Slowest steps:" %
+                 (timeline.total * 1000), extra={"unlimited": True})
+        for line in timeline.report():
+            log.info(line, extra={"unlimited": True})
+
+        try:
+            timeline.save(args.profile)
+            log.info(u"Saved the boot profile to: %s" %
+                     os.path.realpath(args.profile))
+        except IOError as err:
+            log.error(u"Unable to save the boot profile to %r: %s" %
+                      (args.profile, err))
+
+    ## Listener Handoff
+
+    if handoff:
+        network.handoff_ready()
+        try:
+            network.serve_handoff(handoff)
+        except Exception:
+            log.exception("Unable to serve the handoff socket at: %s" %
+                          handoff)
+
     ## The Event Loop
 
     log.info(u"Entering the game loop.")
     log.line()
 
     begin_copyover = False
+    nakedsun.pulse.start()
 
     try:
         pants.engine.start()
@@ -374,14 +618,20 @@ def main():
     except KeyboardInterrupt:
         print ''
 
+    nakedsun.pulse.stop()
     log.line()
 
     if begin_copyover:
-        log.todo("Copyover.")
+        from . import copyover
+        try:
+            copyover.perform(argv, lib)
+        except Exception:
+            log.exception("Unable to perform the copyover. Shutting down.")
 
     ## Cleanup
 
     nakedsun.hooks.run("shutdown")
+    nakedsun.settings.flush()
 
     log.info(u"Exiting normally.")
     log.shutdown()
@@ -0,0 +1,84 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This module contains the Exit class, representing the exits connecting rooms.
+Exits are created with :func:`room.Room.dig` and removed with
+:func:`room.Room.fill`.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+from . import auxiliary
+from . import hooks
+from . import logger as log
+
+###############################################################################
+# Exit Class
+###############################################################################
+
+@auxiliary.register("exit")
+class Exit(auxiliary.AuxiliaryBase):
+    """
+    An exit leading from one room to another in a single direction. The
+    direction may be a compass direction or any other name, such as
+    ``"portal"``.
+    """
+
+    def __init__(self, room, dir, dest):
+        self._room = room
+        self._dir = dir
+        self._dest = dest
+
+        self.is_closable = False
+        self.is_closed = False
+        self.is_locked = False
+        self.key = None
+        self.keywords = ""
+        self.opposite = None
+        self.leave_mssg = ""
+        self.enter_mssg = ""
+
+        self._auxiliary_init()
+
+    def __repr__(self):
+        return "<Exit(%s)>" % self._dir
+
+    @property
+    def dir(self):
+        """ The direction of the exit within its room. Immutable. """
+        return self._dir
+
+    @property
+    def room(self):
+        """ The :class:`room.Room` the exit leads out of. Immutable. """
+        return self._room
+
+    def _get_dest(self):
+        return self._dest
+
+    def _set_dest(self, dest):
+        self._dest = dest
+        if self._room is not None:
+            self._room._exits_changed()
+
+    dest = property(_get_dest, _set_dest, doc="""
+        The :class:`room.Room` the exit leads to. Changing it updates the room
+        graph.
+        """)
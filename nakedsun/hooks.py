@@ -34,7 +34,8 @@ from . import logger as log
 _hook_table = {}
 _hook_priorities = {}
 
-__all__ = ['hook', 'add', 'remove', 'run', 'build_info', 'parse_info']
+__all__ = ['hook', 'add', 'remove', 'run', 'registered', 'build_info',
+           'parse_info']
 
 ###############################################################################
 # The Decorators
@@ -187,6 +188,29 @@ def remove(hook, function):
 
     return False
 
+def registered(module=None):
+    """
+    Return a list of ``(hook, function, priority)`` tuples for every registered
+    hook function. If a module name is provided, only functions defined in that
+    module are returned. The functions returned are the ones originally passed
+    to :func:`hooks.add`, and can be passed to :func:`hooks.remove`.
+
+    =========  ============
+    Argument   Description
+    =========  ============
+    module     *Optional.* The name of the module to return functions for.
+    =========  ============
+    """
+    out = []
+    for hook, priorities in _hook_priorities.iteritems():
+        for priority, function_list in priorities.iteritems():
+            for fn in function_list:
+                fn = getattr(fn, 'hooked_for', fn)
+                if module is None or \
+                        getattr(fn, '__module__', None) == module:
+                    out.append((hook, fn, priority))
+    return out
+
 def run(hook, *args, **kwargs):
     """
     Execute all of the functions registered with the given hook. This function
@@ -232,7 +256,7 @@ def run(hook, *args, **kwargs):
             raise
         except Exception:
             log.exception("An error occurred while running a function for "
-                          "the hook %r." % hook)
+                          "the hook %r." % hook, extra={"hook": hook})
 
 ###############################################################################
 # build_info and parse_info
@@ -0,0 +1,198 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This module allows Python modules in the MUD library to be imported the first
+time they're needed rather than when the server starts. Lazy loading is enabled
+with the ``lazy_pymodules`` setting or the ``--lazy`` command line argument,
+and applies to every module listed in ``pymodules/manifest.json``. Each entry
+in the manifest declares the hooks and commands the module provides::
+
+    {
+        "olc": {
+            "hooks": ["char_to_game"],
+            "commands": [
+                {"name": "redit", "function": "cmd_redit", "group": "builder"},
+                "zedit"
+            ]
+        }
+    }
+
+Commands may be given as just a name, in which case the function is assumed to
+be ``cmd_<name>`` and the group ``player``.
+
+Lightweight stubs are registered for each hook and command. When a stub is
+used, the real module is imported. As the module registers its own hook
+functions and commands, the stubs are removed.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import json
+import os
+
+from . import hooks
+from . import logger as log
+from . import mudsys
+
+###############################################################################
+# Storage and Constants
+###############################################################################
+
+MANIFEST = "manifest.json"
+
+_modules = {}
+
+###############################################################################
+# LazyModule Class
+###############################################################################
+
+class LazyModule(object):
+    """
+    A module that has not been imported yet, along with the stubs registered on
+    its behalf.
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.module = None
+        self.failed = False
+
+        self.hooks = {}
+        for hook in spec.get("hooks", ()):
+            self.hooks[hook] = self._hook_stub(hook)
+            hooks.add(hook, self.hooks[hook], old_style=False)
+
+        self.commands = []
+        for cmd in spec.get("commands", ()):
+            if isinstance(cmd, basestring):
+                cmd = {"name": cmd}
+
+            name = cmd["name"]
+            function = cmd.get("function", "cmd_%s" % name)
+            self.commands.append(name)
+
+            mudsys.add_cmd(name, cmd.get("sort_by"),
+                           self._command_stub(function),
+                           cmd.get("group", "player"),
+                           cmd.get("interrupts", False))
+
+    def __repr__(self):
+        return "<LazyModule(%s)>" % self.name
+
+    def load(self):
+        """
+        Import the module, if it hasn't been imported already, and remove the
+        hook stubs. Returns the module, or None if it couldn't be imported.
+        """
+        if self.module or self.failed:
+            return self.module
+
+        for hook, stub in self.hooks.iteritems():
+            hooks.remove(hook, stub)
+
+        try:
+            self.module = __import__(str(self.name))
+        except Exception:
+            self.failed = True
+            log.exception("An error occurred when attempting to import "
+                          "Python module: %s" % self.name)
+            return None
+
+        mudsys.pymodules[self.name] = self.module
+        return self.module
+
+    def _hook_stub(self, hook):
+        def stub(*args, **kwargs):
+            before = hooks._hook_table.get(hook, [])[:]
+            if not self.load():
+                return
+
+            # The module's functions were added to the hook while it was
+            # already running, so run them here, the same way hooks.run does.
+            for function in hooks._hook_table.get(hook, ())[:]:
+                if function in before:
+                    continue
+                try:
+                    function(*args, **kwargs)
+                except (StopIteration, SystemExit):
+                    raise
+                except Exception:
+                    log.exception("An error occurred while running a function "
+                                  "for the hook %r." % hook,
+                                  extra={"hook": hook})
+
+        stub.func_name = str("lazy_%s_%s" % (self.name, hook))
+        return stub
+
+    def _command_stub(self, function):
+        def stub(ch, cmd, arg):
+            module = self.load()
+            if module:
+                return getattr(module, function)(ch, cmd, arg)
+
+        stub.func_name = str("lazy_%s_%s" % (self.name, function))
+        return stub
+
+###############################################################################
+# Public Functions
+###############################################################################
+
+def load_manifest(path):
+    """
+    Load the manifest in the provided directory, returning a dictionary of
+    module names to specifications. Returns an empty dictionary if there isn't
+    a manifest.
+    """
+    path = os.path.join(path, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "rb") as f:
+        manifest = json.load(f)
+
+    if not isinstance(manifest, dict):
+        raise ValueError("The module manifest must be a JSON object.")
+
+    return manifest
+
+def register(name, spec):
+    """
+    Register stubs for the hooks and commands that the named module provides,
+    and defer importing it until one of them is used.
+    """
+    if name in _modules:
+        return _modules[name]
+
+    _modules[name] = module = LazyModule(name, spec)
+    return module
+
+def load(name):
+    """
+    Import the named lazy module immediately, returning the module.
+    """
+    return _modules[name].load()
+
+def pending():
+    """
+    Returns a list of the names of the lazy modules that haven't been imported
+    yet.
+    """
+    return sorted(name for name, module in _modules.iteritems()
+                  if not module.module and not module.failed)
@@ -19,26 +19,50 @@
 This module creates a centralized logger for NakedSun and initializes the
 logging system. It also provides a logging formatter with support for ANSI
 color sequences to make logs a bit prettier in the console.
+
+Log records are passed through a queue to a listener thread that owns the
+actual console and file handlers, so logging never blocks the game loop on
+IO. The listener collapses repeated messages and limits how many records per
+second are written.
+
+Optionally, records can also be written as JSON lines for log collectors, with
+per-level sampling to keep high volume levels down to a fraction of records.
 """
 
 ###############################################################################
 # Imports
 ###############################################################################
 
+import atexit
+import json
 import logging
 import logging.handlers
 import os
-import subprocess
+import Queue
+import random
+import struct
 import sys
+import threading
 import time
+import traceback
 
 ###############################################################################
 # Storage and Constants
 ###############################################################################
 
 _log = None
+_listener = None
 _width = 80
 
+# The maximum number of records the listener writes per second. Records of
+# CRITICAL level, and records logged with extra={"unlimited": True}, such as
+# reports that must be written in full, are never dropped.
+RATE_LIMIT = 100
+
+# The maximum number of records waiting to be written. Records logged while
+# the queue is full are dropped.
+QUEUE_SIZE = 10000
+
 critical = debug = error = exception = info = warning = log = None
 
 DEPRECIATED = logging.INFO - 1
@@ -82,15 +106,337 @@ class ColoredFormatter(logging.Formatter):
             record.levelname = level_color
         return logging.Formatter.format(self, record)
 
+###############################################################################
+# JSON Handler
+###############################################################################
+
+def _parse_sampling(sampling):
+    """
+    Parse sampling rates from a string such as ``"DEBUG=0.01,INFO=0.5"`` into
+    a dictionary of level numbers to rates.
+    """
+    if not sampling:
+        return {}
+    if isinstance(sampling, dict):
+        return sampling
+
+    out = {}
+    for part in sampling.split(","):
+        level, _, rate = part.partition("=")
+        level = level.strip().upper()
+        try:
+            level = int(level)
+        except ValueError:
+            level = logging.getLevelName(level)
+            if not isinstance(level, int):
+                raise ValueError("No such log level %r." % part)
+        out[level] = float(rate)
+    return out
+
+class JSONHandler(logging.FileHandler):
+    """
+    This handler writes records to a file as JSON objects, one per line. In
+    addition to the time, level, logger, module, and message, the ``hook``,
+    ``socket``, and ``elapsed`` attributes are included when a record has
+    them. Provide them with the ``extra`` argument of the logging functions::
+
+        log.info("Saved the world.", extra={"elapsed": 0.53})
+
+    Sampling rates from 0 to 1 may be provided for each level, in which case
+    only that fraction of records of the level is written. Records that aren't
+    sampled are never formatted.
+    """
+
+    FIELDS = ("hook", "socket", "elapsed")
+
+    def __init__(self, filename, sampling=None):
+        logging.FileHandler.__init__(self, filename, "a", "utf8")
+        self.sampling = _parse_sampling(sampling)
+
+    def sample(self, record):
+        """
+        Decide whether or not a record should be written.
+        """
+        if getattr(record, "unlimited", False):
+            return True
+        rate = self.sampling.get(record.levelno)
+        return rate is None or rate >= 1 or random.random() < rate
+
+    def handle(self, record):
+        sampled = getattr(record, "sampled", None)
+        if sampled is None:
+            sampled = self.sample(record)
+        if not sampled:
+            return 0
+        return logging.FileHandler.handle(self, record)
+
+    def format(self, record):
+        data = {
+            "time": record.created,
+            "level": logging.getLevelName(record.levelno),
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+            }
+
+        for key in self.FIELDS:
+            val = getattr(record, key, None)
+            if val is not None:
+                data[key] = val
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(
+                                                            record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+
+        return json.dumps(data)
+
+###############################################################################
+# Queue Handler and Listener
+###############################################################################
+
+class QueueHandler(logging.Handler):
+    """
+    This handler puts records into a queue to be written by a
+    :class:`QueueListener` on another thread.
+    """
+    def __init__(self, queue, sampler=None, floor=0):
+        logging.Handler.__init__(self)
+        self.queue = queue
+        self.dropped = 0
+        self._exc_formatter = logging.Formatter()
+
+        # If there's a sampling handler, records below floor that it doesn't
+        # sample are wanted by nothing else and are dropped here, unformatted.
+        self.sampler = sampler
+        self.floor = floor
+
+    def prepare(self, record):
+        """
+        Merge the message arguments and format any exception now, as they may
+        refer to objects that change before the listener gets to the record.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(
+                                                            record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        if self.sampler:
+            record.sampled = self.sampler.sample(record)
+            if not record.sampled and record.levelno < self.floor:
+                return
+
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+class QueueListener(object):
+    """
+    This class runs a thread that takes records from a queue and passes them
+    to the provided handlers. Consecutive identical messages are replaced with
+    a single "Last message repeated N times." message, and no more than
+    ``rate_limit`` records are written each second, except for CRITICAL
+    records and records with a true ``unlimited`` attribute.
+    """
+
+    _sentinel = object()
+
+    def __init__(self, queue, handlers, rate_limit=RATE_LIMIT):
+        self.queue = queue
+        self.handlers = handlers
+        self.rate_limit = rate_limit
+        self.source = None
+
+        self._thread = None
+        self._last = None
+        self._last_key = None
+        self._repeats = 0
+        self._window = None
+        self._count = 0
+        self._dropped = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run,
+                                        name="nakedsun.logger")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Write everything remaining in the queue and stop the thread.
+        """
+        if not self._thread:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                record = self.queue.get(True, 1.0)
+            except Queue.Empty:
+                self._flush()
+                continue
+
+            if record is self._sentinel:
+                break
+
+            try:
+                self._process(record)
+            except Exception:
+                self._error()
+
+        self._flush()
+
+    def _error(self):
+        """
+        Report an error raised while writing a record. There's nowhere else to
+        log it, so it's written to stderr.
+        """
+        try:
+            sys.stderr.write("An error occurred in the log listener thread.\n")
+            traceback.print_exc(None, sys.stderr)
+        except Exception:
+            pass
+
+    def _process(self, record):
+        window = int(record.created)
+
+        # Collapse repeated messages, reporting the count at least once per
+        # window so a message that repeats forever still shows up.
+        key = (record.levelno, record.name, record.msg, record.exc_text)
+        if key == self._last_key and record.levelno != LINE:
+            if window != self._window:
+                self._flush_repeats()
+                self._start_window(window)
+            self._repeats += 1
+            return
+
+        self._flush_repeats()
+        self._last = record
+        self._last_key = key
+
+        # Rate limiting.
+        if window != self._window:
+            self._start_window(window)
+
+        if record.levelno >= logging.CRITICAL or \
+                getattr(record, "unlimited", False):
+            self._handle(record)
+            return
+
+        if self._count >= self.rate_limit:
+            self._dropped += 1
+            return
+
+        self._count += 1
+        self._handle(record)
+
+    def _start_window(self, window):
+        self._flush_dropped()
+        self._window = window
+        self._count = 0
+
+    def _handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _note(self, record, level, message):
+        self._handle(logging.LogRecord(record.name, level, record.pathname,
+                                       record.lineno, message, None, None))
+
+    def _flush_repeats(self):
+        if self._repeats:
+            self._note(self._last, self._last.levelno,
+                       u"Last message repeated %d times." % self._repeats)
+            self._repeats = 0
+
+    def _flush_dropped(self):
+        dropped = self._dropped
+        if self.source and self.source.dropped:
+            dropped += self.source.dropped
+            self.source.dropped = 0
+
+        if dropped and self._last:
+            self._note(self._last, logging.WARNING,
+                       u"Dropped %d log messages." % dropped)
+        self._dropped = 0
+
+    def _flush(self):
+        self._flush_repeats()
+        self._flush_dropped()
+        self._last_key = None
+
+###############################################################################
+# Console Width
+###############################################################################
+
+def _console_width(default=80):
+    """
+    Determine the width of the console with the TIOCGWINSZ ioctl, falling back
+    to the COLUMNS environment variable and then to the provided default.
+    """
+    try:
+        import fcntl
+        import termios
+    except ImportError:
+        fcntl = None
+
+    if fcntl:
+        for stream in (sys.stdout, sys.stderr, sys.stdin):
+            try:
+                data = fcntl.ioctl(stream.fileno(), termios.TIOCGWINSZ,
+                                   "\0" * 8)
+                width = struct.unpack("HHHH", data)[1]
+            except (AttributeError, IOError, OSError, ValueError):
+                continue
+            if width > 0:
+                return width
+
+    try:
+        return int(os.environ["COLUMNS"]) or default
+    except (KeyError, ValueError):
+        return default
+
 ###############################################################################
 # Initialization
 ###############################################################################
 
-def initialize(use_color, level, path, logger=''):
+def _parse_level(level):
+    """
+    Convert a level name or number to a level number, defaulting to INFO.
+    """
+    if isinstance(level, basestring):
+        if level.upper() in dir(logging):
+            level = getattr(logging, level.upper())
+        else:
+            try:
+                level = int(level)
+            except (TypeError, ValueError):
+                level = logging.INFO
+    return level
+
+def initialize(use_color, level, path, logger='', json_path=None,
+               sampling=None, json_level=None):
     """
-    Initialize NakedSun's logger.
+    Initialize NakedSun's logger. If json_path is provided, records are also
+    written to that file as JSON lines, sampled at the given rates. The JSON
+    log has its own level, json_level, which defaults to level. It may be
+    lower, for example to keep a sample of DEBUG records without writing every
+    one of them to the console.
     """
     global _log
+    global _listener
     global _width
     global critical
     global debug
@@ -100,15 +446,9 @@ def initialize(use_color, level, path, logger=''):
     global warning
     global log
 
-    ## Parse the Level
-    if isinstance(level, basestring):
-        if level.upper() in dir(logging):
-            level = getattr(logging, level.upper())
-        else:
-            try:
-                level = int(level)
-            except (TypeError, ValueError):
-                level = logging.INFO
+    ## Parse the Levels
+    level = _parse_level(level)
+    json_level = level if json_level is None else _parse_level(json_level)
 
     ## Colorization
 
@@ -128,13 +468,7 @@ def initialize(use_color, level, path, logger=''):
 
     ## Console Width
 
-    try:
-        process = subprocess.Popen(['resize'], stdout=subprocess.PIPE,
-                                               stderr=subprocess.PIPE)
-        out, _ = process.communicate()
-        _width = int(out[8:out.find(';')]) or 80
-    except (OSError, ValueError):
-        _width = 80
+    _width = _console_width()
 
     ## The Logger
 
@@ -151,8 +485,8 @@ def initialize(use_color, level, path, logger=''):
     log = _log.log
     warning = _log.warning
 
-    # Set the logging level.
-    _log.setLevel(level)
+    # Records are written by the listener's handlers on another thread.
+    handlers = []
 
     ## The Console Handler
 
@@ -181,14 +515,13 @@ def initialize(use_color, level, path, logger=''):
             )
 
     console.setFormatter(formatter)
-    _log.addHandler(console)
-    
+    handlers.append(console)
+
     ## The File Handler
 
     # Ensure that the log directory exists.
-    if not os.path.exists(path) or not os.path.isdir(path):
-        error(u"Unable to store log files in %r." % os.path.realpath(path))
-    else:
+    bad_path = not os.path.exists(path) or not os.path.isdir(path)
+    if not bad_path:
         file = logging.handlers.TimedRotatingFileHandler(
                     filename    = os.path.join(path, "log"),
                     when        = "midnight"
@@ -201,7 +534,45 @@ def initialize(use_color, level, path, logger=''):
             )
 
         file.setFormatter(formatter)
-        _log.addHandler(file)
+        handlers.append(file)
+
+    ## The JSON Handler
+
+    floor = min(handler.level for handler in handlers)
+    json_handler = None
+    json_error = None
+
+    if json_path:
+        try:
+            json_handler = JSONHandler(json_path, sampling)
+            json_handler.setLevel(json_level)
+            handlers.append(json_handler)
+        except (IOError, ValueError) as err:
+            json_error = err
+
+    # Set the logging level low enough for every handler.
+    _log.setLevel(min(handler.level for handler in handlers))
+
+    ## The Queue
+
+    queue = Queue.Queue(QUEUE_SIZE)
+    handler = QueueHandler(queue, json_handler, floor)
+
+    _listener = QueueListener(queue, handlers)
+    _listener.source = handler
+    _listener.start()
+
+    # Make sure queued records are written even if the server dies from an
+    # uncaught exception.
+    atexit.register(shutdown)
+
+    _log.addHandler(handler)
+
+    if bad_path:
+        error(u"Unable to store log files in %r." % os.path.realpath(path))
+
+    if json_error:
+        error(u"Unable to write JSON log to %r: %s" % (json_path, json_error))
 
     # Display a colorization warning if using Windows without colorama.
     if colorama_warning:
@@ -239,4 +610,13 @@ def todo(msg, *a, **kw):
 def line():
     log(LINE, u"-" * (_width - 21))
 
-shutdown = logging.shutdown
+def shutdown():
+    """
+    Write any queued log records, stop the listener thread, and shut down the
+    logging system.
+    """
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+    logging.shutdown()
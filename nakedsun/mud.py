@@ -24,8 +24,12 @@ This module contains miscellaneous utility functions for the MUD.
 ###############################################################################
 
 import os
+import re
 
 from . import logger as log
+from . import registry
+from . import template
+from . import utils
 
 ###############################################################################
 # Storage and Constants
@@ -33,6 +37,61 @@ from . import logger as log
 
 _globals = {}
 
+#: The number of formatted strings kept by :func:`format_string`, and the
+#: length of the longest text that is kept.
+FORMAT_CACHE_SIZE = 500
+FORMAT_CACHE_MAX_LENGTH = 8192
+
+_formatted = utils.LRUCache(FORMAT_CACHE_SIZE)
+
+# Color codes, such as {r, and ANSI escape sequences take up no space when
+# displayed. {{ is a single brace.
+_codes = re.compile(r"\{\{|\{.|\x1b\[[0-9;]*[A-Za-z]")
+_paragraphs = re.compile(r"\n[ \t\r]*\n")
+
+#: The number of spaces paragraphs are indented by.
+INDENT = 3
+
+###############################################################################
+# Helper Functions
+###############################################################################
+
+def _code_width(match):
+    return 1 if match.group() == "{{" else 0
+
+def _width(word):
+    """ Return the displayed width of a word. """
+    if "{" in word or "\x1b" in word:
+        width = len(word)
+        for match in _codes.finditer(word):
+            width -= len(match.group()) - _code_width(match)
+        return width
+    return len(word)
+
+def _wrap(paragraph, indent, width):
+    """ Wrap a single paragraph to the given width. """
+    lines = []
+    line = []
+    length = indent
+
+    for word in paragraph.split():
+        size = _width(word)
+        if not line:
+            length += size
+        elif length + 1 + size > width:
+            lines.append(" ".join(line))
+            line = []
+            length = size
+        else:
+            length += 1 + size
+        line.append(word)
+
+    if line:
+        lines.append(" ".join(line))
+    if indent and lines:
+        lines[0] = " " * indent + lines[0]
+    return lines
+
 ###############################################################################
 # Public Functions
 ###############################################################################
@@ -42,32 +101,74 @@ def erase_global(name):
     if name in _globals:
         del _globals[name]
 
-@log.implement
 def expand_text(text, environ=None, newline=False):
     """
     Process the given text with NakedSun's template system. By default, a
     NakedMud-compatible template system is used. If an environment is not
     provided, an empty environment will be used. If newline is True, a line
-    return will be appended to the text.
+    return will be appended to the text. See :mod:`template`.
     """
+    text = template.expand(text, environ)
 
     if newline:
         text += "\r\n"
 
     return text
 
-@log.implement
 def extract(thing):
-    """ Extract an object, character, room, etc. from the game. """
-    pass
+    """
+    Extract an object, character, or room from the game, so it can no longer
+    be found by its uid or prototype. Anything it contains is extracted too,
+    except for the characters in a room, who are left in no room. Returns True
+    if it was in the game.
+    """
+    kind = thing._kind
+    if kind == "obj":
+        thing.move(None)
+    elif kind == "char":
+        thing.room = None
+        if thing._socket is not None:
+            thing._socket._ch = None
+            thing._set_socket(None)
+    elif kind == "room":
+        for ch in thing.chars:
+            ch.room = None
+        for dir in thing.exdirs:
+            thing.fill(dir)
+
+    for obj in thing.contents:
+        extract(obj)
+
+    return registry.remove(thing)
 
-@log.implement
 def format_string(text, indent=True, width=80):
     """
     Format a block of text to fit the specified width, possibly
     indenting paragraphs.
-    """
-    return text
+
+    Paragraphs are separated by blank lines, and the whitespace within them
+    is collapsed. If indent is True, each paragraph starts with
+    :data:`INDENT` spaces.
+    Color codes and ANSI escape sequences don't count towards the width. Lines
+    are separated by ``\r\n``.
+
+    Recently formatted text is cached, so formatting the same text again
+    only costs a lookup.
+    """
+    key = (text, indent, width)
+    out = _formatted.get(key)
+    if out is not None:
+        return out
+
+    lines = []
+    for paragraph in _paragraphs.split(text):
+        if paragraph.strip():
+            lines.extend(_wrap(paragraph, INDENT if indent else 0, width))
+    out = "\r\n".join(lines)
+
+    if len(text) <= FORMAT_CACHE_MAX_LENGTH:
+        _formatted[key] = out
+    return out
 
 def get_global(name):
     """
@@ -33,6 +33,7 @@ from . import auxiliary
 from . import hooks
 from . import logger as log
 from . import settings
+from . import template
 
 ###############################################################################
 # Storage and Constants
@@ -62,17 +63,25 @@ class Mudsock(auxiliary.AuxiliaryBase):
 
     _last_uid = 0
 
-    def __init__(self, connection):
+    def __init__(self, connection, recovery=None):
         """
         Initialize the default state and connect to the provided connection.
         The connection is expected to be an instance of
         :class:`pants.contrib.telnet.TelnetConnection` or a class with a
         compatible API.
+
+        If recovery is provided, it's the information saved for the connection
+        by :func:`_copyover_state` before a copyover, and the connection's
+        previous state is restored from it.
         """
 
         # Set the unique ID for this connection.
-        Mudsock._last_uid += 1
-        self._uid = Mudsock._last_uid
+        if recovery:
+            self._uid = recovery["uid"]
+            Mudsock._last_uid = max(Mudsock._last_uid, self._uid)
+        else:
+            Mudsock._last_uid += 1
+            self._uid = Mudsock._last_uid
 
         # Connect to the connection.
         self._connection = connection
@@ -90,7 +99,8 @@ class Mudsock(auxiliary.AuxiliaryBase):
         self._last_activity = now()
 
         # Set the default text encoding.
-        self.set_encoding(settings.get("default_encoding", "utf8"))
+        self.set_encoding((recovery and recovery.get("encoding")) or
+                          settings.get("default_encoding", "utf8"))
 
         # Weird public variable.
         self.outbound_text = None
@@ -99,6 +109,13 @@ class Mudsock(auxiliary.AuxiliaryBase):
         self._ref = weakref.ref(self)
         _sockets.append(self._ref)
 
+        # A recovered connection already knows its hostname.
+        if recovery:
+            self._hostname = recovery.get("hostname")
+            self._last_activity = now() - recovery.get("idle", 0)
+            self._can_use = True
+            return
+
         # Start resolving the hostname.
         pants.util.dns.gethostbyaddr(connection.remote_addr[0], self._got_host)
 
@@ -179,6 +196,26 @@ class Mudsock(auxiliary.AuxiliaryBase):
         except LookupError:
             self._decoder = None
 
+    ##### Copyover ############################################################
+
+    def _copyover_state(self):
+        """
+        Return a dictionary of the information needed to rebuild this
+        connection after a copyover. It must be serializable as JSON. Telnet
+        option state isn't tracked here, so modules that negotiate options
+        must save it from the ``copyover_save`` hook.
+        """
+        account = self._account
+        return {
+            "uid": self._uid,
+            "encoding": self._encoding,
+            "hostname": self._hostname,
+            "idle": self.idle_time,
+            "state": self.state,
+            "account": account and getattr(account, "name", None),
+            "character": self._ch and getattr(self._ch, "uid", None),
+            }
+
     ##### Input Handlers #######################################################
 
     def pop_ih(self):
@@ -208,7 +245,8 @@ class Mudsock(auxiliary.AuxiliaryBase):
                     state = handler.func_name
                 log.exception("An error occurred while running the input "
                               "handler cleanup function for the state %r on "
-                              "connection #%d." % (state, self._uid))
+                              "connection #%d." % (state, self._uid),
+                              extra={"socket": self._uid})
 
         return True
 
@@ -333,7 +371,8 @@ class Mudsock(auxiliary.AuxiliaryBase):
             state = self._ihs[-1][2]
             log.exception("An error occurred while running the prompt display "
                           "function for state %r on connection #%d." %
-                          (self._ihs[-1][2], self._uid))
+                          (self._ihs[-1][2], self._uid),
+                          extra={"socket": self._uid})
 
     ##### Communication #######################################################
 
@@ -355,7 +394,8 @@ class Mudsock(auxiliary.AuxiliaryBase):
 
         # Character cleanup.
         if self._ch:
-            log.todo("Disassociate character from closing socket.")
+            self._ch._set_socket(None)
+            self._ch = None
 
         # Account cleanup. Yay.
         if self._account:
@@ -393,7 +433,7 @@ class Mudsock(auxiliary.AuxiliaryBase):
             message = message.decode(self._encoding)
 
         if environ:
-            log.todo("Implement a template engine.")
+            message = template.expand(message, environ)
 
         if newline:
             message += "\r\n"
@@ -467,7 +507,8 @@ class Mudsock(auxiliary.AuxiliaryBase):
             except Exception:
                 log.exception("An error occurred while running the input "
                               "handler for state %r on connection #%d." %
-                              (state, self._uid))
+                              (state, self._uid),
+                              extra={"socket": self._uid})
                 break
 
         # Bust the prompt.
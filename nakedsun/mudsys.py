@@ -25,9 +25,15 @@ server down.
 # Imports
 ###############################################################################
 
+import sys
+
 from . import account
+from . import auxiliary
 from . import bitvectors
+from . import commands
+from . import hooks
 from . import char
+from . import exit
 from . import mudsock
 from . import obj
 from . import room
@@ -96,26 +102,66 @@ def add_char_method(name, method):
     """
     setattr(char.Char, name, method)
 
-@log.implement
-def add_cmd(*args):
-    pass
+def add_cmd(name, sort_by, cmd_func, user_group, interrupts=False):
+    """
+    Add a command to the command table, replacing any command with the same
+    name. Commands may be abbreviated, and when several commands start with
+    what a character typed, the one with the lowest ``sort_by`` string is
+    used. Only characters in the given user group, or one of several comma
+    separated groups, may use the command.
+
+    Command functions take three arguments: the character, the name of the
+    command, and the rest of what was typed.
+
+    ============  ============
+    Argument      Description
+    ============  ============
+    name          The name of the command.
+    sort_by       The string to sort the command by, usually its shortest abbreviation. If None, the name is used.
+    cmd_func      The function to call.
+    user_group    The user group that may use the command.
+    interrupts    Whether or not the command interrupts the character's current action.
+    ============  ============
+    """
+    commands.add(name, sort_by, cmd_func, user_group, interrupts)
 
-@log.implement
-def add_cmd_check(*args):
-    pass
+def add_cmd_check(name, check_func):
+    """
+    Add a check to run before the named command. Check functions take the
+    character and the name of the command, and return False to prevent the
+    command from running, usually after telling the character why. See
+    :func:`commands.add_check` for checks that apply to many commands.
+    """
+    commands.add_check(check_func, name)
 
-@log.implement
-def set_cmd_move(*args):
-    pass
+def remove_cmd(name):
+    """
+    Remove the command with the given name from the command table.
+    """
+    commands.remove(name)
 
-@log.implement
-def register_dflt_move_cmd(*args):
-    pass
+def set_cmd_move(cmd_func):
+    """
+    Set the command function used when what a character typed isn't a command,
+    such as the name of an exit. It's called with the character, what was
+    typed, and the argument, and should return True if it handled the input.
+    """
+    commands.set_move(cmd_func)
 
-@log.implement
-def register_move_check(*args):
-    pass
+def register_dflt_move_cmd(cmd):
+    """
+    Add a movement command, such as ``north``, that anyone may use. It calls
+    the function set with :func:`set_cmd_move`, after any move checks.
+    """
+    commands.add(cmd, None, commands.move, None, True, True)
 
+def register_move_check(check_func):
+    """
+    Add a check to run before every movement command, and before moving
+    through an exit by typing its name. Check functions take the character and
+    the direction, and return False to prevent the movement.
+    """
+    commands.add_check(check_func, move=True)
 
 def add_exit_method(name, method):
     """
@@ -128,7 +174,7 @@ def add_exit_method(name, method):
         anything special. You may simply modify the :class:`exit.Exit`
         class directly.
     """
-    pass
+    setattr(exit.Exit, name, method)
 
 def add_obj_method(name, method):
     """
@@ -169,6 +215,125 @@ def add_sock_method(name, method):
     """
     setattr(mudsock.Mudsock, name, method)
 
+def attach_char_socket(ch, sock):
+    """
+    Give control of the character to the socket, detaching both from whatever
+    they controlled or were controlled by before.
+    """
+    if sock._ch is ch:
+        return
+    if sock._ch is not None:
+        detach_char_socket(sock._ch)
+    if ch._socket is not None:
+        detach_char_socket(ch)
+
+    sock._ch = ch
+    ch._set_socket(sock)
+
+def detach_char_socket(ch):
+    """
+    Detach the character from the socket controlling it, if any.
+    """
+    sock = ch._socket
+    if sock is None:
+        return
+    sock._ch = None
+    ch._set_socket(None)
+
+def reload_module(name):
+    """
+    Reload the Python module with the given name from :data:`pymodules`,
+    allowing code changes to take effect without restarting the server. If the
+    module is a package, its loaded submodules are reloaded as well.
+
+    Every hook function, command, and command check defined in the module is
+    unregistered before the module is reloaded, so the module is expected to
+    register them again when it's executed. Existing instances of auxiliary
+    data storage classes installed by the module are migrated to the new
+    classes by passing the result of their ``store`` function to the new
+    class.
+
+    Returns True if the module was reloaded. If an error occurs, it's logged,
+    the old module namespaces, hooks, commands, and auxiliary data classes are
+    restored, and False is returned.
+    """
+    module = pymodules[name]
+    modname = module.__name__
+
+    # Reload submodules before the package that contains them.
+    names = sorted((key for key in sys.modules if key.startswith(modname + ".")
+                    and sys.modules[key] is not None),
+                   key=lambda key: key.count("."), reverse=True)
+    names.append(modname)
+
+    # Unregister the hooks, commands, and auxiliary data classes. The order
+    # of the checks is kept so they can be put back where they were.
+    removed_hooks = []
+    removed_cmds = []
+    removed_checks = set()
+    checks = list(commands._checks)
+    for key in names:
+        for hook, function, priority in hooks.registered(key):
+            old_style = any(getattr(fn, "hooked_for", None) is function
+                            for fn in hooks._hook_priorities[hook][priority])
+            hooks.remove(hook, function)
+            removed_hooks.append((hook, function, priority, old_style))
+        for command in commands.registered(key):
+            commands.remove(command.name)
+            removed_cmds.append(command)
+        for check in commands.registered_checks(key):
+            commands.remove_check(check.function)
+            removed_checks.add(check)
+
+    removed_aux = auxiliary._uninstall(names)
+
+    # reload executes the new code in the existing module namespaces, so keep
+    # a copy of them to put back if it fails part way through.
+    namespaces = [(sys.modules[key], dict(sys.modules[key].__dict__))
+                  for key in names]
+
+    try:
+        for key in names:
+            new = reload(sys.modules[key])
+    except Exception:
+        log.exception("An error occurred when attempting to reload Python "
+                      "module: %s" % name)
+
+        for mod, namespace in namespaces:
+            mod.__dict__.clear()
+            mod.__dict__.update(namespace)
+
+        for key in names:
+            for hook, function, priority in hooks.registered(key):
+                hooks.remove(hook, function)
+            for command in commands.registered(key):
+                commands.remove(command.name)
+            for check in commands.registered_checks(key):
+                commands.remove_check(check.function)
+        for hook, function, priority, old_style in removed_hooks:
+            hooks.add(hook, function, old_style=old_style, priority=priority)
+        for command in removed_cmds:
+            commands.add(command.name, command.sort_by, command.function,
+                         command.group, command.interrupts, command.move)
+
+        current = set(commands._checks)
+        commands._checks[:] = \
+            [check for check in checks if check in removed_checks or
+             check in current] + \
+            [check for check in commands._checks if not check in checks]
+        commands._invalidate()
+
+        auxiliary._uninstall(names)
+        auxiliary._restore(removed_aux)
+        return False
+
+    pymodules[name] = new
+    count = auxiliary._migrate(removed_aux)
+
+    log.info("Reloaded Python module: %s (%d auxiliary data instance%s "
+             "migrated)" % (name, count, "" if count == 1 else "s"))
+    return True
+
 def create_bit(bitvector, *bits):
     """ See :func:`bitvectors.create_bitvector`. """
     return bitvectors.create_bitvector(bitvector, *bits)
@@ -18,13 +18,29 @@
 """
 This module is the core of the network connectivity of NakedSun, creating the
 actual servers and handling new connections.
+
+It also supports handing the listening sockets over to a new server process
+over a Unix domain socket, for restarting the server without ever refusing a
+connection. A process started with a handoff socket path first asks the running
+process at that path for its listening sockets, and keeps accepting on them
+while it loads the MUD library. When the new process is ready, the old one
+stops listening and waits for its remaining connections to close before
+shutting down. The new process then serves the handoff socket itself, for the
+next restart.
 """
 
 ###############################################################################
 # Imports
 ###############################################################################
 
+import errno
+import json
+import os
+import select
+import socket
+
 from pants.contrib.telnet import TelnetConnection
+from pants.engine import Engine
 from pants import Server
 
 from . import hooks
@@ -32,6 +48,18 @@ from . import logger as log
 from . import mudsock
 from . import settings
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import _multiprocessing
+    _sendfd = _multiprocessing.sendfd
+    _recvfd = _multiprocessing.recvfd
+except (ImportError, AttributeError):
+    _sendfd = _recvfd = None
+
 ###############################################################################
 # Storage and Constants
 ###############################################################################
@@ -39,6 +67,19 @@ from . import settings
 main_server = None
 http_server = None
 
+# How often, in seconds, the handoff socket is checked for a new process, and
+# how often the old process checks whether its connections have all closed.
+HANDOFF_POLL = 0.5
+DRAIN_POLL = 1.0
+
+# How long to wait for the other process during a handoff.
+HANDOFF_TIMEOUT = 10.0
+
+_handoff_server = None
+_handoff_path = None
+_handoff_peer = None
+_handoff_buffer = ""
+
 ###############################################################################
 # Simple Connections
 ###############################################################################
@@ -49,10 +90,15 @@ class SimpleTelnet(TelnetConnection):
     """
 
     ms = None
+    recovery = None
 
     def on_connect(self):
-        self.ms = mudsock.Mudsock(self)
-        hooks.run("receive_connection", self.ms)
+        if self.recovery:
+            self.ms = mudsock.Mudsock(self, self.recovery)
+            hooks.run("copyover_recover", self.ms, self.recovery)
+        else:
+            self.ms = mudsock.Mudsock(self)
+            hooks.run("receive_connection", self.ms)
         self.ms.bust_prompt()
 
     def on_close(self):
@@ -79,13 +125,34 @@ def _parse_address(addr):
 
     return host, port
 
-def initialize(addr, http_addr):
+def _adopt(fd, family, connection_class):
+    """
+    Create a server for an already listening socket, such as one inherited
+    from the process that performed a copyover.
+    """
+    sock = socket.fromfd(fd, family, socket.SOCK_STREAM)
+    os.close(fd)
+
+    server = Server(connection_class, socket=sock)
+    server.listening = True
+    return server
+
+def initialize(addr, http_addr, listeners=None):
     """
-    Initialize the servers and start listening.
+    Initialize the servers and start listening. If a dictionary of inherited
+    listening sockets is provided, as returned by :func:`listeners`, those are
+    used rather than binding new sockets.
     """
     global main_server
     global http_server
 
+    if listeners and "main" in listeners:
+        fd, family = listeners["main"]
+        main_server = _adopt(fd, family, SimpleTelnet)
+        log.info(u"Using the inherited listening socket.")
+        log.todo("Initialize the HTTP server.")
+        return
+
     if not addr:
         addr = settings.get("main_addr", ":4000")
 
@@ -102,17 +169,302 @@ def initialize(addr, http_addr):
 
     log.todo("Initialize the HTTP server.")
 
-def stop_listeners():
+def listeners():
+    """
+    Return a dictionary of the file descriptors and address families of the
+    listening servers, for handing them to a new process.
+    """
+    out = {}
+    if main_server and main_server.fileno is not None:
+        out["main"] = (main_server.fileno, main_server._socket.family)
+    return out
+
+def recover_connection(sock, info):
+    """
+    Wrap a connected socket recovered from a copyover with a connection and
+    rebuild its Mudsock from the provided information.
+    """
+    connection = SimpleTelnet(socket=sock)
+    connection.recovery = info
+    if main_server:
+        connection.server = main_server
+    connection._handle_connect_event()
+    return connection
+
+def _release(server):
+    """
+    Close a server without shutting down its socket, as shutting down a
+    listening socket also stops any other process listening on it.
+    """
+    sock = server._socket
+    if sock is not None:
+        server.engine.remove_channel(server)
+        server._socket = None
+    server.close()
+    if sock is not None:
+        sock.close()
+
+def stop_listeners(shared=False):
     """
     Shut down the listening servers. Existing connections will remain active.
+    If shared is True, the listening sockets have been handed to another
+    process and are only closed in this one.
     """
     global main_server
     global http_server
 
+    close = _release if shared else (lambda server: server.close())
+
     if main_server:
-        main_server.close()
+        close(main_server)
         main_server = None
 
     if http_server:
-        http_server.close()
+        close(http_server)
         http_server = None
+
+###############################################################################
+# Listener Handoff
+###############################################################################
+
+def _wait(sock, write):
+    """
+    Wait for a socket with a timeout to become ready, as the raw descriptor is
+    non-blocking and its timeout doesn't apply to :func:`_sendfd` or
+    :func:`_recvfd`.
+    """
+    timeout = sock.gettimeout()
+    if timeout is None:
+        return
+    if write:
+        ready = select.select([], [sock], [], timeout)[1]
+    else:
+        ready = select.select([sock], [], [], timeout)[0]
+    if not ready:
+        raise socket.timeout("timed out")
+
+def _send_fd(sock, fd):
+    """
+    Send a file descriptor over a Unix domain socket with SCM_RIGHTS.
+    """
+    if hasattr(sock, "sendmsg"):
+        import array
+        sock.sendmsg(["F"], [(socket.SOL_SOCKET, socket.SCM_RIGHTS,
+                              array.array("i", [fd]))])
+    elif _sendfd:
+        _wait(sock, True)
+        _sendfd(sock.fileno(), fd)
+    else:
+        raise NotImplementedError("Passing file descriptors is not supported "
+                                  "on this platform.")
+
+def _recv_fd(sock):
+    """
+    Receive a file descriptor sent with :func:`_send_fd`.
+    """
+    if hasattr(sock, "recvmsg"):
+        import array
+        fds = array.array("i")
+        msg, ancdata, flags, addr = sock.recvmsg(1, socket.CMSG_LEN(
+                                                        fds.itemsize))
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.fromstring(data[:fds.itemsize])
+                return fds[0]
+        raise IOError("No file descriptor was received.")
+    elif _recvfd:
+        _wait(sock, False)
+        return _recvfd(sock.fileno())
+    else:
+        raise NotImplementedError("Passing file descriptors is not supported "
+                                  "on this platform.")
+
+def _readline(sock):
+    """
+    Read a single line from a blocking socket, one byte at a time so nothing
+    after the line is consumed.
+    """
+    out = []
+    while True:
+        char = sock.recv(1)
+        if not char:
+            raise IOError("The connection was closed.")
+        if char == "\n":
+            return "".join(out)
+        out.append(char)
+
+def _send_listeners(sock, listeners):
+    """
+    Send a dictionary of listening sockets, as returned by :func:`listeners`,
+    to another process.
+    """
+    names = sorted(listeners)
+    sock.sendall(json.dumps([[name, listeners[name][1]] for name in names])
+                 + "\n")
+    for name in names:
+        _send_fd(sock, listeners[name][0])
+
+def _receive_listeners(sock):
+    """
+    Receive the listening sockets sent with :func:`_send_listeners`.
+    """
+    out = {}
+    for name, family in json.loads(_readline(sock)):
+        out[str(name)] = (_recv_fd(sock), family)
+    return out
+
+def receive_listeners(path, timeout=HANDOFF_TIMEOUT):
+    """
+    Ask the server process listening on the handoff socket at path for its
+    listening sockets. Returns a dictionary for :func:`initialize`, or None if
+    no process is listening at path. The connection is kept open until
+    :func:`handoff_ready` is called.
+    """
+    global _handoff_peer
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except socket.error as err:
+        sock.close()
+        if err.args[0] in (errno.ENOENT, errno.ECONNREFUSED):
+            return None
+        raise
+
+    try:
+        listeners = _receive_listeners(sock)
+    except Exception:
+        sock.close()
+        raise
+
+    log.info(u"Received %d listening socket%s from the running server." %
+             (len(listeners), "" if len(listeners) == 1 else "s"))
+    _handoff_peer = sock
+    return listeners
+
+def handoff_ready():
+    """
+    Tell the process that sent the listening sockets to stop accepting new
+    connections, now that this process is ready to handle them.
+    """
+    global _handoff_peer
+
+    if not _handoff_peer:
+        return
+
+    try:
+        _handoff_peer.sendall("ready\n")
+    except socket.error:
+        log.exception("Unable to notify the old server process.")
+    finally:
+        _handoff_peer.close()
+        _handoff_peer = None
+
+def serve_handoff(path):
+    """
+    Listen on a Unix domain socket at path, handing the listening sockets to
+    the next server process that connects to it.
+    """
+    global _handoff_server
+    global _handoff_path
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if fcntl:
+        flags = fcntl.fcntl(sock.fileno(), fcntl.F_GETFD)
+        fcntl.fcntl(sock.fileno(), fcntl.F_SETFD, flags | fcntl.FD_CLOEXEC)
+    sock.bind(path)
+    sock.listen(1)
+    sock.setblocking(False)
+
+    _handoff_server = sock
+    _handoff_path = path
+    Engine.instance().defer(HANDOFF_POLL, _poll_handoff)
+
+def _close_handoff():
+    global _handoff_server
+    global _handoff_peer
+
+    if _handoff_server:
+        _handoff_server.close()
+        _handoff_server = None
+    if _handoff_peer:
+        _handoff_peer.close()
+        _handoff_peer = None
+
+def _poll_handoff():
+    """
+    Check the handoff socket for a new process, and check whether a process
+    that received the listening sockets is ready.
+    """
+    global _handoff_peer
+    global _handoff_buffer
+
+    if not _handoff_server:
+        return
+
+    if not _handoff_peer:
+        try:
+            conn, addr = _handoff_server.accept()
+        except socket.error as err:
+            if err.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                log.exception("Unable to accept on the handoff socket.")
+        else:
+            try:
+                conn.settimeout(HANDOFF_TIMEOUT)
+                _send_listeners(conn, listeners())
+                conn.setblocking(False)
+                _handoff_peer = conn
+                _handoff_buffer = ""
+                log.info(u"Sent the listening sockets to a new server process.")
+            except Exception:
+                log.exception("Unable to send the listening sockets.")
+                conn.close()
+
+    if _handoff_peer:
+        try:
+            data = _handoff_peer.recv(64)
+        except socket.error as err:
+            if err.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                data = ""
+            else:
+                data = None
+
+        if data == "":
+            # The new process went away before it was ready. Keep listening.
+            log.warning(u"The new server process disconnected before it was "
+                        u"ready.")
+            _handoff_peer.close()
+            _handoff_peer = None
+
+        elif data:
+            _handoff_buffer += data
+            if "ready\n" in _handoff_buffer:
+                _handed_off()
+                return
+
+    Engine.instance().defer(HANDOFF_POLL, _poll_handoff)
+
+def _handed_off():
+    """
+    Stop listening now that the new process is ready, and shut down once the
+    remaining connections have closed.
+    """
+    log.info(u"The new server process is ready. No longer accepting new "
+             u"connections.")
+    _close_handoff()
+    stop_listeners(shared=True)
+    hooks.run("handoff")
+    _drain()
+
+def _drain():
+    count = len(mudsock.socket_list())
+    if not count:
+        log.info(u"All connections have closed. Stopping.")
+        Engine.instance().stop()
+        return
+
+    Engine.instance().defer(DRAIN_POLL, _drain)
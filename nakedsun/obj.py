@@ -27,11 +27,128 @@ MUD, and functions to iterate over and work with those objects.
 from . import auxiliary
 from . import hooks
 from . import logger as log
+from . import prototypes
+from . import registry
 
 ###############################################################################
 # Char Class
 ###############################################################################
 
 @auxiliary.register("object")
-class Obj(auxiliary.AuxiliaryBase):
-    pass
+class Obj(prototypes.Instance):
+    """
+    This class represents an object in the game. An object may be in a room,
+    carried by a character, or inside another object, its location.
+
+    The core state of an object is kept in slots. Other attributes may still
+    be set, and are stored in a dictionary created the first time one is.
+    Attributes it doesn't have are read from its prototype, as described in
+    :mod:`prototypes`.
+    """
+    _kind = "obj"
+
+    __slots__ = ("_auxiliary", "_auxiliary_raw", "uid", "_prototype",
+                 "_location", "_contents", "_bits", "__dict__", "__weakref__")
+
+    def __init__(self, uid=None, prototype=None):
+        self._auxiliary = None
+        self._auxiliary_raw = None
+
+        self.uid = uid
+        self._prototype = prototype
+        self._location = None
+        self._contents = None
+        self._bits = None
+
+        # Things created from a prototype copy its auxiliary data as needed.
+        if prototypes.get(prototype) is None:
+            self._auxiliary_init()
+        registry.add(self)
+
+    @property
+    def prototype(self):
+        """ The key of the prototype this was created from, or None. """
+        return self._prototype
+
+    def __repr__(self):
+        return "<Obj(%s)>" % (self.prototype or self.uid)
+
+    @property
+    def contents(self):
+        """ A list of the objects inside this object. """
+        return list(self._contents or ())
+
+    @property
+    def location(self):
+        """
+        The room, character, or object this object is in, or None. Immutable.
+        See :func:`move`.
+        """
+        return self._location
+
+    def move(self, location):
+        """
+        Move this object into a room, a character's inventory, or another
+        object. If location is None, the object is taken out of the game
+        without being extracted.
+        """
+        old = self._location
+        if old is location:
+            return
+        if old is not None:
+            old._contents.remove(self)
+        self._location = location
+        if location is not None:
+            if location._contents is None:
+                location._contents = []
+            location._contents.append(self)
+
+    def _where(kind):
+        def get(self):
+            location = self._location
+            if location is not None and location._kind == kind:
+                return location
+            return None
+        return get
+
+    room = property(_where("room"), move, doc="""
+        The :class:`room.Room` this object is in, or None. Setting it moves
+        the object.
+        """)
+
+    carrier = property(_where("char"), move, doc="""
+        The :class:`char.Char` carrying this object, or None. Setting it moves
+        the object.
+        """)
+
+    container = property(_where("obj"), move, doc="""
+        The :class:`Obj` this object is inside, or None. Setting it moves the
+        object.
+        """)
+
+    del _where
+
+###############################################################################
+# Public Functions
+###############################################################################
+
+def obj_list():
+    """ Return a list of every object in the game. """
+    return registry.things("obj")
+
+def count_objs(key):
+    """ Return the number of objects created from the given prototype. """
+    return registry.count_instances(key)
+
+def load_obj(key, location=None):
+    """
+    Create a new object from the prototype with the given key, move it to the
+    location if one is provided, and return it. A KeyError is raised if
+    there's no such prototype.
+    """
+    if prototypes.get(key) is None:
+        raise KeyError("There is no prototype %r." % key)
+    obj = Obj(prototype=key)
+    if location is not None:
+        obj.move(location)
+    return obj
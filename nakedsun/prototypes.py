@@ -0,0 +1,283 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This module contains the prototypes characters and objects are created from.
+A prototype has a key of the form ``name@zone``, attributes such as a name and
+description, bits, and auxiliary data, and may inherit all of those from one or
+more parent prototypes::
+
+    prototypes.add("goblin@forest", ["monster@base"],
+                   name="a goblin", desc="A short, green and angry goblin.")
+    goblin = char.load_mob("goblin@forest")
+
+Characters and objects created from a prototype share its data until they
+change it. Reading an attribute the instance doesn't have returns the
+prototype's, and setting it stores the value on the instance alone. An
+instance reads its prototype's bits in place until it changes them, when they
+are copied, and each
+auxiliary data storage class is copied, with its ``copy`` function, the first
+time an instance asks for it. An instance only stores the data it changed.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import weakref
+
+from . import auxiliary
+from . import bitvectors
+from . import logger as log
+
+###############################################################################
+# Storage
+###############################################################################
+
+_prototypes = {}
+
+###############################################################################
+# Prototype Class
+###############################################################################
+
+class Prototype(object):
+    """
+    A template for characters and objects. The attributes, bits, and auxiliary
+    data of the parents are merged, in order, below the prototype's own.
+    """
+
+    def __init__(self, key, parents=(), bits=None, aux=None, attributes=None):
+        self.key = key
+        self.parents = list(parents)
+        self.bits = bits
+        self.aux = dict(aux or {})
+        self.attributes = dict(attributes or {})
+        self._invalidate()
+
+    def __repr__(self):
+        return "<Prototype(%s)>" % self.key
+
+    def _invalidate(self):
+        self._merged = None
+        self._shared = {}
+
+    def _merge(self, seen=()):
+        """
+        Return the merged attributes, bits, and auxiliary data of this
+        prototype and its parents, caching the result.
+        """
+        if self._merged is not None:
+            return self._merged
+
+        if self.key in seen:
+            raise ValueError("The prototype %r inherits from itself." %
+                             self.key)
+        seen = seen + (self.key,)
+
+        attributes = {}
+        aux = {}
+        bits = None
+        for key in self.parents:
+            parent = _prototypes.get(key)
+            if parent is None:
+                log.warning("The prototype %r has the missing parent %r." %
+                            (self.key, key))
+                continue
+            p_attributes, p_bits, p_aux = parent._merge(seen)
+            attributes.update(p_attributes)
+            aux.update(p_aux)
+            if p_bits is not None:
+                bits = p_bits
+
+        attributes.update(self.attributes)
+        aux.update(self.aux)
+        if self.bits is not None:
+            bits = self.bits
+
+        self._merged = (attributes, bits, aux)
+        return self._merged
+
+    def attribute(self, name):
+        """
+        Return the value of the named attribute, raising an AttributeError if
+        neither this prototype nor its parents have it.
+        """
+        try:
+            return self._merge()[0][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def copy_aux(self, thing, name):
+        """
+        Give the thing its own copy of the prototype's instance of the named
+        auxiliary data storage class, and return it.
+        """
+        cls = auxiliary._get_class(thing, name)
+        data = self._merge()[2].get(name)
+
+        try:
+            if data is None:
+                return auxiliary._initialize(thing, cls, None, name)
+
+            shared = self._shared.get(cls)
+            if shared is None:
+                shared = self._shared[cls] = \
+                    auxiliary._initialize(self, cls, data)
+
+            instance = shared.copy()
+        except Exception:
+            log.exception("There was an error copying the auxiliary data "
+                          "storage class %r for %r." % (name, thing))
+            return None
+
+        instance.owner = weakref.proxy(thing)
+        if not thing._auxiliary:
+            thing._auxiliary = {}
+        thing._auxiliary[name] = instance
+        return instance
+
+###############################################################################
+# Shared Bits
+###############################################################################
+
+class _SharedBits(bitvectors.Bitvector):
+    """
+    A view of a prototype's bits for an instance that hasn't changed its own.
+    The bits are copied to the instance the first time the view is changed.
+    """
+    __slots__ = ('_owner', '_shared')
+
+    def _get_bits(self):
+        own = self._owner._bits
+        if own is None:
+            return self._shared._bits
+        return own._bits
+
+    def _set_bits(self, value):
+        own = self._owner._bits
+        if own is None:
+            self._owner._bits = bitvectors.Bitvector(self._vecname, value)
+        else:
+            bitvectors._setattr(own, '_bits', value)
+
+    _bits = property(_get_bits, _set_bits)
+
+    def copy(self):
+        return bitvectors.Bitvector(self)
+
+###############################################################################
+# Instance Class
+###############################################################################
+
+class Instance(auxiliary.AuxiliaryBase):
+    """
+    The base class of things that may be created from a prototype. Subclasses
+    must have ``_prototype`` and ``_bits`` slots, and skip
+    :func:`_auxiliary_init` when :func:`get` finds their prototype.
+    """
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        if name[0] == "_":
+            raise AttributeError(name)
+
+        proto = _prototypes.get(self._prototype)
+        if proto is None:
+            raise AttributeError(name)
+        return proto.attribute(name)
+
+    def _get_bits(self):
+        bits = self._bits
+        if bits is None:
+            proto = _prototypes.get(self._prototype)
+            if proto is not None:
+                shared = proto._merge()[1]
+                if shared is not None:
+                    bits = object.__new__(_SharedBits)
+                    _setattr = bitvectors._setattr
+                    _setattr(bits, '_vecname', shared._vecname)
+                    _setattr(bits, '_vector', shared._vector)
+                    _setattr(bits, '_owner', self)
+                    _setattr(bits, '_shared', shared)
+        return bits
+
+    def _set_bits(self, value):
+        self._bits = value
+
+    bits = property(_get_bits, _set_bits, doc="""
+        The bits of this thing. Until they're changed, these are a view of
+        the prototype's bits, which are copied on the first change.
+        """)
+
+    def aux(self, name):
+        """
+        Return the auxiliary data storage class instance with the given name,
+        first copying it from the prototype if this doesn't have its own. See
+        :func:`auxiliary.AuxiliaryBase.aux`.
+        """
+        auxiliary = self._auxiliary
+        if auxiliary and name in auxiliary:
+            return auxiliary[name]
+
+        proto = None
+        if self._auxiliary_raw is None:
+            proto = _prototypes.get(self._prototype)
+        if proto is None:
+            return super(Instance, self).aux(name)
+        return proto.copy_aux(self, name)
+
+    getAuxiliary = aux
+
+###############################################################################
+# Public Functions
+###############################################################################
+
+def add(key, parents=(), bits=None, aux=None, **attributes):
+    """
+    Add a prototype with the given key, replacing any prototype with the same
+    key, and return it. Parents are the keys of the prototypes to inherit
+    from, bits is a :class:`bitvectors.Bitvector`, and aux is a dictionary of
+    the stored data of auxiliary data storage classes. Every other keyword
+    argument is an attribute.
+    """
+    proto = _prototypes[key] = Prototype(key, parents, bits, aux, attributes)
+    invalidate()
+    return proto
+
+def remove(key):
+    """
+    Remove the prototype with the given key. Things created from it keep only
+    the data they changed. Returns True if there was such a prototype.
+    """
+    if _prototypes.pop(key, None) is None:
+        return False
+    invalidate()
+    return True
+
+def get(key):
+    """
+    Return the prototype with the given key, or None.
+    """
+    return _prototypes.get(key)
+
+def invalidate():
+    """
+    Forget the merged data of every prototype. Call this after changing a
+    prototype's attributes, bits, aux, or parents in place.
+    """
+    for proto in _prototypes.itervalues():
+        proto._invalidate()
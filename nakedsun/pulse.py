@@ -0,0 +1,294 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This module provides the game pulse, a fixed rate tick that runs the systems
+registered with it, such as combat, regeneration, and autosaving. The rate is
+set with the ``pulses_per_second`` setting, and each system runs once every
+``every`` pulses::
+
+    @pulse.system("regen", every=10, priority=pulse.LOW)
+    def regen():
+        for ch in char.char_list():
+            ch.regen()
+
+The time each system takes is measured against the pulse budget, the length of
+a single pulse. When a pulse runs over its budget, or the server falls behind
+schedule, systems with a priority below :data:`NORMAL` are put off to the next
+pulse rather than adding to the lag. Systems sharing a rate are staggered
+across pulses so they don't all run on the same one.
+
+The number of pulses that ran over budget is kept in :data:`overruns`, and the
+statistics of each system are available from :func:`stats`.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import time
+
+from pants.engine import Engine
+
+from . import logger as log
+from . import settings
+
+###############################################################################
+# Storage and Constants
+###############################################################################
+
+LOW = -1
+NORMAL = 0
+HIGH = 1
+
+# If the server falls this many pulses behind, the schedule is reset rather
+# than running every missed pulse back to back.
+MAX_CATCHUP = 10
+
+_systems = {}
+_order = []
+_running = False
+
+# The number of the current pulse, when it was due to start, and the length
+# of a pulse in seconds.
+pulse = 0
+_due = None
+budget = 0.1
+
+# How far behind schedule the last pulse started, in seconds, the number of
+# pulses that took longer than the budget, and the number of pulses skipped
+# to catch up.
+lag = 0.0
+overruns = 0
+missed = 0
+
+_time = time.time
+
+###############################################################################
+# System Class
+###############################################################################
+
+class System(object):
+    """
+    A function registered to run every ``every`` pulses, along with statistics
+    about how long it takes.
+    """
+
+    def __init__(self, name, function, every=1, priority=NORMAL, offset=0):
+        self.name = name
+        self.function = function
+        self.every = max(1, int(every))
+        self.priority = priority
+        self.next = offset
+
+        self.runs = 0
+        self.deferred = 0
+        self.errors = 0
+        self.total = 0.0
+        self.longest = 0.0
+        self.last = 0.0
+
+    def __repr__(self):
+        return "<System(%s, every=%d)>" % (self.name, self.every)
+
+    def run(self):
+        start = _time()
+        try:
+            self.function()
+        except Exception:
+            self.errors += 1
+            log.exception("An error occurred while running the pulse system "
+                          "%r." % self.name)
+
+        self.last = elapsed = _time() - start
+        self.runs += 1
+        self.total += elapsed
+        if elapsed > self.longest:
+            self.longest = elapsed
+        return elapsed
+
+###############################################################################
+# Registration
+###############################################################################
+
+def _sort():
+    _order[:] = sorted(_systems.itervalues(),
+                       key=lambda s: (-s.priority, s.name))
+
+def register(name, function, every=1, priority=NORMAL):
+    """
+    Register a function to run every ``every`` pulses, replacing any system
+    with the same name. Systems run in order of their priority, highest first.
+    Returns the :class:`System`.
+    """
+    if name in _systems:
+        unregister(name)
+
+    # Stagger systems of the same rate across the pulses between runs.
+    every = max(1, int(every))
+    slots = [0] * every
+    for other in _systems.itervalues():
+        if other.every == every:
+            slots[other.next % every] += 1
+    slot = slots.index(min(slots))
+
+    # Run at the next pulse in that slot of the cycle.
+    _systems[name] = system = System(name, function, every, priority,
+                                     pulse + (slot - pulse) % every)
+    _sort()
+    return system
+
+def unregister(name):
+    """
+    Remove the system with the given name.
+    """
+    if name in _systems:
+        del _systems[name]
+        _sort()
+
+def system(name, every=1, priority=NORMAL):
+    """
+    A decorator that registers a function as a system. See :func:`register`.
+    """
+    def decorator(function):
+        register(name, function, every, priority)
+        return function
+    return decorator
+
+###############################################################################
+# The Pulse
+###############################################################################
+
+def run_pulse():
+    """
+    Run every system that's due on the current pulse and advance to the next
+    pulse. Returns the time taken, in seconds.
+    """
+    global pulse
+    global overruns
+
+    start = _time()
+    lagging = lag > budget
+
+    for system in _order[:]:
+        if system.next > pulse:
+            continue
+
+        # Put off low priority systems while behind.
+        if system.priority < NORMAL and (lagging or
+                                         _time() - start > budget):
+            system.deferred += 1
+            system.next = pulse + 1
+            continue
+
+        system.run()
+        system.next = pulse + system.every
+
+    pulse += 1
+
+    elapsed = _time() - start
+    if elapsed > budget:
+        overruns += 1
+    return elapsed
+
+def _tick():
+    global _due
+    global lag
+    global missed
+
+    if not _running:
+        return
+
+    now = _time()
+    lag = max(0.0, now - _due)
+
+    run_pulse()
+
+    # Schedule the next pulse against the fixed schedule, so time spent
+    # running the systems doesn't make the pulse drift.
+    _due += budget
+    now = _time()
+    if now - _due > MAX_CATCHUP * budget:
+        behind = int((now - _due) / budget)
+        missed += behind
+        _due += behind * budget
+
+    Engine.instance().defer(max(0.0, _due - now), _tick)
+
+def start():
+    """
+    Start running pulses at the rate given by the ``pulses_per_second``
+    setting.
+    """
+    global _running
+    global _due
+    global budget
+
+    if _running:
+        return
+
+    budget = 1.0 / (settings.get("pulses_per_second") or 10)
+    _running = True
+    _due = _time()
+    Engine.instance().callback(_tick)
+
+def stop():
+    """
+    Stop running pulses.
+    """
+    global _running
+    _running = False
+
+###############################################################################
+# Statistics
+###############################################################################
+
+def stats():
+    """
+    Return a list of dictionaries with the statistics of each system, in the
+    order the systems run. Times are in seconds.
+    """
+    out = []
+    for system in _order:
+        out.append({
+            "name": system.name,
+            "every": system.every,
+            "priority": system.priority,
+            "runs": system.runs,
+            "deferred": system.deferred,
+            "errors": system.errors,
+            "total": system.total,
+            "average": system.total / system.runs if system.runs else 0.0,
+            "longest": system.longest,
+            "last": system.last,
+            # The share of each pulse's budget the system uses on average.
+            "load": (system.total / system.runs / system.every / budget
+                     if system.runs else 0.0),
+            })
+    return out
+
+def reset_stats():
+    """
+    Reset the statistics of every system and the overrun counters.
+    """
+    global overruns
+    global missed
+
+    overruns = missed = 0
+    for system in _order:
+        system.runs = system.deferred = system.errors = 0
+        system.total = system.longest = system.last = 0.0
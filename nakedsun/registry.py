@@ -0,0 +1,190 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This module keeps track of every character, object, and room in the game. Each
+is added when it's created and removed when it's extracted with
+:func:`mud.extract`, and may be found by its uid, by the key of its prototype,
+or by the zone of that key. Keys take the form ``name@zone``.
+
+Every index is a dictionary of dictionaries keyed by uid, so adding, finding,
+and removing a thing takes constant time, and iterating over the things of a
+zone or prototype only touches those things.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+from . import logger as log
+
+###############################################################################
+# Storage
+###############################################################################
+
+_last_uid = 0
+
+_things = {}
+_kinds = {}
+_prototypes = {}
+_zones = {}
+
+###############################################################################
+# Helper Functions
+###############################################################################
+
+def zone_of(key):
+    """
+    Return the zone of a prototype key, or None if the key has no zone.
+    """
+    if not key or not "@" in key:
+        return None
+    return key.rpartition("@")[2]
+
+def _discard(index, key, uid):
+    things = index.get(key)
+    if things is None:
+        return
+    things.pop(uid, None)
+    if not things:
+        del index[key]
+
+###############################################################################
+# Public Functions
+###############################################################################
+
+def add(thing):
+    """
+    Add a character, object, or room to the registry, giving it a new uid if it
+    doesn't have one, and return the uid. A ValueError is raised if another
+    thing already has the uid.
+    """
+    global _last_uid
+
+    uid = thing.uid
+    if uid is None:
+        _last_uid += 1
+        uid = thing.uid = _last_uid
+    elif uid in _things:
+        if _things[uid] is thing:
+            return uid
+        raise ValueError("The uid %r is already in use." % uid)
+    elif uid > _last_uid:
+        _last_uid = uid
+
+    _things[uid] = thing
+    _kinds.setdefault(thing._kind, {})[uid] = thing
+
+    key = thing.prototype
+    if key:
+        _prototypes.setdefault(key, {})[uid] = thing
+        zone = zone_of(key)
+        if zone:
+            _zones.setdefault(zone, {}).setdefault(thing._kind, {})[uid] = \
+                thing
+
+    return uid
+
+def remove(thing):
+    """
+    Remove a character, object, or room from the registry. Returns True if it
+    was registered.
+    """
+    uid = thing.uid
+    if _things.get(uid) is not thing:
+        return False
+
+    del _things[uid]
+    _discard(_kinds, thing._kind, uid)
+
+    key = thing.prototype
+    if key:
+        _discard(_prototypes, key, uid)
+        zone = zone_of(key)
+        if zone in _zones:
+            _discard(_zones[zone], thing._kind, uid)
+            if not _zones[zone]:
+                del _zones[zone]
+
+    return True
+
+def get(uid):
+    """
+    Return the character, object, or room with the given uid, or None.
+    """
+    return _things.get(uid)
+
+def registered(thing):
+    """
+    Return True if the given thing is in the registry.
+    """
+    return _things.get(thing.uid) is thing
+
+def things(kind):
+    """
+    Return a list of every registered thing of the given kind: ``"char"``,
+    ``"obj"``, or ``"room"``.
+    """
+    things = _kinds.get(kind)
+    return things.values() if things else []
+
+def count(kind):
+    """
+    Return the number of registered things of the given kind.
+    """
+    return len(_kinds.get(kind, ()))
+
+def instances(key, kind=None):
+    """
+    Return a list of the things created from the prototype with the given key,
+    optionally only those of one kind.
+    """
+    things = _prototypes.get(key)
+    if not things:
+        return []
+    if kind is None:
+        return things.values()
+    return [thing for thing in things.itervalues() if thing._kind == kind]
+
+def count_instances(key):
+    """
+    Return the number of things created from the prototype with the given key.
+    """
+    return len(_prototypes.get(key, ()))
+
+def in_zone(zone, kind=None):
+    """
+    Return a list of the things in the given zone, optionally only those of one
+    kind. A thing is in the zone of its prototype key.
+    """
+    kinds = _zones.get(zone)
+    if not kinds:
+        return []
+    if kind is not None:
+        things = kinds.get(kind)
+        return things.values() if things else []
+
+    out = []
+    for things in kinds.itervalues():
+        out.extend(things.itervalues())
+    return out
+
+def zones():
+    """
+    Return a list of the zones with registered things.
+    """
+    return _zones.keys()
@@ -0,0 +1,280 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This module resets zones, loading the characters and objects that belong in
+them. Each zone has a list of steps, run in order, and may reset on its own
+every ``interval`` seconds::
+
+    reset.add_zone("forest", interval=600)
+    reset.add_mob("forest", "goblin@forest", "glade@forest", max=5)
+    reset.add_obj("forest", "mushroom@forest", "glade@forest", max=20)
+    reset.add_step("forest", close_the_gate)
+
+Resets don't run all at once. The steps of every queued reset are run from a
+pulse system, stopping once the time spent in a pulse reaches the reset
+budget, and carrying on the next pulse. Zones with players in them are reset
+first. When a reset finishes, the ``zone_reset`` hook is run with the name of
+the zone. How long each reset took, both the time spent running its steps and
+from start to finish, is available from :func:`stats`.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import time
+
+from . import char
+from . import hooks
+from . import logger as log
+from . import obj
+from . import pulse
+from . import registry
+from . import room
+
+###############################################################################
+# Storage and Constants
+###############################################################################
+
+#: The share of each pulse that resets may use, unless :data:`budget` is set.
+BUDGET_SHARE = 0.25
+
+#: The time, in seconds, resets may use each pulse. If None, it's
+#: :data:`BUDGET_SHARE` of :data:`pulse.budget`.
+budget = None
+
+_zones = {}
+_queue = []
+
+_time = time.time
+
+###############################################################################
+# Zone Class
+###############################################################################
+
+class Zone(object):
+    """
+    The reset steps of a zone, the progress of its current reset, and
+    statistics about its past resets.
+    """
+
+    def __init__(self, name, interval=None):
+        self.name = name
+        self.interval = interval
+        self.steps = []
+        self.next = _time() + interval if interval else None
+
+        # The next step to run, when the reset started, the time spent
+        # running steps, and the number of pulses it has run in.
+        self.position = None
+        self.started = None
+        self.work = 0.0
+        self.pulses = 0
+
+        self.resets = 0
+        self.errors = 0
+        self.total = 0.0
+        self.longest = 0.0
+        self.last = 0.0
+        self.last_elapsed = 0.0
+        self.last_pulses = 0
+
+    def __repr__(self):
+        return "<Zone(%s)>" % self.name
+
+    @property
+    def resetting(self):
+        """ Whether or not the zone is queued or partway through a reset. """
+        return self.position is not None
+
+    def run_step(self):
+        """
+        Run the next step of the current reset. Returns True if that was the
+        last step.
+        """
+        function, args = self.steps[self.position]
+        self.position += 1
+
+        start = _time()
+        try:
+            function(*args)
+        except Exception:
+            self.errors += 1
+            log.exception("An error occurred while running step %d of the "
+                          "reset of the zone %r." % (self.position, self.name))
+        self.work += _time() - start
+
+        return self.position >= len(self.steps)
+
+    def finish(self):
+        now = _time()
+        self.resets += 1
+        self.last = self.work
+        self.total += self.work
+        if self.work > self.longest:
+            self.longest = self.work
+        self.last_elapsed = now - self.started
+        self.last_pulses = self.pulses
+
+        self.position = self.started = None
+        self.work = 0.0
+        self.pulses = 0
+        if self.interval:
+            self.next = now + self.interval
+
+###############################################################################
+# Reset Steps
+###############################################################################
+
+def _load_mob(key, room_key, max):
+    where = room.get_room(room_key)
+    if where is None:
+        return
+    if max is not None and registry.count_instances(key) >= max:
+        return
+    char.load_mob(key, where)
+
+def _load_obj(key, room_key, max):
+    where = room.get_room(room_key)
+    if where is None:
+        return
+    if max is not None and registry.count_instances(key) >= max:
+        return
+    obj.load_obj(key, where)
+
+###############################################################################
+# Public Functions
+###############################################################################
+
+def add_zone(name, interval=None):
+    """
+    Add a zone with no steps, replacing any zone with the same name, and
+    return its :class:`Zone`. If interval is provided, the zone is reset every
+    interval seconds.
+    """
+    remove_zone(name)
+    zone = _zones[name] = Zone(name, interval)
+    if not "zone_reset" in pulse._systems:
+        pulse.register("zone_reset", run, priority=pulse.LOW)
+    return zone
+
+def remove_zone(name):
+    """
+    Remove the zone with the given name, abandoning any reset in progress.
+    """
+    zone = _zones.pop(name, None)
+    if zone is not None and zone in _queue:
+        _queue.remove(zone)
+
+def get_zone(name):
+    """
+    Return the :class:`Zone` with the given name, or None.
+    """
+    return _zones.get(name)
+
+def add_step(zone, function, *args):
+    """
+    Add a step to the named zone's reset, calling function with the provided
+    arguments.
+    """
+    _zones[zone].steps.append((function, args))
+
+def add_mob(zone, key, room_key, max=None):
+    """
+    Add a step to the named zone's reset that loads a character from the
+    prototype key into the room with room_key, unless there are already max
+    characters of that prototype.
+    """
+    add_step(zone, _load_mob, key, room_key, max)
+
+def add_obj(zone, key, room_key, max=None):
+    """
+    Add a step to the named zone's reset that loads an object from the
+    prototype key into the room with room_key, unless there are already max
+    objects of that prototype.
+    """
+    add_step(zone, _load_obj, key, room_key, max)
+
+def queue(name):
+    """
+    Start resetting the named zone. Returns False if it was already resetting.
+    """
+    zone = _zones[name]
+    if zone.position is not None:
+        return False
+
+    zone.position = 0
+    zone.started = _time()
+    _queue.append(zone)
+    return True
+
+def run():
+    """
+    Queue the zones due to reset, then run the steps of queued resets until
+    the budget is used up. Zones with players in them go first. This is
+    registered as the ``zone_reset`` pulse system.
+    """
+    now = start = _time()
+    for zone in _zones.itervalues():
+        if zone.next is not None and zone.next <= now and \
+                zone.position is None:
+            queue(zone.name)
+
+    if not _queue:
+        return
+
+    limit = budget if budget is not None else pulse.budget * BUDGET_SHARE
+    occupied = room.zones_with_players()
+    if occupied:
+        _queue.sort(key=lambda zone: not zone.name in occupied)
+
+    for zone in _queue[:]:
+        zone.pulses += 1
+        while zone.position < len(zone.steps):
+            if zone.run_step():
+                break
+            if _time() - start >= limit:
+                return
+
+        _queue.remove(zone)
+        zone.finish()
+        hooks.run("zone_reset", zone.name)
+
+        if _time() - start >= limit:
+            return
+
+def stats():
+    """
+    Return a list of dictionaries with the statistics of each zone's resets,
+    sorted by name. ``last``, ``average``, and ``longest`` are the time spent
+    running steps, while ``elapsed`` is the time from the start of the last
+    reset to its end, and ``pulses`` the number of pulses it was spread
+    across. Times are in seconds.
+    """
+    return [{
+        "name": zone.name,
+        "steps": len(zone.steps),
+        "resets": zone.resets,
+        "errors": zone.errors,
+        "resetting": zone.position is not None,
+        "last": zone.last,
+        "average": zone.total / zone.resets if zone.resets else 0.0,
+        "longest": zone.longest,
+        "elapsed": zone.last_elapsed,
+        "pulses": zone.last_pulses,
+        } for zone in sorted(_zones.itervalues(), key=lambda z: z.name)]
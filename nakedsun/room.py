@@ -24,9 +24,27 @@ MUD, and functions to iterate over and work with those rooms.
 # Imports
 ###############################################################################
 
+from collections import deque
+
 from . import auxiliary
+from . import exit
 from . import hooks
 from . import logger as log
+from . import registry
+from . import utils
+
+###############################################################################
+# Storage
+###############################################################################
+
+#: The number of paths remembered by :func:`path`.
+PATH_CACHE_SIZE = 2000
+
+_paths = utils.LRUCache(PATH_CACHE_SIZE)
+
+# The characters, and the characters with sockets, in the rooms of each zone.
+_zone_chars = {}
+_zone_players = {}
 
 ###############################################################################
 # Char Class
@@ -34,4 +52,277 @@ from . import logger as log
 
 @auxiliary.register("room")
 class Room(auxiliary.AuxiliaryBase):
-    pass
+    """
+    This class represents a room, the location of characters and objects,
+    connected to other rooms by exits. A room belongs to the zone of its
+    prototype key.
+
+    The core state of a room is kept in slots. Other attributes may still be
+    set, and are stored in a dictionary created the first time one is.
+    """
+    _kind = "room"
+
+    __slots__ = ("_auxiliary", "_auxiliary_raw", "uid", "_prototype",
+                 "_contents", "_chars", "bits", "_exits", "_links",
+                 "__dict__", "__weakref__")
+
+    def __init__(self, uid=None, prototype=None):
+        self._auxiliary = None
+        self._auxiliary_raw = None
+
+        self.uid = uid
+        self._prototype = prototype
+        self._contents = None
+        self._chars = None
+        self.bits = None
+
+        # Exits are kept twice: by direction for lookups, and as a tuple of
+        # (direction, destination) pairs for walking the room graph.
+        self._exits = None
+        self._links = ()
+
+        self._auxiliary_init()
+        registry.add(self)
+
+    @property
+    def prototype(self):
+        """ The key of the prototype this was created from, or None. """
+        return self._prototype
+
+    def __repr__(self):
+        return "<Room(%s)>" % (self.prototype or self.uid)
+
+    @property
+    def contents(self):
+        """ A list of the objects in the room. """
+        return list(self._contents or ())
+
+    objs = contents
+
+    @property
+    def chars(self):
+        """ A list of the characters in the room. """
+        return list(self._chars or ())
+
+    @property
+    def zone(self):
+        """ The zone of the room's prototype key, or None. Immutable. """
+        return registry.zone_of(self._prototype)
+
+    def send(self, message, environ=None, newline=True, exclude=()):
+        """
+        Send a message to every character in the room with a socket, except
+        the excluded characters.
+        """
+        for ch in self._chars or ():
+            if ch._socket is not None and not ch in exclude:
+                ch._socket.send(message, environ, newline)
+
+    ##### Containment ##########################################################
+
+    def _add_char(self, ch):
+        if self._chars is None:
+            self._chars = []
+        self._chars.append(ch)
+
+        zone = self.zone
+        if zone:
+            _zone_chars.setdefault(zone, {})[ch.uid] = ch
+            if ch._socket is not None:
+                _zone_players.setdefault(zone, {})[ch.uid] = ch
+
+    def _remove_char(self, ch):
+        self._chars.remove(ch)
+
+        zone = self.zone
+        if zone:
+            _discard(_zone_chars, zone, ch.uid)
+            _discard(_zone_players, zone, ch.uid)
+
+    def _socket_changed(self, ch):
+        zone = self.zone
+        if not zone:
+            return
+        if ch._socket is not None:
+            _zone_players.setdefault(zone, {})[ch.uid] = ch
+        else:
+            _discard(_zone_players, zone, ch.uid)
+
+    ##### Exits ################################################################
+
+    @property
+    def exits(self):
+        """ A list of the room's exits. """
+        if not self._exits:
+            return []
+        return self._exits.values()
+
+    @property
+    def exdirs(self):
+        """ A list of the directions the room has exits in. """
+        if not self._exits:
+            return []
+        return self._exits.keys()
+
+    def exit(self, dir):
+        """
+        Return the :class:`exit.Exit` in the given direction, or None if there
+        isn't one.
+        """
+        if not self._exits:
+            return None
+        return self._exits.get(dir)
+
+    def dig(self, dir, dest):
+        """
+        Create an exit in the given direction leading to dest, replacing any
+        exit already there, and return it.
+        """
+        if self._exits is None:
+            self._exits = {}
+        ex = self._exits[dir] = exit.Exit(self, dir, dest)
+        self._exits_changed()
+        return ex
+
+    def fill(self, dir):
+        """
+        Remove the exit in the given direction. Return True if there was one.
+        """
+        if not self._exits or not dir in self._exits:
+            return False
+        ex = self._exits.pop(dir)
+        ex._room = None
+        self._exits_changed()
+        return True
+
+    def _exits_changed(self):
+        self._links = tuple((dir, ex.dest) for dir, ex in
+                            self._exits.iteritems() if ex.dest is not None)
+        _paths.clear()
+
+###############################################################################
+# Helper Functions
+###############################################################################
+
+def _discard(index, zone, uid):
+    chars = index.get(zone)
+    if chars is None:
+        return
+    chars.pop(uid, None)
+    if not chars:
+        del index[zone]
+
+###############################################################################
+# Public Functions
+###############################################################################
+
+def room_list():
+    """ Return a list of every room in the game. """
+    return registry.things("room")
+
+def get_room(key):
+    """ Return the room with the given key, or None if it isn't loaded. """
+    rooms = registry.instances(key, "room")
+    return rooms[0] if rooms else None
+
+def is_loaded(key):
+    """ Return True if the room with the given key is loaded. """
+    return bool(registry.instances(key, "room"))
+
+def zone_chars(zone):
+    """ Return a list of the characters in the rooms of the given zone. """
+    chars = _zone_chars.get(zone)
+    return chars.values() if chars else []
+
+def zone_players(zone):
+    """
+    Return a list of the characters with sockets in the rooms of the given
+    zone.
+    """
+    chars = _zone_players.get(zone)
+    return chars.values() if chars else []
+
+def zone_sockets(zone):
+    """
+    Return a list of the sockets of the characters in the rooms of the given
+    zone.
+    """
+    chars = _zone_players.get(zone)
+    if not chars:
+        return []
+    return [ch._socket for ch in chars.itervalues()]
+
+def zones_with_players():
+    """ Return a list of the zones with characters with sockets in them. """
+    return _zone_players.keys()
+
+def send_zone(zone, message, environ=None, newline=True):
+    """
+    Send a message to every character with a socket in the rooms of the given
+    zone.
+    """
+    chars = _zone_players.get(zone)
+    if chars:
+        for ch in chars.values():
+            ch._socket.send(message, environ, newline)
+
+###############################################################################
+# Pathfinding
+###############################################################################
+
+def _search(source, target, max_dist):
+    """ Breadth-first search the room graph for the shortest route. """
+    parents = {source: None}
+    queue = deque(((source, 0),))
+
+    while queue:
+        room, dist = queue.popleft()
+        if max_dist is not None and dist >= max_dist:
+            continue
+
+        for dir, dest in room._links:
+            if dest in parents:
+                continue
+            parents[dest] = (room, dir)
+
+            if dest is target:
+                route = []
+                while dest is not source:
+                    dest, dir = parents[dest]
+                    route.append(dir)
+                route.reverse()
+                return tuple(route)
+
+            queue.append((dest, dist + 1))
+
+    return None
+
+def path(source, target, max_dist=None):
+    """
+    Return a list of the directions leading from the room source to the room
+    target along the fewest exits, or None if target can't be reached within
+    max_dist steps. Closed and locked exits are not considered obstacles.
+
+    Results are cached until any exit is dug, filled, or redirected.
+    """
+    if source is target:
+        return []
+
+    key = (source, target, max_dist)
+    route = _paths.get(key, False)
+    if route is False:
+        route = _paths[key] = _search(source, target, max_dist)
+
+    if route is None:
+        return None
+    return list(route)
+
+def next_step(source, target, max_dist=None):
+    """
+    Return the direction of the first step from source towards target, or None
+    if there is no route.
+    """
+    route = path(source, target, max_dist)
+    if not route:
+        return None
+    return route[0]
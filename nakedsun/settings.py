@@ -27,6 +27,8 @@ import json
 import os
 import sys
 
+from pants.engine import Engine
+
 from . import hooks
 from . import logger as log
 
@@ -38,6 +40,12 @@ _settings = {}
 _source = None
 _path = None
 
+# Changes are written to disk at most once every SAVE_DELAY seconds.
+SAVE_DELAY = 5
+
+_dirty = False
+_save_pending = False
+
 ###############################################################################
 # Initialization
 ###############################################################################
@@ -113,15 +121,75 @@ has_key = _settings.has_key
 keys = _settings.keys
 
 def set(key, val, autosave=True):
+    """
+    Set a MUD setting and run the ``setting_changed`` hook. If autosave is
+    True, the settings will be written to file within :data:`SAVE_DELAY`
+    seconds. Several changes made in that time are saved with a single write.
+    """
     _settings[key] = val
     hooks.run("setting_changed", key, val)
     if autosave:
+        schedule_save()
+
+def update(values, autosave=True):
+    """
+    Set several MUD settings at once from the provided dictionary. The
+    ``setting_changed`` hook is run for every key, but the settings are only
+    saved once.
+    """
+    for key, val in values.iteritems():
+        _settings[key] = val
+        hooks.run("setting_changed", key, val)
+    if autosave:
+        schedule_save()
+
+###############################################################################
+# Saving
+###############################################################################
+
+def schedule_save():
+    """
+    Mark the settings as modified and schedule them to be saved. If a save is
+    already scheduled, this does nothing.
+    """
+    global _dirty
+    global _save_pending
+
+    _dirty = True
+    if _save_pending:
+        return
+
+    _save_pending = True
+    Engine.instance().defer(SAVE_DELAY, _deferred_save)
+
+def _deferred_save():
+    global _save_pending
+    _save_pending = False
+    flush()
+
+def flush():
+    """
+    Immediately save the MUD settings if there are any unsaved changes. This is
+    called automatically when the server shuts down.
+    """
+    if _dirty:
         save_settings()
 
 def save_settings():
-    """ Save the MUD settings back to file. """
+    """
+    Save the MUD settings back to file. The settings are written to a
+    temporary file first, which is then renamed over the old file, so a crash
+    while saving can't leave a partially written file behind.
+    """
+    global _dirty
+
+    if not _path:
+        return
+
+    temp = _path + ".tmp"
+
     if _source == 'config':
-        with open(_path, 'wb') as f:
+        with open(temp, 'wb') as f:
             json.dump(_settings, f)
 
     elif _source == 'muddata':
@@ -133,5 +201,14 @@ def save_settings():
             except TypeError:
                 log.warning(u"Couldn't save MUD setting %r with value %r." %
                             (key, _settings[key]))
-        storage_set.write(_path)
+        storage_set.write(temp)
         storage_set.close()
+
+    else:
+        return
+
+    # os.rename can't replace an existing file on Windows.
+    if sys.platform == 'win32' and os.path.exists(_path):
+        os.remove(_path)
+    os.rename(temp, _path)
+    _dirty = False
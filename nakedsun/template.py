@@ -0,0 +1,308 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This module contains the template engine used by :func:`mud.expand_text` and
+:func:`mudsock.Mudsock.send`. Templates embed Python expressions and
+conditions in square brackets, in the same way as NakedMud::
+
+    You are in [me.name].[if ch.is_pc] Welcome back, [ch.name]![/if]
+    [if me.bits.dark]It's too dark to see.[elif ch.level > 10]You sense
+    danger.[else]Nothing stirs.[/if]
+
+Expressions are evaluated with the names of the environment as variables, and
+``[[`` produces a literal ``[``. Templates render to unicode, and byte strings,
+in the template or from expressions, are decoded as UTF-8. An expression or condition that raises an
+exception is logged and treated as empty or false.
+
+Each template is parsed once into a Python code object, which is cached by its
+source text, so rendering a template that was seen before only runs its
+compiled code.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+from . import logger as log
+from . import utils
+
+###############################################################################
+# Storage and Constants
+###############################################################################
+
+#: The number of compiled templates to keep.
+CACHE_SIZE = 1000
+
+_cache = utils.LRUCache(CACHE_SIZE)
+
+###############################################################################
+# Exceptions
+###############################################################################
+
+class TemplateError(ValueError):
+    """
+    Raised when a template can't be parsed or compiled.
+    """
+    pass
+
+###############################################################################
+# Template Class
+###############################################################################
+
+class Template(object):
+    """
+    A compiled template. Call :func:`render` with an environment to produce
+    its text.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.text = []
+        self.expressions = []
+
+        lines = []
+        self._generate(_parse(source), lines, "")
+        lines.append("_result = ''.join(_out)")
+
+        try:
+            self.code = compile("_out = []\n" + "\n".join(lines),
+                                "<template>", "exec")
+        except SyntaxError as err:
+            raise TemplateError("Invalid expression in template: %s" % err)
+
+        self.base = {
+            "_t": tuple(self.text),
+            "_text": _text,
+            "_error": self._error,
+            }
+
+    def __repr__(self):
+        return "<Template(%r)>" % self.source[:20]
+
+    def _generate(self, nodes, lines, indent):
+        """ Append the Python source for a list of parsed nodes to lines. """
+        if not nodes:
+            lines.append(indent + "pass")
+
+        for node in nodes:
+            if isinstance(node, basestring):
+                self.text.append(_text(node))
+                lines.append("%s_out.append(_t[%d])" %
+                             (indent, len(self.text) - 1))
+
+            elif node[0] == "expr":
+                index = self._expression(node[1])
+                lines.append("%stry: _out.append(_text(%s))" %
+                             (indent, node[1]))
+                lines.append("%sexcept Exception: _error(%d)" %
+                             (indent, index))
+
+            else:
+                # Each condition is evaluated inside the else of the one
+                # before it, so errors can be caught one at a time.
+                branches = node[1]
+                inner = indent
+                for condition, body in branches:
+                    if condition is None:
+                        self._generate(body, lines, inner)
+                        break
+                    index = self._expression(condition)
+                    lines.append("%stry: _c = (%s)" % (inner, condition))
+                    lines.append("%sexcept Exception: _c = _error(%d)" %
+                                 (inner, index))
+                    lines.append("%sif _c:" % inner)
+                    self._generate(body, lines, inner + " ")
+                    lines.append("%selse:" % inner)
+                    inner += " "
+                else:
+                    lines.append(inner + "pass")
+
+    def _expression(self, expression):
+        # Check each expression alone, for a clear error message.
+        try:
+            compile(expression, "<template>", "eval")
+        except SyntaxError:
+            raise TemplateError("Invalid expression in template: [%s]" %
+                                expression)
+        self.expressions.append(expression)
+        return len(self.expressions) - 1
+
+    def _error(self, index):
+        log.exception("An error occurred while evaluating [%s] in a "
+                      "template." % self.expressions[index])
+        return False
+
+    def render(self, environ=None):
+        """
+        Return the text of the template for the given environment, a
+        dictionary of the names to use in expressions.
+        """
+        namespace = self.base.copy()
+        if environ:
+            namespace.update(environ)
+        exec self.code in namespace
+        return namespace["_result"]
+
+###############################################################################
+# Parsing
+###############################################################################
+
+def _text(value):
+    # Byte strings are decoded, so they can be joined with unicode text.
+    if isinstance(value, unicode):
+        return value
+    elif isinstance(value, str):
+        return value.decode("utf8", "replace")
+    return unicode(value)
+
+def _close(source, start):
+    """
+    Return the index of the bracket closing the one before start, skipping
+    nested brackets and quoted strings.
+    """
+    depth = 0
+    quote = None
+    i = start
+    length = len(source)
+
+    while i < length:
+        char = source[i]
+        if quote:
+            if char == "\\":
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "[({":
+            depth += 1
+        elif char in "])}":
+            if depth == 0:
+                if char == "]":
+                    return i
+                break
+            depth -= 1
+        i += 1
+
+    raise TemplateError("Unclosed [ in template at position %d." % (start - 1))
+
+def _parse(source):
+    """
+    Parse a template into a list of nodes. Text is a string, an expression is
+    ``("expr", expression)``, and a condition is ``("if", branches)``, where
+    each branch is a ``(condition, nodes)`` tuple and the condition of an else
+    is None.
+    """
+    root = []
+    # Each open [if] has the list of its branches and the nodes of the branch
+    # being parsed.
+    stack = []
+    nodes = root
+    text = []
+    i = 0
+
+    while True:
+        start = source.find("[", i)
+        if start == -1:
+            text.append(source[i:])
+            break
+
+        text.append(source[i:start])
+        if source.startswith("[[", start):
+            text.append("[")
+            i = start + 2
+            continue
+
+        end = _close(source, start + 1)
+        tag = source[start + 1:end].strip()
+        i = end + 1
+
+        if text:
+            joined = "".join(text)
+            if joined:
+                nodes.append(joined)
+            text = []
+
+        word = tag.split(None, 1)[0] if tag else ""
+        if word == "if":
+            branches = [(tag[2:].strip(), [])]
+            nodes.append(("if", branches))
+            stack.append((nodes, branches))
+            nodes = branches[-1][1]
+
+        elif word in ("elif", "else", "/if"):
+            if not stack:
+                raise TemplateError("[%s] without [if] in template." % word)
+            parent, branches = stack[-1]
+            if word != "/if" and branches[-1][0] is None:
+                raise TemplateError("[%s] after [else] in template." % word)
+
+            if word == "/if":
+                stack.pop()
+                nodes = parent
+            else:
+                condition = tag[4:].strip() if word == "elif" else None
+                branches.append((condition, []))
+                nodes = branches[-1][1]
+
+        elif not tag:
+            raise TemplateError("Empty [] in template.")
+
+        else:
+            nodes.append(("expr", tag))
+
+    if stack:
+        raise TemplateError("[if] without [/if] in template.")
+
+    joined = "".join(text)
+    if joined:
+        nodes.append(joined)
+    return root
+
+###############################################################################
+# Public Functions
+###############################################################################
+
+def compile_template(source):
+    """
+    Return the compiled :class:`Template` for the given source text, from the
+    cache if it was compiled before. Raises a :class:`TemplateError` if the
+    template is invalid.
+    """
+    template = _cache.get(source)
+    if template is None:
+        template = _cache[source] = Template(source)
+    return template
+
+def render(source, environ=None):
+    """
+    Render the given template source with the environment. Raises a
+    :class:`TemplateError` if the template is invalid.
+    """
+    return compile_template(source).render(environ)
+
+def expand(source, environ=None):
+    """
+    Render the given template source with the environment. If the template is
+    invalid, the error is logged and the source is returned as it is.
+    """
+    try:
+        return compile_template(source).render(environ)
+    except TemplateError as err:
+        log.error("Unable to expand a template: %s" % err)
+        return source
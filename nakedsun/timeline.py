@@ -0,0 +1,130 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This module provides a simple timeline recorder, used by the core to measure
+how long each phase of starting the server takes and how long it takes to
+import each Python module in the MUD library.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import contextlib
+import json
+import time
+
+###############################################################################
+# Timeline Class
+###############################################################################
+
+class Timeline(object):
+    """
+    A timeline of named entries, each with a kind, a start time relative to the
+    creation of the timeline, and a duration. Phases are sequential; starting a
+    new phase ends the current one::
+
+        timeline = Timeline()
+        timeline.phase("settings")
+        ...
+        timeline.phase("network")
+        ...
+        timeline.end()
+
+    Nested operations, such as importing a module, may be measured within a
+    phase with :func:`measure`.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.entries = []
+        self._current = None
+
+    ##### Recording ###########################################################
+
+    def record(self, name, start, duration, kind="phase"):
+        """
+        Add an entry to the timeline. ``start`` is an absolute time, as
+        returned by :func:`time.time`.
+        """
+        self.entries.append({
+            "name": name,
+            "kind": kind,
+            "start": start - self.started,
+            "duration": duration,
+            })
+
+    def phase(self, name):
+        """
+        End the current phase, if there is one, and begin a new phase.
+        """
+        self.end()
+        self._current = (name, time.time())
+
+    def end(self):
+        """
+        End the current phase.
+        """
+        if self._current:
+            name, start = self._current
+            self._current = None
+            self.record(name, start, time.time() - start)
+
+    @contextlib.contextmanager
+    def measure(self, name, kind="import"):
+        """
+        Measure the time taken by the code within a ``with`` block. The entry
+        is recorded even if the block raises an exception.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.time() - start, kind)
+
+    ##### Output ##############################################################
+
+    @property
+    def total(self):
+        """ The time between the creation of the timeline and its last entry. """
+        if not self.entries:
+            return 0.0
+        return max(e["start"] + e["duration"] for e in self.entries)
+
+    def report(self, kind=None):
+        """
+        Return a list of lines describing the entries of the timeline, sorted
+        from slowest to fastest. If kind is provided, only entries of that kind
+        are included.
+        """
+        entries = [e for e in self.entries if kind is None or e["kind"] == kind]
+        entries.sort(key=lambda e: e["duration"], reverse=True)
+
+        return [u"%10.2f ms  %-6s  %s" % (e["duration"] * 1000, e["kind"],
+                                          e["name"]) for e in entries]
+
+    def save(self, path):
+        """
+        Save the timeline to the given file as JSON.
+        """
+        with open(path, "wb") as f:
+            json.dump({
+                "started": self.started,
+                "total": self.total,
+                "entries": self.entries,
+                }, f, indent=4)
@@ -23,6 +23,8 @@ This module contains miscellaneous utility functions and classes.
 # Imports
 ###############################################################################
 
+from collections import OrderedDict
+
 from . import logger as log
 
 ###############################################################################
@@ -36,3 +38,56 @@ class CallableFrozenSet(frozenset):
     """
     def __call__(self):
         return self
+
+###############################################################################
+# The LRU Cache
+###############################################################################
+
+class LRUCache(object):
+    """
+    A dictionary-like cache holding at most ``size`` items. When full, the
+    least recently used item is discarded to make room. The number of hits and
+    misses of :func:`get` is kept for tuning the size.
+    """
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Return the value for key, marking it as recently used, or default if
+        it's not in the cache.
+        """
+        data = self._data
+        try:
+            value = data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        data[key] = value
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        data = self._data
+        if key in data:
+            del data[key]
+        elif len(data) >= self.size:
+            data.popitem(last=False)
+        data[key] = value
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def clear(self):
+        self._data.clear()
@@ -0,0 +1,121 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the auxiliary module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+from nakedsun import auxiliary
+
+###############################################################################
+# Helper Classes
+###############################################################################
+
+class Counter(object):
+    def __init__(self, set=None):
+        self.count = set["count"] if set else 0
+
+    def copyTo(self, to):
+        to.count = self.count
+        return to
+
+    def copy(self):
+        return self.copyTo(Counter())
+
+    def store(self):
+        return {"count": self.count}
+
+@auxiliary.register("test_thing")
+class Thing(auxiliary.AuxiliaryBase):
+    def __init__(self, data=None):
+        self._auxiliary_init(data)
+
+class SubThing(Thing):
+    pass
+
+class Broken(Counter):
+    def __init__(self, set=None):
+        if set and set.get("broken"):
+            raise ValueError("Broken.")
+        Counter.__init__(self, set)
+
+auxiliary.install("test_counter", Counter, "test_thing")
+auxiliary.install("test_broken", Broken, "test_thing")
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_install():
+    thing = Thing({"test_counter": {"count": 3}})
+    assert thing.aux("test_counter").count == 3
+    assert thing.aux("test_counter").owner.aux("test_counter").count == 3
+
+def test_subclass():
+    thing = SubThing()
+    assert auxiliary._determine_class(thing) == "test_thing"
+    assert thing.aux("test_counter").count == 0
+
+def test_invalidation():
+    Thing()
+
+    auxiliary.install("test_other", Counter, "test_thing")
+    thing = Thing()
+    assert thing.aux("test_other").count == 0
+
+def test_missing():
+    thing = Thing()
+    try:
+        thing.aux("test_no_such_thing")
+    except KeyError:
+        pass
+    else:
+        assert False
+
+def test_lazy():
+    auxiliary.lazy = True
+    try:
+        thing = Thing({"test_counter": {"count": 5}})
+    finally:
+        auxiliary.lazy = False
+
+    assert not thing._auxiliary
+    assert thing._auxiliary_store()["test_counter"] == {"count": 5}
+
+    counter = thing.aux("test_counter")
+    assert counter.count == 5
+    assert thing.aux("test_counter") is counter
+
+    counter.count = 6
+    assert thing._auxiliary_store()["test_counter"] == {"count": 6}
+
+def test_lazy_error(monkeypatch):
+    monkeypatch.setattr(auxiliary.log, "exception", lambda *args: None)
+
+    data = {"broken": True, "count": 2}
+    auxiliary.lazy = True
+    try:
+        thing = Thing({"test_broken": data})
+    finally:
+        auxiliary.lazy = False
+
+    assert thing.aux("test_broken") is None
+    assert thing._auxiliary_store()["test_broken"] == data
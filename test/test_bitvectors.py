@@ -23,8 +23,21 @@ This file contains tests for the bitvectors module.
 # Imports
 ###############################################################################
 
+import pytest
+
 from nakedsun import bitvectors
 
+###############################################################################
+# Helpers
+###############################################################################
+
+@pytest.fixture(autouse=True)
+def restore(monkeypatch):
+    """
+    Put the default bitvectors back after each test replaces them.
+    """
+    monkeypatch.setattr(bitvectors, "bitvectors", bitvectors.bitvectors)
+
 ###############################################################################
 # The Tests
 ###############################################################################
@@ -105,3 +118,96 @@ def test_fromstr():
 
     assert b.one is True
     assert b.two is True
+
+def test_badbit():
+    bitvectors.bitvectors = {}
+    bitvectors.create_bitvector("something_else", "one", "two")
+
+    try:
+        bitvectors.Bitvector("something_else", "one, three")
+    except ValueError:
+        pass
+    else:
+        assert False
+
+def test_operators():
+    bitvectors.bitvectors = {}
+    bitvectors.create_bitvector("something_else", "one", "two", "three")
+
+    a = bitvectors.Bitvector("something_else", "one, two")
+    b = bitvectors.Bitvector("something_else", "two, three")
+
+    assert str(a & b) == "two"
+    assert str(a | b) == "one, three, two"
+    assert "one" in a
+    assert not "three" in a
+
+def test_mixed_operators():
+    bitvectors.bitvectors = {}
+    bitvectors.create_bitvector("something_else", "one", "two", "three")
+    bitvectors.create_bitvector("another", "three", "one")
+
+    a = bitvectors.Bitvector("something_else", "one, two")
+    b = bitvectors.Bitvector("another", "three")
+
+    # Bits of different vectors are matched by name, not by position.
+    assert str(a | b) == "one, three, two"
+    assert not (a & b).any()
+
+def test_extend():
+    bitvectors.bitvectors = {}
+    bitvectors.create_bitvector("something_else", "one")
+    bitvectors.bitvectors["something_else"] += ["two"]
+
+    vec = bitvectors.Bitvector("something_else", "two")
+    assert "two" in vec
+    assert vec.two is True
+
+    for func, args in (("remove", ("one", )), ("insert", (0, "zero")),
+                       ("__setitem__", (0, "zero")), ("pop", ())):
+        try:
+            getattr(bitvectors.bitvectors["something_else"], func)(*args)
+        except TypeError:
+            pass
+        else:
+            assert False, func
+
+def test_copy():
+    bitvectors.bitvectors = {}
+    bitvectors.create_bitvector("something_else", "one", "two")
+
+    a = bitvectors.Bitvector("something_else", "one")
+    b = a.copy()
+    b.two = True
+
+    assert a.two is False
+    assert b.one is True
+    assert int(b) == 3
+
+def test_index():
+    bitvectors.bitvectors = {}
+    bitvectors.create_bitvector("something_else", "one", "two", "three")
+
+    index = bitvectors.BitvectorIndex("something_else")
+    a = index.add("a", "one")
+    index.add("b", "one, two")
+    index.add("c", "three")
+
+    assert sorted(index.query(all="one")) == ["a", "b"]
+    assert index.query(all="one", none="two") == ["a"]
+    assert sorted(index.query(any="two, three")) == ["b", "c"]
+
+    a.two = True
+    assert sorted(index.query(all="two")) == ["a", "b"]
+    assert index.get("a").two is True
+
+    # Adding an entity again replaces its bits.
+    assert index.add("a", "three") is a
+    assert str(a) == "three"
+    assert sorted(index.query(all="three")) == ["a", "c"]
+    assert index.query(all="one") == ["b"]
+    a.two = True
+
+    index.remove("b")
+    assert index.query(all="two") == ["a"]
+    assert not "b" in index
@@ -0,0 +1,61 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the char module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import weakref
+
+from nakedsun import char
+from nakedsun import mud
+from nakedsun import mudsys
+from nakedsun import obj
+from nakedsun import room
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_slots():
+    for cls in (char.Char, obj.Obj, room.Room):
+        thing = cls(prototype="thing@test")
+        assert thing.prototype == "thing@test"
+        assert thing.bits is None and thing.contents == []
+
+        # The dictionary is only created for attributes outside the slots.
+        assert not object.__getattribute__(thing, "__dict__")
+        thing.extra = "value"
+        assert thing.__dict__ == {"extra": "value"}
+        assert weakref.ref(thing)() is thing
+        mud.extract(thing)
+
+def test_char():
+    ch = char.Char()
+    mud.extract(ch)
+    assert ch.room is None and ch.inv == [] and "player" in ch.user_groups
+
+def test_add_method():
+    mudsys.add_char_method("shout", lambda ch, text: text.upper())
+    try:
+        assert char.Char().shout("hi") == "HI"
+    finally:
+        del char.Char.shout
@@ -0,0 +1,245 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the commands module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import pytest
+
+from nakedsun import bitvectors
+from nakedsun import char
+from nakedsun import commands
+from nakedsun import mud
+from nakedsun import mudsys
+from nakedsun import room
+
+###############################################################################
+# Helpers
+###############################################################################
+
+class Char(object):
+    def __init__(self, groups="player"):
+        self.user_groups = bitvectors.Bitvector("user_groups", groups)
+        self.ran = []
+
+@pytest.fixture(autouse=True)
+def table(monkeypatch):
+    """
+    Give every test an empty command table and the default user groups.
+    """
+    monkeypatch.setattr(bitvectors, "bitvectors", {})
+    bitvectors.create_bitvector("user_groups", "player", "builder", "admin")
+
+    monkeypatch.setattr(commands, "_commands", {})
+    monkeypatch.setattr(commands, "_root", None)
+    monkeypatch.setattr(commands, "_move", None)
+    monkeypatch.setattr(commands, "_checks", [])
+    monkeypatch.setattr(commands, "_move_chain", None)
+
+def _cmd(ch, cmd, arg):
+    ch.ran.append((cmd, arg))
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_abbreviation():
+    commands.add("north", "n", _cmd, "player")
+    commands.add("news", None, _cmd, "player")
+    commands.add("look", "l", _cmd, "player")
+    commands.add("lock", None, _cmd, "player")
+
+    assert commands.find("n").name == "north"
+    assert commands.find("ne").name == "news"
+    assert commands.find("l").name == "look"
+    assert commands.find("loc").name == "lock"
+    assert commands.find("lookup") is None
+    assert commands.find("x") is None
+
+def test_exact():
+    commands.add("north", "n", _cmd, "player")
+    commands.add("n", "z", _cmd, "player")
+    assert commands.find("n").name == "n"
+    assert commands.find("no").name == "north"
+
+def test_groups():
+    commands.add("goto", "g", _cmd, "builder")
+    commands.add("get", None, _cmd, "player")
+    commands.add("shutdown", None, _cmd, "admin")
+
+    player = Char("player")
+    builder = Char("player, builder")
+
+    assert commands.find("g", player.user_groups).name == "get"
+    assert commands.find("g", builder.user_groups).name == "goto"
+    assert commands.find("shut", builder.user_groups) is None
+    assert commands.find("shut").name == "shutdown"
+
+def test_replace_remove():
+    commands.add("say", None, _cmd, "player")
+    commands.add("score", None, _cmd, "player")
+    commands.add("say", "s", _cmd, "player")
+    assert commands.find("s").name == "say"
+
+    commands.remove("say")
+    assert commands.find("s").name == "score"
+    assert commands.get("say") is None
+
+    commands.remove("score")
+    assert commands._root.children == {}
+
+def test_do_cmd():
+    commands.add("say", None, _cmd, "player")
+    commands.add("'", None, _cmd, "player")
+
+    ch = Char()
+    assert commands.do_cmd(ch, "sa hello there")
+    assert commands.do_cmd(ch, "'hi")
+    assert not commands.do_cmd(ch, "dance")
+    assert ch.ran == [("say", "hello there"), ("'", "hi")]
+
+def test_real_char():
+    commands.add("look", None, _cmd, "player")
+    commands.add("goto", None, _cmd, "builder")
+
+    ch = char.Char()
+    ch.ran = []
+    try:
+        assert commands.do_cmd(ch, "look")
+        assert not commands.do_cmd(ch, "goto 1")
+
+        # NakedMud style strings of groups work too.
+        ch.user_groups = "player, builder, no_such_group"
+        assert commands.do_cmd(ch, "goto 1")
+        ch.user_groups = "admin"
+        assert not commands.do_cmd(ch, "look")
+        assert ch.ran == [("look", ""), ("goto", "1")]
+    finally:
+        mud.extract(ch)
+
+def test_move():
+    moved = []
+    commands.set_move(lambda ch, cmd, arg: cmd == "up" and
+                      moved.append(cmd) is None)
+
+    ch = Char()
+    assert commands.do_cmd(ch, "up")
+    assert not commands.do_cmd(ch, "sideways")
+    assert moved == ["up"]
+
+def test_move_checks():
+    moved = []
+    commands.set_move(lambda ch, cmd, arg: moved.append(cmd) or True)
+    mudsys.register_dflt_move_cmd("north")
+    mudsys.register_move_check(lambda ch, cmd: not ch.sleeping)
+
+    here, there = room.Room(), room.Room()
+    here.dig("north", there)
+    here.dig("portal", there)
+
+    ch = Char()
+    ch.room = here
+    ch.sleeping = True
+    assert commands.do_cmd(ch, "n")
+    assert commands.do_cmd(ch, "portal")
+    assert moved == []
+
+    # Move checks don't apply to other commands or to input that isn't an exit.
+    commands.add("say", None, _cmd, "player")
+    assert commands.do_cmd(ch, "say hi")
+    assert commands.do_cmd(ch, "dance")
+    assert moved == ["dance"]
+
+    ch.sleeping = False
+    commands.do_cmd(ch, "n")
+    commands.do_cmd(ch, "portal")
+    assert moved == ["dance", "north", "portal"]
+
+def test_checks():
+    order = []
+
+    def awake(ch, cmd):
+        order.append("awake")
+        return not ch.sleeping
+
+    def builder(ch, cmd):
+        order.append("builder")
+
+    def goto(ch, cmd):
+        order.append("goto")
+
+    commands.add("say", None, _cmd, "player")
+    commands.add("goto", None, _cmd, "builder")
+
+    commands.add_check(goto, "goto")
+    commands.add_check(builder, group="builder")
+    commands.add_check(awake)
+
+    ch = Char("player, builder")
+    ch.sleeping = False
+
+    assert commands.do_cmd(ch, "goto 1")
+    assert order == ["builder", "awake", "goto"]
+    assert commands.get("goto").chain is not None
+
+    del order[:]
+    commands.do_cmd(ch, "say hi")
+    assert order == ["awake"]
+
+    ch.sleeping = True
+    assert commands.do_cmd(ch, "say zzz")
+    assert ch.ran == [("goto", "1"), ("say", "hi")]
+
+    # Changing the checks recompiles the chains.
+    commands.remove_check(awake)
+    assert commands.get("say").chain is None
+    commands.do_cmd(ch, "say zzz")
+    assert ch.ran[-1] == ("say", "zzz")
+
+    stats = dict((s["function"], s) for s in commands.check_stats())
+    assert stats["builder"]["calls"] == 1
+    assert stats["goto"]["rejections"] == 0
+
+def test_group_rejection():
+    calls = []
+    commands.add("shutdown", None, _cmd, "admin")
+    commands.add_check(lambda ch, cmd: calls.append(cmd))
+
+    # The group is tested before any check runs.
+    assert not commands.do_cmd(Char("player"), "shutdown")
+    assert calls == []
+
+def test_check_error(monkeypatch):
+    monkeypatch.setattr(commands.log, "exception", lambda *args: None)
+
+    def broken(ch, cmd):
+        raise ValueError("Broken.")
+
+    commands.add("say", None, _cmd, "player")
+    commands.add_check(broken, "say")
+
+    ch = Char()
+    assert commands.do_cmd(ch, "say hi")
+    assert ch.ran == []
+
+    stats, = commands.check_stats()
+    assert stats["errors"] == 1 and stats["rejections"] == 1
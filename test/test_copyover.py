@@ -0,0 +1,134 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the copyover module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import json
+import os
+import socket
+import tempfile
+
+from nakedsun import copyover
+from nakedsun import hooks
+from nakedsun import mudsock
+from nakedsun import network
+
+###############################################################################
+# Helpers
+###############################################################################
+
+def _connect(monkeypatch, info):
+    """
+    Recover a Mudsock for one end of a socket pair, without scheduling any
+    writes on the engine.
+    """
+    monkeypatch.setattr(mudsock.Mudsock, "_scheduled_for_write", True)
+
+    a, b = socket.socketpair()
+    connection = network.recover_connection(a, info)
+    return connection, b
+
+###############################################################################
+# Tests
+###############################################################################
+
+def test_strip_argument():
+    argv = ["nakedsun.py", "--copyover", "a.json", "-u", "0",
+            "--copyover=b.json", "--path", "lib"]
+    assert copyover._strip_argument(argv, "--copyover") == [
+        "nakedsun.py", "-u", "0", "--path", "lib"]
+    assert copyover._strip_argument(argv, "--path") == argv[:-2]
+
+def test_load_removes_state():
+    fd, path = tempfile.mkstemp()
+    with os.fdopen(fd, "wb") as f:
+        json.dump({"last_uid": 4, "sockets": []}, f)
+
+    assert copyover.load(path) == {"last_uid": 4, "sockets": []}
+    assert not os.path.exists(path)
+
+def test_recover_connection(monkeypatch):
+    recovered = []
+
+    def on_recover(sock, info):
+        recovered.append((sock.uid, info["state"]))
+
+    hooks.add("copyover_recover", on_recover)
+    try:
+        connection, other = _connect(monkeypatch, {
+            "uid": 50, "encoding": "latin1", "hostname": "example.org",
+            "idle": 10, "state": "playing"})
+    finally:
+        hooks.remove("copyover_recover", on_recover)
+
+    ms = connection.ms
+    assert connection.connected
+    assert ms.uid == 50 and ms.hostname == "example.org" and ms.can_use
+    assert ms.idle_time >= 10
+    assert mudsock.Mudsock._last_uid >= 50
+    assert recovered == [(50, "playing")]
+
+    ms.close()
+    other.close()
+
+def test_round_trip(monkeypatch, tmpdir):
+    connection, other = _connect(monkeypatch, {
+        "uid": 60, "encoding": "latin1", "hostname": "example.org"})
+
+    path = str(tmpdir.join(copyover.STATE_FILE))
+    state = copyover.save(path)
+
+    info, = [x for x in state["sockets"] if x["uid"] == 60]
+    assert info["fd"] == connection.fileno
+    assert info["encoding"] == "latin1"
+
+    # Emulate the exec with a duplicate of the descriptor. The old connection
+    # can't be closed as that would shut down the socket for both.
+    info["fd"] = os.dup(info["fd"])
+    state["sockets"] = [info]
+    mudsock._sockets.remove(connection.ms._ref)
+    mudsock.Mudsock._last_uid = 0
+
+    monkeypatch.setattr(copyover.log, "info", lambda *args, **kwargs: None)
+    recovered = []
+    hooks.add("copyover_recover", lambda sock, data: recovered.append(sock))
+    try:
+        assert copyover.recover(state) == 1
+    finally:
+        for hook, fn, priority in hooks.registered():
+            if hook == "copyover_recover":
+                hooks.remove(hook, fn)
+
+    sock, = recovered
+    assert sock.uid == 60
+    assert sock.hostname == "example.org"
+    assert mudsock.Mudsock._last_uid == max(60, state["last_uid"])
+
+    # The recovered connection still talks to the other end.
+    sock._connection.write("hello")
+    sock._connection._handle_write_event()
+    assert other.recv(5) == "hello"
+
+    sock.close()
+    connection.close()
+    other.close()
@@ -0,0 +1,96 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the core module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import os
+import py_compile
+import time
+
+from nakedsun import core
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def _library(tmpdir):
+    tmpdir.join("stale.py").write("x = 1\n")
+    tmpdir.join("fresh.py").write("y = 2\n")
+    tmpdir.join(".hidden.py").write("z = 3\n")
+    tmpdir.join("notes.txt").write("Not Python.\n")
+    tmpdir.mkdir("sub").join("nested.py").write("w = 4\n")
+
+    # An up to date compiled file.
+    fresh = str(tmpdir.join("fresh.py"))
+    py_compile.compile(fresh)
+    mtime = os.path.getmtime(fresh)
+    os.utime(fresh + "c", (mtime + 10, mtime + 10))
+
+    return str(tmpdir)
+
+def _compiled(path):
+    out = []
+    for root, dirs, files in os.walk(path):
+        out.extend(fn for fn in files if fn.endswith(".pyc"))
+    return sorted(out)
+
+def test_precompile(tmpdir):
+    path = _library(tmpdir)
+    assert core.precompile(path, 1) == 2
+    assert _compiled(path) == ["fresh.pyc", "nested.pyc", "stale.pyc"]
+
+    # Nothing is stale anymore.
+    assert core.precompile(path, 1) == 0
+
+def test_precompile_workers(tmpdir):
+    path = _library(tmpdir)
+    assert core.precompile(path, 2) == 2
+    assert _compiled(path) == ["fresh.pyc", "nested.pyc", "stale.pyc"]
+
+def test_precompile_errors(monkeypatch, tmpdir):
+    warnings = []
+    monkeypatch.setattr(core.log, "warning", warnings.append)
+
+    tmpdir.join("good.py").write("x = 1\n")
+    tmpdir.join("bad.py").write("def (:\n")
+
+    assert core.precompile(str(tmpdir), 2) == 2
+    assert len(warnings) == 1
+    assert "bad.py" in warnings[0]
+
+SLOW_WORKER = """
+import sys, time
+sys.stdin.read()
+time.sleep(0.5)
+sys.stdout.write("[]")
+"""
+
+def test_precompile_parallel(monkeypatch, tmpdir):
+    monkeypatch.setattr(core, "_COMPILE_WORKER", SLOW_WORKER)
+    for i in xrange(4):
+        tmpdir.join("module%d.py" % i).write("x = %d\n" % i)
+
+    # Four workers that each take half a second must overlap.
+    start = time.time()
+    assert core.precompile(str(tmpdir), 4) == 4
+    assert time.time() - start < 1.5
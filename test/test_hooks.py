@@ -103,3 +103,14 @@ def test_removal():
     hooks.add("test_removal", test)
 
     assert hooks.remove("test_removal", test) is True
+
+def test_registered():
+    def test(name):
+        pass
+
+    hooks.add("test_registered", test, priority=2)
+
+    assert ("test_registered", test, 2) in hooks.registered(__name__)
+    assert not hooks.registered("no.such.module")
+
+    hooks.remove("test_registered", test)
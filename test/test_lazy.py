@@ -0,0 +1,137 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the lazy module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import sys
+
+from nakedsun import bitvectors
+from nakedsun import commands
+from nakedsun import hooks
+from nakedsun import lazy
+from nakedsun import mudsys
+
+###############################################################################
+# The Tests
+###############################################################################
+
+MODULE = '''
+from nakedsun import bitvectors
+from nakedsun import commands
+from nakedsun import hooks
+
+values = []
+
+@hooks.hook("test_lazy_hook")
+def test_lazy_hook(name):
+    values.append(name)
+'''
+
+def test_hook(tmpdir):
+    tmpdir.join("lazy_example.py").write(MODULE)
+    sys.path.insert(0, str(tmpdir))
+
+    try:
+        module = lazy.register("lazy_example",
+                               {"hooks": ["test_lazy_hook"]})
+        assert not "lazy_example" in sys.modules
+        assert lazy.pending() == ["lazy_example"]
+
+        hooks.run("test_lazy_hook", "Bobby")
+        hooks.run("test_lazy_hook", "Johnny")
+
+        assert module.module is sys.modules["lazy_example"]
+        assert mudsys.pymodules["lazy_example"] is module.module
+        assert module.module.values == ["Bobby", "Johnny"]
+        assert lazy.pending() == []
+    finally:
+        sys.path.remove(str(tmpdir))
+
+ERRORS = '''
+from nakedsun import bitvectors
+from nakedsun import commands
+from nakedsun import hooks
+
+values = []
+
+@hooks.hook("test_lazy_errors", priority=1)
+def broken(name):
+    raise ValueError("Broken.")
+
+@hooks.hook("test_lazy_errors")
+def working(name):
+    values.append(name)
+'''
+
+def test_hook_errors(monkeypatch, tmpdir):
+    errors = []
+    monkeypatch.setattr(lazy.log, "exception",
+                        lambda msg, **kwargs: errors.append(kwargs["extra"]))
+
+    tmpdir.join("lazy_errors.py").write(ERRORS)
+    sys.path.insert(0, str(tmpdir))
+
+    try:
+        module = lazy.register("lazy_errors", {"hooks": ["test_lazy_errors"]})
+        hooks.run("test_lazy_errors", "Bobby")
+
+        assert module.module.values == ["Bobby"]
+        assert errors == [{"hook": "test_lazy_errors"}]
+    finally:
+        sys.path.remove(str(tmpdir))
+
+COMMANDS = '''
+from nakedsun import mudsys
+
+def cmd_wave(ch, cmd, arg):
+    ch.waves.append((cmd, arg))
+
+mudsys.add_cmd("wave", None, cmd_wave, "player")
+'''
+
+class Char(object):
+    def __init__(self):
+        self.user_groups = bitvectors.Bitvector("user_groups", "player")
+        self.waves = []
+
+def test_command(monkeypatch, tmpdir):
+    monkeypatch.setattr(bitvectors, "bitvectors", {})
+    bitvectors.create_bitvector("user_groups", "player")
+
+    tmpdir.join("lazy_commands.py").write(COMMANDS)
+    sys.path.insert(0, str(tmpdir))
+
+    try:
+        module = lazy.register("lazy_commands", {"commands": ["wave"]})
+        assert not "lazy_commands" in sys.modules
+
+        ch = Char()
+        assert commands.do_cmd(ch, "wave hello")
+        assert module.module is sys.modules["lazy_commands"]
+        assert commands.find("wave").function is module.module.cmd_wave
+
+        assert commands.do_cmd(ch, "wa again")
+        assert ch.waves == [("wave", "hello"), ("wave", "again")]
+    finally:
+        sys.path.remove(str(tmpdir))
+        commands.remove("wave")
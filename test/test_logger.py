@@ -0,0 +1,234 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the logger module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import fcntl
+import json
+import logging
+import Queue
+import struct
+import sys
+
+from nakedsun import logger
+
+###############################################################################
+# Helpers
+###############################################################################
+
+class MemoryHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        logging.Handler.__init__(self, level)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+def _record(msg, created=1000.0, level=logging.INFO, **extra):
+    extra.update({"msg": msg, "levelno": level, "created": created})
+    return logging.makeLogRecord(extra)
+
+def _listen(records, rate_limit=logger.RATE_LIMIT):
+    """
+    Pass the records through a running listener and return the messages
+    written to its handler.
+    """
+    handler = MemoryHandler()
+    queue = Queue.Queue()
+    listener = logger.QueueListener(queue, [handler], rate_limit)
+    listener.start()
+
+    for record in records:
+        queue.put(record)
+
+    listener.stop()
+    return handler.messages
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_repeats():
+    messages = _listen([_record("one"), _record("one"), _record("one"),
+                        _record("two")])
+    assert messages == ["one", "Last message repeated 2 times.", "two"]
+
+def test_repeats_per_window():
+    messages = _listen([_record("one", 1000.0), _record("one", 1000.5),
+                        _record("one", 1001.0), _record("one", 1001.5)])
+    assert messages == ["one", "Last message repeated 1 times.",
+                        "Last message repeated 2 times."]
+
+def test_rate_limit():
+    records = [_record(str(i)) for i in xrange(5)]
+    records.append(_record("urgent", level=logging.CRITICAL))
+    records.append(_record("later", 1001.0))
+
+    messages = _listen(records, rate_limit=3)
+    assert messages == ["0", "1", "2", "urgent", "Dropped 2 log messages.",
+                        "later"]
+
+def test_unlimited():
+    count = logger.RATE_LIMIT + 150
+    records = [_record("line %d" % i, unlimited=True) for i in xrange(count)]
+    records.extend(_record("limited %d" % i) for i in xrange(5))
+
+    messages = _listen(records, rate_limit=3)
+    assert messages[:count] == ["line %d" % i for i in xrange(count)]
+    assert messages[count:] == ["limited 0", "limited 1", "limited 2",
+                                "Dropped 2 log messages."]
+
+    sampler = logger.JSONHandler.__new__(logger.JSONHandler)
+    sampler.sampling = {logging.INFO: 0.0}
+    assert sampler.sample(_record("report", unlimited=True))
+    assert not sampler.sample(_record("noise"))
+
+def test_source_dropped():
+    handler = logger.QueueHandler(Queue.Queue(maxsize=1))
+    handler.emit(_record("kept"))
+    handler.emit(_record("lost"))
+    assert handler.dropped == 1
+
+    records = []
+    while not handler.queue.empty():
+        records.append(handler.queue.get())
+    records.append(_record("later", 1001.0))
+
+    memory = MemoryHandler()
+    queue = Queue.Queue()
+    listener = logger.QueueListener(queue, [memory])
+    listener.source = handler
+    listener.start()
+    for record in records:
+        queue.put(record)
+    listener.stop()
+
+    # Records dropped by the handler are reported when a window starts.
+    assert memory.messages == ["Dropped 1 log messages.", "kept", "later"]
+
+def test_shutdown_drains(monkeypatch):
+    handler = MemoryHandler()
+    queue = Queue.Queue()
+    listener = logger.QueueListener(queue, [handler])
+
+    for i in xrange(50):
+        queue.put(_record(str(i)))
+
+    listener.start()
+    monkeypatch.setattr(logger, "_listener", listener)
+    logger.shutdown()
+
+    assert logger._listener is None
+    assert handler.messages == [str(i) for i in xrange(50)]
+
+def test_listener_error(capsys):
+    class Broken(logging.Handler):
+        def handle(self, record):
+            raise ValueError("Broken.")
+
+    handler = MemoryHandler()
+    queue = Queue.Queue()
+    listener = logger.QueueListener(queue, [Broken(), handler])
+    listener.start()
+    queue.put(_record("one"))
+    queue.put(_record("two"))
+    listener.stop()
+
+    assert "ValueError: Broken." in capsys.readouterr()[1]
+
+def test_sampling_floor(monkeypatch):
+    class Sampler(object):
+        def sample(self, record):
+            return False
+
+    prepared = []
+    handler = logger.QueueHandler(Queue.Queue(), Sampler(), logging.INFO)
+    monkeypatch.setattr(handler, "prepare",
+                        lambda record: prepared.append(record) or record)
+
+    handler.emit(_record("debug", level=logging.DEBUG))
+    assert prepared == []
+    assert handler.queue.empty()
+
+    handler.emit(_record("info"))
+    assert [record.msg for record in prepared] == ["info"]
+    assert prepared[0].sampled is False
+
+def test_json_level(monkeypatch, tmpdir):
+    for key in ("_log", "_listener", "_width", "critical", "debug", "error",
+                "exception", "info", "log", "warning"):
+        monkeypatch.setattr(logger, key, getattr(logger, key))
+
+    path = str(tmpdir.join("log.json"))
+    logger.initialize(False, "INFO", str(tmpdir), logger="test_json_level",
+                      json_path=path, sampling="DEBUG=0",
+                      json_level="DEBUG")
+    try:
+        assert logger._log.level == logging.DEBUG
+        logger.debug("not sampled")
+        logger.info("written")
+    finally:
+        logger.shutdown()
+        for handler in logger._log.handlers[:]:
+            logger._log.removeHandler(handler)
+
+    with open(path, "rb") as f:
+        messages = [json.loads(line)["message"] for line in f]
+    assert messages == ["written"]
+
+def _console(monkeypatch, ioctl, columns=None):
+    class Stream(object):
+        def fileno(self):
+            return 1
+
+    for name in ("stdout", "stderr", "stdin"):
+        monkeypatch.setattr(sys, name, Stream())
+    monkeypatch.setattr(fcntl, "ioctl", ioctl)
+    if columns is None:
+        monkeypatch.delenv("COLUMNS", raising=False)
+    else:
+        monkeypatch.setenv("COLUMNS", columns)
+
+def _no_tty(fd, request, data):
+    raise IOError(25, "Inappropriate ioctl for device")
+
+def test_console_width_ioctl(monkeypatch):
+    _console(monkeypatch, lambda fd, request, data:
+                 struct.pack("HHHH", 24, 132, 0, 0), "100")
+    assert logger._console_width() == 132
+
+def test_console_width_columns(monkeypatch):
+    _console(monkeypatch, _no_tty, "100")
+    assert logger._console_width() == 100
+
+    # A zero width from the ioctl also falls back to COLUMNS.
+    _console(monkeypatch, lambda fd, request, data: "\0" * 8, "90")
+    assert logger._console_width() == 90
+
+def test_console_width_default(monkeypatch):
+    _console(monkeypatch, _no_tty)
+    assert logger._console_width() == 80
+    assert logger._console_width(72) == 72
+
+    _console(monkeypatch, _no_tty, "wide")
+    assert logger._console_width() == 80
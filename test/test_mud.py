@@ -0,0 +1,81 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the mud module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import pytest
+
+from nakedsun import mud
+from nakedsun import utils
+
+###############################################################################
+# Helpers
+###############################################################################
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    """
+    Give every test an empty format cache.
+    """
+    monkeypatch.setattr(mud, "_formatted", utils.LRUCache(10))
+
+def _visible(line):
+    return mud._codes.sub(lambda m: "{" if m.group() == "{{" else "", line)
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_wrap():
+    text = "The  quick brown\nfox jumps over the lazy dog. " * 4
+    lines = mud.format_string(text, width=30).split("\r\n")
+    assert all(len(line) <= 30 for line in lines)
+    assert lines[0].startswith("   The quick brown fox")
+    assert " ".join(lines).split() == text.split()
+
+    lines = mud.format_string(text, indent=False, width=30).split("\r\n")
+    assert lines[0] == "The quick brown fox jumps over"
+
+def test_paragraphs():
+    text = "First paragraph.\n  \nSecond\nparagraph.\n\n\n"
+    assert mud.format_string(text) == \
+        "   First paragraph.\r\n   Second paragraph."
+
+def test_color_codes():
+    text = ("A {rred{x door and a \x1b[1;34mblue\x1b[0m {{window}}. " * 5)
+    lines = mud.format_string(text, indent=False, width=40).split("\r\n")
+    assert len(lines) > 1
+    assert all(len(_visible(line)) <= 40 for line in lines)
+    assert max(len(_visible(line)) for line in lines) > 30
+    assert mud._width("{{a{x") == 2
+
+def test_cache(monkeypatch):
+    text = "A short description."
+    first = mud.format_string(text, width=30)
+    assert mud.format_string(text, width=30) is first
+    assert mud._formatted.hits == 1
+    assert mud.format_string(text, width=10) != first
+
+    monkeypatch.setattr(mud, "FORMAT_CACHE_MAX_LENGTH", 5)
+    mud.format_string("Too long to keep.")
+    assert len(mud._formatted) == 2
@@ -0,0 +1,181 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the mudsys module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import sys
+
+from nakedsun import auxiliary
+from nakedsun import commands
+from nakedsun import hooks
+from nakedsun import mudsys
+
+###############################################################################
+# Helpers
+###############################################################################
+
+@auxiliary.register("test_reload_thing")
+class Thing(auxiliary.AuxiliaryBase):
+    def __init__(self, data=None):
+        self._auxiliary_init(data)
+
+MODULE = '''
+from nakedsun import auxiliary
+from nakedsun import hooks
+from nakedsun import mudsys
+
+VERSION = %d
+
+values = []
+
+class Data(object):
+    def __init__(self, set=None):
+        self.count = set["count"] if set else 0
+        self.version = VERSION
+
+    def copyTo(self, to):
+        to.count = self.count
+        return to
+
+    def copy(self):
+        return self.copyTo(Data())
+
+    def store(self):
+        return {"count": self.count}
+
+auxiliary.install("test_reload_data", Data, "test_reload_thing")
+
+@hooks.hook("test_reload")
+def on_reload(name):
+    values.append((VERSION, name))
+
+def cmd_reload(ch, cmd, arg):
+    return VERSION
+
+mudsys.add_cmd("test_reload", None, cmd_reload, "")
+%s
+'''
+
+def _write(tmpdir, version, extra=""):
+    tmpdir.join("reload_example.py").write(MODULE % (version, extra))
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_reload_module(monkeypatch, tmpdir):
+    monkeypatch.setattr(mudsys.log, "info", lambda *args: None)
+    monkeypatch.setattr(mudsys.log, "exception", lambda *args: None)
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    monkeypatch.syspath_prepend(str(tmpdir))
+
+    _write(tmpdir, 1)
+    import reload_example
+    monkeypatch.setitem(mudsys.pymodules, "reload_example", reload_example)
+
+    try:
+        thing = Thing()
+        thing.aux("test_reload_data").count = 5
+        hooks.run("test_reload", "Bobby")
+
+        # Reloading replaces the hook and migrates the auxiliary data.
+        _write(tmpdir, 2)
+        assert mudsys.reload_module("reload_example") is True
+
+        module = mudsys.pymodules["reload_example"]
+        hooks.run("test_reload", "Johnny")
+        assert module.values == [(2, "Johnny")]
+        assert len(hooks.registered("reload_example")) == 1
+
+        data = thing.aux("test_reload_data")
+        assert isinstance(data, module.Data)
+        assert data.version == 2
+        assert data.count == 5
+        assert Thing().aux("test_reload_data").version == 2
+        assert commands.get("test_reload").function(None, "", "") == 2
+
+        # A failed reload leaves the old hook and class in place.
+        _write(tmpdir, 3, "raise ValueError('Broken.')")
+        assert mudsys.reload_module("reload_example") is False
+
+        hooks.run("test_reload", "Steve")
+        assert module.values == [(2, "Johnny"), (2, "Steve")]
+        assert len(hooks.registered("reload_example")) == 1
+        assert Thing().aux("test_reload_data").version == 2
+        assert thing.aux("test_reload_data") is data
+        assert commands.get("test_reload").function is module.cmd_reload
+    finally:
+        for hook, function, priority in hooks.registered("reload_example"):
+            hooks.remove(hook, function)
+        auxiliary._uninstall(["reload_example"])
+        commands.remove("test_reload")
+        sys.modules.pop("reload_example", None)
+
+CHECK_MODULE = '''
+from nakedsun import commands
+from nakedsun import hooks
+
+values = []
+
+def on_info(data):
+    values.append(data)
+
+hooks.add("test_reload_info", on_info, old_style=True)
+
+def check_reload(ch, cmd):
+    return True
+
+commands.add_check(check_reload)
+%s
+'''
+
+def test_reload_failure(monkeypatch, tmpdir):
+    monkeypatch.setattr(mudsys.log, "info", lambda *args: None)
+    monkeypatch.setattr(mudsys.log, "exception", lambda *args: None)
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    monkeypatch.setattr(commands, "_checks", list(commands._checks))
+    monkeypatch.syspath_prepend(str(tmpdir))
+
+    def check_other(ch, cmd):
+        return True
+
+    tmpdir.join("reload_checks.py").write(CHECK_MODULE % "")
+    import reload_checks
+    monkeypatch.setitem(mudsys.pymodules, "reload_checks", reload_checks)
+
+    try:
+        commands.add_check(check_other)
+        order = list(commands._checks)
+
+        # A failed reload puts the checks back where they were, and keeps the
+        # hook old-style even though its argument isn't named info.
+        tmpdir.join("reload_checks.py").write(
+            CHECK_MODULE % "raise ValueError('Broken.')")
+        assert mudsys.reload_module("reload_checks") is False
+
+        assert commands._checks == order
+        hooks.run("test_reload_info", "Bobby", 5)
+        assert reload_checks.values == [("Bobby", 5)]
+    finally:
+        hooks.remove("test_reload_info", reload_checks.on_info)
+        sys.modules.pop("reload_checks", None)
@@ -0,0 +1,65 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the network module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import os
+import socket
+
+from nakedsun import network
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_send_listeners():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+
+    a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    a.settimeout(1)
+    b.settimeout(1)
+    try:
+        network._send_listeners(a, {"main": (server.fileno(), server.family)})
+        listeners = network._receive_listeners(b)
+
+        fd, family = listeners["main"]
+        assert family == socket.AF_INET
+        assert fd != server.fileno()
+
+        # The received descriptor is the same listening socket.
+        received = socket.fromfd(fd, family, socket.SOCK_STREAM)
+        os.close(fd)
+        client = socket.create_connection(server.getsockname())
+        conn, addr = received.accept()
+        assert conn.getpeername() == client.getsockname()
+
+        for sock in (conn, client, received):
+            sock.close()
+    finally:
+        for sock in (a, b, server):
+            sock.close()
+
+def test_receive_nothing(tmpdir):
+    assert network.receive_listeners(str(tmpdir.join("handoff.sock"))) is None
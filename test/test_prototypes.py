@@ -0,0 +1,167 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the prototypes module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import pytest
+
+from nakedsun import auxiliary
+from nakedsun import bitvectors
+from nakedsun import char
+from nakedsun import obj
+from nakedsun import prototypes
+from nakedsun import registry
+
+###############################################################################
+# Helpers
+###############################################################################
+
+class Counter(object):
+    copies = 0
+
+    def __init__(self, set=None):
+        self.count = set["count"] if set else 0
+
+    def copyTo(self, to):
+        Counter.copies += 1
+        to.count = self.count
+        return to
+
+    def copy(self):
+        return self.copyTo(Counter())
+
+    def store(self):
+        return {"count": self.count}
+
+auxiliary.install("test_proto_counter", Counter, "character, object")
+
+@pytest.fixture(autouse=True)
+def storage(monkeypatch):
+    """
+    Give every test empty tables of prototypes and things, and some bits.
+    """
+    monkeypatch.setattr(prototypes, "_prototypes", {})
+    monkeypatch.setattr(bitvectors, "bitvectors", {})
+    bitvectors.create_bitvector("test_mob_bits", "aggressive", "sentinel")
+    bitvectors.create_bitvector("user_groups", "player")
+
+    for name in ("_things", "_kinds", "_prototypes", "_zones"):
+        monkeypatch.setattr(registry, name, {})
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_attributes():
+    prototypes.add("monster@base", name="a monster", level=1)
+    prototypes.add("goblin@forest", ["monster@base"], name="a goblin")
+
+    first = char.load_mob("goblin@forest")
+    second = char.load_mob("goblin@forest")
+    assert first.prototype == "goblin@forest"
+    assert (first.name, first.level) == ("a goblin", 1)
+
+    # Setting an attribute only changes that instance.
+    first.name = "Grub"
+    assert (first.name, second.name) == ("Grub", "a goblin")
+    assert second.__dict__ == {}
+
+    with pytest.raises(AttributeError):
+        first.missing
+    with pytest.raises(KeyError):
+        char.load_mob("missing@forest")
+
+def test_changes():
+    proto = prototypes.add("goblin@forest", name="a goblin")
+    goblin = char.load_mob("goblin@forest")
+
+    proto.attributes["name"] = "a tall goblin"
+    prototypes.invalidate()
+    assert goblin.name == "a tall goblin"
+
+    prototypes.remove("goblin@forest")
+    with pytest.raises(AttributeError):
+        goblin.name
+
+def test_bits():
+    bits = bitvectors.Bitvector("test_mob_bits", "aggressive")
+    prototypes.add("monster@base", bits=bits)
+    prototypes.add("goblin@forest", ["monster@base"])
+
+    first = char.load_mob("goblin@forest")
+    second = char.load_mob("goblin@forest")
+    assert first.bits.aggressive and first.bits is not bits
+
+    # Reading the bits doesn't copy them.
+    view = first.bits
+    assert "aggressive" in view and str(view) == "aggressive"
+    assert first._bits is None and second._bits is None
+
+    # Changing them does, and only for the one thing.
+    view.sentinel = True
+    assert first._bits is not None and first.bits.sentinel and view.sentinel
+    assert not second.bits.sentinel and not bits.sentinel
+
+    second.bits.setall(True)
+    assert second.bits.sentinel and not bits.sentinel
+
+    third = char.load_mob("goblin@forest")
+    third.bits.clear()
+    assert not third.bits.aggressive and bits.aggressive
+
+def test_aux():
+    prototypes.add("monster@base", aux={"test_proto_counter": {"count": 3}})
+    prototypes.add("goblin@forest", ["monster@base"])
+
+    Counter.copies = 0
+    goblins = [char.load_mob("goblin@forest") for i in xrange(5)]
+    assert all(goblin._auxiliary is None for goblin in goblins)
+    assert Counter.copies == 0
+
+    # The data is copied the first time it's used.
+    counter = goblins[0].aux("test_proto_counter")
+    assert counter.count == 3 and Counter.copies == 1
+    assert counter.owner.uid == goblins[0].uid
+
+    counter.count += 1
+    assert goblins[0].aux("test_proto_counter") is counter
+    assert goblins[1].aux("test_proto_counter").count == 3
+    assert Counter.copies == 2
+
+    # Only changed data is stored.
+    assert goblins[0]._auxiliary_store()["test_proto_counter"] == \
+        {"count": 4}
+    assert goblins[4]._auxiliary_store() == {}
+
+def test_no_data():
+    prototypes.add("sword@forest", name="a sword")
+    sword = obj.load_obj("sword@forest")
+    assert sword.aux("test_proto_counter").count == 0
+    assert sword.bits is None
+
+def test_loop(monkeypatch):
+    monkeypatch.setattr(prototypes.log, "warning", lambda *args: None)
+    prototypes.add("a@test", ["b@test"], name="a")
+    prototypes.add("b@test", ["a@test", "missing@test"])
+    with pytest.raises(ValueError):
+        prototypes.get("a@test").attribute("name")
@@ -0,0 +1,154 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the pulse module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import pytest
+
+from nakedsun import pulse
+
+###############################################################################
+# Helpers
+###############################################################################
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Give the pulse module a clean set of systems and a clock that only moves
+    when told to.
+    """
+    clock = Clock()
+    monkeypatch.setattr(pulse, "_time", clock)
+    monkeypatch.setattr(pulse, "_systems", {})
+    monkeypatch.setattr(pulse, "_order", [])
+    monkeypatch.setattr(pulse, "pulse", 0)
+    monkeypatch.setattr(pulse, "budget", 0.1)
+    monkeypatch.setattr(pulse, "lag", 0.0)
+    monkeypatch.setattr(pulse, "overruns", 0)
+    return clock
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_rates(clock):
+    runs = []
+    pulse.register("fast", lambda: runs.append("fast"))
+    pulse.register("slow", lambda: runs.append("slow"), every=3)
+
+    for i in xrange(6):
+        pulse.run_pulse()
+
+    assert runs.count("fast") == 6
+    assert runs.count("slow") == 2
+
+def test_priority_order(clock):
+    runs = []
+    pulse.register("a", lambda: runs.append("a"), priority=pulse.LOW)
+    pulse.register("b", lambda: runs.append("b"), priority=pulse.HIGH)
+    pulse.register("c", lambda: runs.append("c"))
+
+    pulse.run_pulse()
+    assert runs == ["b", "c", "a"]
+
+def test_stagger(clock):
+    pulse.register("one", lambda: None, every=2)
+    pulse.register("two", lambda: None, every=2)
+
+    one, two = pulse._systems["one"], pulse._systems["two"]
+    assert one.next % 2 != two.next % 2
+
+def test_stagger_later(clock):
+    runs = []
+    pulse.register("a", lambda: runs.append(("a", pulse.pulse)), every=10)
+    for i in xrange(9):
+        pulse.run_pulse()
+
+    # A system registered partway through the cycle still gets its own slot.
+    pulse.register("b", lambda: runs.append(("b", pulse.pulse)), every=10)
+    b = pulse._systems["b"]
+    assert b.next >= pulse.pulse and b.next - pulse.pulse < 10
+
+    for i in xrange(30):
+        pulse.run_pulse()
+
+    a_pulses = set(p for name, p in runs if name == "a")
+    b_pulses = set(p for name, p in runs if name == "b")
+    assert len(b_pulses) == 3
+    assert not a_pulses & b_pulses
+
+def test_overrun(clock):
+    runs = []
+
+    def slow():
+        clock.now += 0.15
+
+    pulse.register("slow", slow, priority=pulse.HIGH)
+    pulse.register("regen", lambda: runs.append(pulse.pulse),
+                   priority=pulse.LOW)
+
+    # The slow system uses up the budget, so regen is put off.
+    pulse.run_pulse()
+    assert pulse.overruns == 1
+    assert runs == []
+    assert pulse._systems["regen"].deferred == 1
+
+    pulse.unregister("slow")
+    pulse.run_pulse()
+    assert runs == [1]
+
+    # While lagging, low priority systems don't run at all.
+    pulse.lag = 0.5
+    pulse.run_pulse()
+    assert runs == [1]
+
+def test_stats(clock, monkeypatch):
+    monkeypatch.setattr(pulse.log, "exception", lambda *args: None)
+
+    def work():
+        clock.now += 0.02
+
+    def broken():
+        raise ValueError("Broken.")
+
+    pulse.register("work", work, every=2)
+    pulse.register("broken", broken)
+
+    for i in xrange(4):
+        pulse.run_pulse()
+
+    stats = dict((s["name"], s) for s in pulse.stats())
+    assert stats["work"]["runs"] == 2
+    assert abs(stats["work"]["average"] - 0.02) < 1e-9
+    assert abs(stats["work"]["load"] - 0.1) < 1e-9
+    assert stats["broken"]["errors"] == 4
+
+    pulse.reset_stats()
+    assert pulse.stats()[0]["runs"] == 0
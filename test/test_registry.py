@@ -0,0 +1,98 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the registry module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import pytest
+
+from nakedsun import char
+from nakedsun import mud
+from nakedsun import obj
+from nakedsun import registry
+from nakedsun import room
+
+###############################################################################
+# Helpers
+###############################################################################
+
+@pytest.fixture(autouse=True)
+def storage(monkeypatch):
+    """
+    Give every test an empty registry.
+    """
+    monkeypatch.setattr(registry, "_last_uid", 0)
+    for name in ("_things", "_kinds", "_prototypes", "_zones"):
+        monkeypatch.setattr(registry, name, {})
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_zone_of():
+    assert registry.zone_of("goblin@forest") == "forest"
+    assert registry.zone_of("odd@name@forest") == "forest"
+    assert registry.zone_of("goblin") is None
+    assert registry.zone_of(None) is None
+
+def test_uids():
+    first, second = char.Char(), obj.Obj()
+    assert (first.uid, second.uid) == (1, 2)
+    assert registry.get(2) is second
+
+    # Things loaded with a uid keep it, and new uids come after it.
+    assert room.Room(10).uid == 10
+    assert char.Char().uid == 11
+    with pytest.raises(ValueError):
+        char.Char(10)
+
+def test_indexes():
+    goblins = [char.Char(prototype="goblin@forest") for i in xrange(3)]
+    sword = obj.Obj(prototype="sword@forest")
+    glade = room.Room(prototype="glade@forest")
+    cave = room.Room(prototype="cave@hills")
+
+    assert sorted(char.char_list()) == sorted(goblins)
+    assert obj.obj_list() == [sword]
+    assert char.count_mobs("goblin@forest") == 3
+    assert obj.count_objs("goblin@forest") == 3
+    assert room.get_room("cave@hills") is cave
+    assert room.is_loaded("glade@forest") and not room.is_loaded("x@y")
+
+    assert len(registry.in_zone("forest")) == 5
+    assert registry.in_zone("forest", "room") == [glade]
+    assert registry.in_zone("hills", "char") == []
+    assert sorted(registry.zones()) == ["forest", "hills"]
+
+def test_extract():
+    goblin = char.Char(prototype="goblin@forest")
+    cave = room.Room(prototype="cave@hills")
+
+    assert mud.extract(goblin)
+    assert not mud.extract(goblin)
+    assert registry.get(goblin.uid) is None
+    assert char.char_list() == [] and char.count_mobs("goblin@forest") == 0
+    assert registry.zones() == ["hills"]
+
+    mud.extract(cave)
+    assert room.get_room("cave@hills") is None
+    assert registry.zones() == [] and registry.count("room") == 0
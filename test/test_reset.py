@@ -0,0 +1,165 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the reset module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import pytest
+
+from nakedsun import char
+from nakedsun import hooks
+from nakedsun import mudsys
+from nakedsun import prototypes
+from nakedsun import pulse
+from nakedsun import registry
+from nakedsun import reset
+from nakedsun import room
+
+###############################################################################
+# Helpers
+###############################################################################
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class Sock(object):
+    def __init__(self):
+        self._ch = None
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Give the reset module no zones, a budget of 0.1 seconds, and a clock that
+    only moves when told to. Every test gets empty registry and zone indexes.
+    """
+    clock = Clock()
+    monkeypatch.setattr(reset, "_time", clock)
+    monkeypatch.setattr(reset, "_zones", {})
+    monkeypatch.setattr(reset, "_queue", [])
+    monkeypatch.setattr(reset, "budget", 0.1)
+    monkeypatch.setattr(pulse, "_systems", {})
+    monkeypatch.setattr(pulse, "_order", [])
+    monkeypatch.setattr(prototypes, "_prototypes", {})
+    monkeypatch.setattr(room, "_zone_chars", {})
+    monkeypatch.setattr(room, "_zone_players", {})
+    for name in ("_things", "_kinds", "_prototypes", "_zones"):
+        monkeypatch.setattr(registry, name, {})
+    return clock
+
+def _slow(clock, log, name, cost=0.04):
+    def step():
+        log.append(name)
+        clock.now += cost
+    return step
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_time_slices(clock):
+    done = []
+    ran = []
+
+    def finished(zone):
+        done.append(zone)
+
+    hooks.add("zone_reset", finished)
+    try:
+        reset.add_zone("forest")
+        assert "zone_reset" in pulse._systems
+        for i in xrange(5):
+            reset.add_step("forest", _slow(clock, ran, i))
+
+        assert reset.queue("forest")
+        assert not reset.queue("forest")
+
+        # Each pulse stops once the budget is used up.
+        reset.run()
+        assert ran == [0, 1, 2]
+        reset.run()
+        assert ran == [0, 1, 2, 3, 4] and done == ["forest"]
+
+        stats, = reset.stats()
+        assert stats["resets"] == 1 and stats["pulses"] == 2
+        assert stats["last"] == pytest.approx(0.2)
+        assert not stats["resetting"]
+    finally:
+        hooks.remove("zone_reset", finished)
+
+def test_players_first(clock):
+    ran = []
+    for name in ("empty", "busy"):
+        reset.add_zone(name)
+        reset.add_step(name, _slow(clock, ran, name, 0.2))
+
+    player = char.Char()
+    player.room = room.Room(prototype="hall@busy")
+    mudsys.attach_char_socket(player, Sock())
+
+    reset.queue("empty")
+    reset.queue("busy")
+    reset.run()
+    assert ran == ["busy"]
+    reset.run()
+    assert ran == ["busy", "empty"]
+
+def test_interval(clock):
+    prototypes.add("goblin@forest", name="a goblin")
+    glade = room.Room(prototype="glade@forest")
+
+    reset.add_zone("forest", interval=60)
+    reset.add_mob("forest", "goblin@forest", "glade@forest", max=2)
+    reset.add_mob("forest", "goblin@forest", "glade@forest", max=2)
+    reset.add_mob("forest", "goblin@forest", "missing@forest")
+
+    reset.run()
+    assert glade.chars == []
+
+    clock.now = 60
+    reset.run()
+    assert len(glade.chars) == 2
+
+    # The max is respected on the next reset.
+    clock.now = 120
+    reset.run()
+    assert len(glade.chars) == 2
+    assert reset.get_zone("forest").resets == 2
+
+def test_step_error(clock, monkeypatch):
+    monkeypatch.setattr(reset.log, "exception", lambda *args: None)
+    ran = []
+
+    def broken():
+        raise ValueError("Broken.")
+
+    reset.add_zone("forest")
+    reset.add_step("forest", broken)
+    reset.add_step("forest", ran.append, "after")
+
+    reset.queue("forest")
+    reset.run()
+    assert ran == ["after"]
+    assert reset.stats()[0]["errors"] == 1
@@ -0,0 +1,204 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the room module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import pytest
+
+from nakedsun import char
+from nakedsun import exit
+from nakedsun import mud
+from nakedsun import mudsys
+from nakedsun import obj
+from nakedsun import room
+from nakedsun import utils
+
+###############################################################################
+# Helpers
+###############################################################################
+
+@pytest.fixture(autouse=True)
+def paths(monkeypatch):
+    """
+    Give every test an empty path cache and zone indexes.
+    """
+    monkeypatch.setattr(room, "_paths", utils.LRUCache(10))
+    monkeypatch.setattr(room, "_zone_chars", {})
+    monkeypatch.setattr(room, "_zone_players", {})
+
+class Sock(object):
+    def __init__(self):
+        self._ch = None
+        self.sent = []
+
+    def send(self, message, environ=None, newline=True):
+        self.sent.append(message)
+
+def _line(count):
+    rooms = [room.Room() for i in xrange(count)]
+    for here, there in zip(rooms, rooms[1:]):
+        here.dig("east", there)
+        there.dig("west", here)
+    return rooms
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_dig_fill():
+    here, there = room.Room(), room.Room()
+    ex = here.dig("north", there)
+
+    assert isinstance(ex, exit.Exit)
+    assert ex.room is here and ex.dest is there and ex.dir == "north"
+    assert here.exit("north") is ex
+    assert here.exdirs == ["north"] and here.exits == [ex]
+    assert there.exit("south") is None and there.exits == []
+
+    assert here.fill("north")
+    assert not here.fill("north")
+    assert here.exit("north") is None and ex.room is None
+
+def test_path():
+    rooms = _line(5)
+    assert room.path(rooms[0], rooms[4]) == ["east"] * 4
+    assert room.path(rooms[4], rooms[1]) == ["west"] * 3
+    assert room.path(rooms[2], rooms[2]) == []
+    assert room.next_step(rooms[3], rooms[0]) == "west"
+
+    assert room.path(rooms[0], rooms[4], max_dist=3) is None
+    assert room.path(rooms[0], room.Room()) is None
+
+    # A shortcut is preferred.
+    rooms[0].dig("portal", rooms[3])
+    assert room.path(rooms[0], rooms[4]) == ["portal", "east"]
+
+def test_path_cache():
+    rooms = _line(3)
+    route = room.path(rooms[0], rooms[2])
+    route.append("mutated")
+    assert room.path(rooms[0], rooms[2]) == ["east", "east"]
+    assert room._paths.hits == 1
+
+    # Changing the exits clears cached paths.
+    rooms[1].fill("east")
+    assert len(room._paths) == 0
+    assert room.path(rooms[0], rooms[2]) is None
+
+    rooms[1].dig("east", rooms[0])
+    rooms[1].exit("east").dest = rooms[2]
+    assert room.path(rooms[0], rooms[2]) == ["east", "east"]
+
+def test_exit_method():
+    mudsys.add_exit_method("is_door", property(lambda ex: ex.is_closable))
+    try:
+        ex = room.Room().dig("in", None)
+        assert not ex.is_door
+    finally:
+        del exit.Exit.is_door
+
+def test_chars():
+    glade = room.Room(prototype="glade@forest")
+    cave = room.Room(prototype="cave@hills")
+    first, second = char.Char(), char.Char()
+
+    first.room = glade
+    second.room = glade
+    assert glade.chars == [first, second] and first.room is glade
+    assert glade.zone == "forest"
+    assert sorted(room.zone_chars("forest")) == sorted([first, second])
+
+    second.room = cave
+    assert glade.chars == [first] and cave.chars == [second]
+    assert room.zone_chars("hills") == [second]
+
+    for thing in (first, second, glade, cave):
+        mud.extract(thing)
+    assert room.zone_chars("forest") == [] and room.zone_chars("hills") == []
+    assert first.room is None
+
+def test_players():
+    glade = room.Room(prototype="glade@forest")
+    player, mob = char.Char(), char.Char()
+    sock = Sock()
+
+    player.room = mob.room = glade
+    assert room.zone_players("forest") == []
+
+    mudsys.attach_char_socket(player, sock)
+    assert sock._ch is player and player.sock is sock and player.is_pc
+    assert room.zone_players("forest") == [player]
+    assert room.zone_sockets("forest") == [sock]
+    assert room.zones_with_players() == ["forest"]
+
+    room.send_zone("forest", "The wind howls.")
+    glade.send("A bird sings.", exclude=[player])
+    mob.send("Nobody hears this.")
+    assert sock.sent == ["The wind howls."]
+
+    # Moving out of the zone and detaching both update the index.
+    player.room = None
+    assert room.zone_sockets("forest") == []
+    player.room = glade
+    mudsys.detach_char_socket(player)
+    assert sock._ch is None and not player.is_pc
+    assert room.zone_players("forest") == []
+
+    mudsys.attach_char_socket(mob, sock)
+    mud.extract(mob)
+    assert sock._ch is None and room.zone_chars("forest") == [player]
+
+    for thing in (player, glade):
+        mud.extract(thing)
+
+def test_objs():
+    glade = room.Room()
+    ch = char.Char()
+    bag, apple = obj.Obj(), obj.Obj()
+
+    bag.room = glade
+    apple.container = bag
+    assert glade.objs == [bag] and bag.contents == [apple]
+    assert bag.room is glade and bag.carrier is None
+    assert apple.container is bag and apple.location is bag
+
+    bag.carrier = ch
+    assert glade.objs == [] and ch.inv == [bag] and bag.carrier is ch
+
+    # Extracting a character extracts what it carries.
+    mud.extract(ch)
+    assert obj.obj_list().count(apple) == 0
+    assert bag.location is None
+    mud.extract(glade)
+
+def test_lru_cache():
+    cache = utils.LRUCache(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+
+    # b is the least recently used.
+    cache["c"] = 3
+    assert "b" not in cache and cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert (cache.hits, cache.misses) == (3, 1)
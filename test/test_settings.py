@@ -0,0 +1,111 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the settings module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import json
+import os
+
+import pytest
+from pants.engine import Engine
+
+from nakedsun import hooks
+from nakedsun import settings
+
+###############################################################################
+# Fixtures
+###############################################################################
+
+@pytest.fixture
+def config(monkeypatch, tmpdir):
+    """
+    Point the settings at a temporary config file and record deferred saves
+    rather than scheduling them on the engine.
+    """
+    path = str(tmpdir.join("config"))
+    monkeypatch.setattr(settings, "_source", "config")
+    monkeypatch.setattr(settings, "_path", path)
+    monkeypatch.setattr(settings, "_dirty", False)
+    monkeypatch.setattr(settings, "_save_pending", False)
+
+    deferred = []
+    monkeypatch.setattr(Engine.instance(), "defer",
+                        lambda delay, func: deferred.append((delay, func)))
+
+    # Make sure keys added by the tests are removed afterwards.
+    for key in ("one", "two"):
+        monkeypatch.setitem(settings._settings, key, None)
+
+    return path, deferred
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_update(config):
+    path, deferred = config
+    changed = []
+
+    def on_change(key, val):
+        changed.append(key)
+
+    hooks.add("setting_changed", on_change)
+    try:
+        settings.update({"one": 1, "two": 2})
+    finally:
+        hooks.remove("setting_changed", on_change)
+
+    assert sorted(changed) == ["one", "two"]
+    assert settings.get("one") == 1
+
+    # The write is deferred until the settings are flushed.
+    assert not os.path.exists(path)
+    settings.flush()
+
+    with open(path, 'rb') as f:
+        data = json.load(f)
+
+    assert data["one"] == 1
+    assert data["two"] == 2
+    assert not os.path.exists(path + ".tmp")
+
+def test_schedule_once(config):
+    path, deferred = config
+
+    settings.set("one", 1)
+    settings.set("two", 2)
+    assert len(deferred) == 1
+
+    delay, func = deferred[0]
+    assert delay == settings.SAVE_DELAY
+
+    func()
+    assert not settings._save_pending
+    with open(path, 'rb') as f:
+        assert json.load(f)["two"] == 2
+
+def test_flush_clean(config):
+    path, deferred = config
+
+    settings.flush()
+    assert not os.path.exists(path)
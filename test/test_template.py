@@ -0,0 +1,105 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the template module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import pytest
+
+from nakedsun import mud
+from nakedsun import template
+from nakedsun import utils
+
+###############################################################################
+# Helpers
+###############################################################################
+
+class Thing(object):
+    def __init__(self, name, level=1, is_pc=False):
+        self.name = name
+        self.level = level
+        self.is_pc = is_pc
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    """
+    Give every test an empty template cache.
+    """
+    monkeypatch.setattr(template, "_cache", utils.LRUCache(10))
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_expressions():
+    environ = {"me": Thing("the glade"), "items": ["a", "b"]}
+    assert template.render("You are in [me.name].", environ) == \
+        "You are in the glade."
+    assert template.render("[len(items)] [items[-1]] [' ]'.strip()]",
+                           environ) == "2 b ]"
+    assert template.render("[[not an expression]") == "[not an expression]"
+    assert template.render(u"caf\xe9 [1 + 1]") == u"caf\xe9 2"
+
+def test_byte_strings():
+    assert template.expand(u"caf\xe9 [x]", {"x": "caf\xc3\xa9"}) == \
+        u"caf\xe9 caf\xe9"
+    assert template.render("[x]", {"x": "bad \xff"}) == u"bad \ufffd"
+    assert template.render("caf\xc3\xa9 [x]", {"x": u"\xe9"}) == \
+        u"caf\xe9 \xe9"
+
+def test_conditions():
+    source = ("[if ch.is_pc]Hello, [ch.name]. [/if][if ch.level > 10]big"
+              "[elif ch.level > 2]medium[else]small[/if]")
+    assert template.render(source, {"ch": Thing("Bob", 5, True)}) == \
+        "Hello, Bob. medium"
+    assert template.render(source, {"ch": Thing("rat")}) == "small"
+    assert template.render("[if 1][if 0]a[else]b[/if][/if]") == "b"
+    assert template.render("[if 0]a[/if]") == ""
+
+def test_cache():
+    first = template.compile_template("[x]")
+    assert template.compile_template("[x]") is first
+    assert first.render({"x": 1}) == "1"
+    assert first.render({"x": "two"}) == "two"
+
+def test_invalid(monkeypatch):
+    errors = []
+    monkeypatch.setattr(template.log, "error", errors.append)
+
+    for source in ("[unclosed", "[if x]no end", "[/if]", "[]", "[1 +]",
+                   "[if 1][else][elif 2][/if]"):
+        with pytest.raises(template.TemplateError):
+            template.render(source)
+
+    assert template.expand("[unclosed") == "[unclosed"
+    assert len(errors) == 1
+
+def test_runtime_errors(monkeypatch):
+    errors = []
+    monkeypatch.setattr(template.log, "exception", errors.append)
+
+    source = "a[missing]b[if 1 / 0]c[else]d[/if]"
+    assert template.render(source) == "abd"
+    assert len(errors) == 2
+
+def test_expand_text():
+    assert mud.expand_text("[me]", {"me": "Bob"}, newline=True) == "Bob\r\n"
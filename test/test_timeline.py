@@ -0,0 +1,116 @@
+###############################################################################
+#
+# Copyright 2012 Stendec <me@stendec.me>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###############################################################################
+"""
+This file contains tests for the timeline module.
+"""
+
+###############################################################################
+# Imports
+###############################################################################
+
+import json
+
+from nakedsun import timeline
+
+###############################################################################
+# Helpers
+###############################################################################
+
+class Clock(object):
+    """ A replacement for the time module that only moves when told to. """
+    def __init__(self):
+        self.now = 100.0
+
+    def time(self):
+        return self.now
+
+def _timeline(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(timeline, "time", clock)
+    return timeline.Timeline(), clock
+
+###############################################################################
+# The Tests
+###############################################################################
+
+def test_phases(monkeypatch):
+    line, clock = _timeline(monkeypatch)
+
+    line.phase("one")
+    clock.now += 1
+    line.phase("two")
+    clock.now += 3
+    line.end()
+    line.end()
+
+    assert [(e["name"], e["start"], e["duration"]) for e in line.entries] == [
+        ("one", 0.0, 1.0), ("two", 1.0, 3.0)]
+    assert line.total == 4.0
+
+def test_measure(monkeypatch):
+    line, clock = _timeline(monkeypatch)
+
+    with line.measure("fast"):
+        clock.now += 0.5
+
+    try:
+        with line.measure("broken"):
+            clock.now += 2
+            raise ValueError("Broken.")
+    except ValueError:
+        pass
+    else:
+        assert False
+
+    assert [(e["name"], e["kind"], e["duration"]) for e in line.entries] == [
+        ("fast", "import", 0.5), ("broken", "import", 2.0)]
+
+def test_report(monkeypatch):
+    line, clock = _timeline(monkeypatch)
+
+    line.phase("pymodules")
+    with line.measure("slow"):
+        clock.now += 2
+    with line.measure("fast"):
+        clock.now += 1
+    line.end()
+
+    report = line.report()
+    assert [row.split()[-1] for row in report] == ["pymodules", "slow", "fast"]
+    assert report[0].split()[:3] == ["3000.00", "ms", "phase"]
+
+    assert [row.split()[-1] for row in line.report("import")] == [
+        "slow", "fast"]
+
+def test_save(monkeypatch, tmpdir):
+    line, clock = _timeline(monkeypatch)
+    line.phase("settings")
+    clock.now += 1
+    line.end()
+
+    path = str(tmpdir.join("boot.json"))
+    line.save(path)
+
+    with open(path, "rb") as f:
+        data = json.load(f)
+
+    assert sorted(data) == ["entries", "started", "total"]
+    assert data["started"] == 100.0
+    assert data["total"] == 1.0
+    assert data["entries"] == [{"name": "settings", "kind": "phase",
+                                "start": 0.0, "duration": 1.0}]